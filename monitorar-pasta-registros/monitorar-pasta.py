@@ -1,63 +1,251 @@
+import argparse
+import heapq
 import os
+import sys
+import threading
 import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import glob
-
-def limpar_registros_antigos(pasta_registros):
-    LIMITE_TAMANHO = 1 * 1024 * 1024 * 1024  # 1GB em bytes
-    
-    tamanho_total = sum(os.path.getsize(os.path.join(pasta_registros, f)) 
-                       for f in os.listdir(pasta_registros) 
-                       if os.path.isfile(os.path.join(pasta_registros, f)))
-    
-    if tamanho_total > LIMITE_TAMANHO:
-        arquivos_jpg = sorted(
-            glob.glob(os.path.join(pasta_registros, "*.jpg")),
-            key=os.path.getctime
-        )
-        arquivos_txt = sorted(
-            glob.glob(os.path.join(pasta_registros, "*.txt")),
-            key=os.path.getctime
-        )
-        
-        for arquivo in arquivos_jpg[:10] + arquivos_txt[:10]:
-            try:
-                os.remove(arquivo)
-            except:
-                pass
 
-class MonitoramentoHandler(FileSystemEventHandler):
-    def __init__(self, pasta_registros):
+# Adicionar diretório raiz ao PYTHONPATH para usar o índice de eventos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.indice_eventos import IndiceEventos, ler_clipe
+
+SUFIXO_EVENTO = '_movimento'
+SUFIXO_CLIPE = SUFIXO_EVENTO + '.avi'
+
+
+def chave_evento(caminho):
+    """Arquivos do mesmo evento (foto, log, ...) compartilham o prefixo antes de '_movimento'"""
+    pasta, nome = os.path.split(caminho)
+    if SUFIXO_EVENTO not in nome:
+        return None
+    return os.path.join(pasta, nome[:nome.index(SUFIXO_EVENTO)])
+
+
+class ServicoRetencao:
+    """
+    Mantém a pasta registros dentro dos limites de tamanho, quantidade de
+    eventos e idade. O total em bytes é calculado uma vez na partida e
+    depois atualizado pelos eventos de criação e remoção; os eventos ficam
+    num heap por idade e são removidos do mais antigo ao mais novo até a
+    marca inferior, com todos os arquivos de cada evento juntos.
+
+    Um clipe estendido por eventos seguintes guarda o nome do primeiro e é
+    citado no log de cada um; ele só sai quando o último desses eventos sai.
+    """
+    def __init__(self, pasta_registros, limite_bytes=1024 ** 3, limite_eventos=None,
+                 idade_maxima=None, marca_inferior=0.9):
         self.pasta_registros = pasta_registros
-        
+        self.limite_bytes = limite_bytes
+        self.limite_eventos = limite_eventos
+        self.idade_maxima = idade_maxima
+        self.marca_inferior = marca_inferior
+
+        self.total_bytes = 0
+        self.tamanhos = {}        # caminho -> bytes dos arquivos de eventos
+        self.eventos = {}         # chave -> {'criado': timestamp, 'arquivos': set()}
+        self._heap = []           # (criado, chave), com entradas obsoletas ignoradas
+        self.clipes = {}          # caminho do clipe -> chaves dos eventos que o citam
+        self.clipes_evento = {}   # chave do evento -> clipes que ele cita
+        self._lock = threading.Lock()
+        self.indice = IndiceEventos(pasta_registros)
+
+    def carregar(self):
+        """Varredura única da pasta na partida"""
+        with self._lock:
+            for raiz, _, arquivos in os.walk(self.pasta_registros):
+                for arquivo in arquivos:
+                    self._adicionar(os.path.join(raiz, arquivo))
+        print(f"Registros: {len(self.eventos)} eventos, {self.total_bytes / (1024 * 1024):.1f} MB")
+
+    def _adicionar(self, caminho):
+        chave = chave_evento(caminho)
+        if chave is None or os.path.basename(caminho).startswith('.'):
+            return  # índice, temporários do gravador e outros arquivos não entram na conta
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            return
+
+        self.total_bytes += estado.st_size - self.tamanhos.get(caminho, 0)
+        self.tamanhos[caminho] = estado.st_size
+
+        if caminho.endswith(SUFIXO_CLIPE):
+            self._citar_clipe(caminho, chave)
+            return
+        if caminho.endswith(SUFIXO_EVENTO + '.txt'):
+            nome_clipe = ler_clipe(caminho)
+            if nome_clipe:
+                self._citar_clipe(os.path.join(os.path.dirname(caminho), nome_clipe), chave)
+
+        evento = self.eventos.get(chave)
+        if evento is None:
+            evento = self.eventos[chave] = {'criado': estado.st_mtime, 'arquivos': set()}
+            heapq.heappush(self._heap, (estado.st_mtime, chave))
+        evento['arquivos'].add(caminho)
+
+    def _citar_clipe(self, clipe, chave):
+        self.clipes.setdefault(clipe, set()).add(chave)
+        self.clipes_evento.setdefault(chave, set()).add(clipe)
+
+    def _descontar(self, caminho):
+        self.total_bytes -= self.tamanhos.pop(caminho, 0)
+        if caminho.endswith(SUFIXO_CLIPE):
+            for chave in self.clipes.pop(caminho, ()):
+                self.clipes_evento.get(chave, set()).discard(caminho)
+            return
+        chave = chave_evento(caminho)
+        evento = self.eventos.get(chave)
+        if evento is not None:
+            evento['arquivos'].discard(caminho)
+            if not evento['arquivos']:
+                del self.eventos[chave]
+
+    def arquivo_criado(self, caminho):
+        with self._lock:
+            self._adicionar(caminho)
+            self._aplicar_limites()
+
+    def arquivo_removido(self, caminho):
+        with self._lock:
+            self._descontar(caminho)
+
+    def aplicar_limites(self):
+        with self._lock:
+            self._aplicar_limites()
+
+    def _excede(self, fator=1.0):
+        if self.total_bytes > self.limite_bytes * fator:
+            return True
+        if self.limite_eventos and len(self.eventos) > self.limite_eventos * fator:
+            return True
+        return False
+
+    def _aplicar_limites(self):
+        agora = time.time()
+        vencido = lambda criado: self.idade_maxima and agora - criado > self.idade_maxima
+
+        # Nada a fazer enquanto os limites superiores não forem ultrapassados
+        if not self._excede() and not (self._heap and vencido(self._heap[0][0])):
+            return
+
+        removidos = []
+        while self._heap:
+            criado, chave = self._heap[0]
+            evento = self.eventos.get(chave)
+            if evento is None or evento['criado'] != criado:
+                heapq.heappop(self._heap)  # entrada obsoleta
+                continue
+            if not self._excede(self.marca_inferior) and not vencido(criado):
+                break
+
+            heapq.heappop(self._heap)
+            for arquivo in sorted(evento['arquivos']):
+                try:
+                    os.remove(arquivo)
+                except OSError:
+                    pass
+                self.total_bytes -= self.tamanhos.pop(arquivo, 0)
+                if arquivo.endswith(SUFIXO_EVENTO + '.jpg'):  # a foto, não as variantes leves
+                    removidos.append(arquivo)
+            del self.eventos[chave]
+            self._liberar_clipes(chave)
+
+        if removidos:
+            self.indice.remover_por_foto(removidos)
+            print(f"Retenção: {len(removidos)} eventos removidos, "
+                  f"{len(self.eventos)} restantes, {self.total_bytes / (1024 * 1024):.1f} MB")
+
+    def _liberar_clipes(self, chave):
+        """Remove os clipes citados pelo evento removido que nenhum evento restante cita"""
+        for clipe in self.clipes_evento.pop(chave, ()):
+            chaves = self.clipes.get(clipe)
+            if chaves is None:
+                continue
+            chaves.discard(chave)
+            if any(outra in self.eventos for outra in chaves):
+                continue
+            del self.clipes[clipe]
+            if clipe in self.tamanhos:  # ainda pode estar sendo gravado
+                try:
+                    os.remove(clipe)
+                except OSError:
+                    pass
+                self.total_bytes -= self.tamanhos.pop(clipe)
+
+
+class MonitoramentoHandler(FileSystemEventHandler):
+    def __init__(self, retencao):
+        self.retencao = retencao
+
     def on_created(self, event):
         if event.is_directory:
             return
-        
-        if event.src_path.endswith('.txt'):
-            limpar_registros_antigos(self.pasta_registros)
+        self.retencao.arquivo_criado(event.src_path)
+
+    def on_modified(self, event):
+        # Atualiza o tamanho de arquivos escritos depois de criados
+        if event.is_directory:
+            return
+        self.retencao.arquivo_criado(event.src_path)
+
+    def on_moved(self, event):
+        # Registros são gravados num temporário e renomeados
+        if event.is_directory:
+            return
+        self.retencao.arquivo_removido(event.src_path)
+        self.retencao.arquivo_criado(event.dest_path)
+
+    def on_deleted(self, event):
+        if event.is_directory:
+            return
+        self.retencao.arquivo_removido(event.src_path)
+
 
-def iniciar_monitoramento(pasta_registros):
-    event_handler = MonitoramentoHandler(pasta_registros)
+def iniciar_monitoramento(pasta_registros, retencao=None):
+    if retencao is None:
+        retencao = ServicoRetencao(pasta_registros)
+    retencao.carregar()
+    retencao.aplicar_limites()
+
+    event_handler = MonitoramentoHandler(retencao)
     observer = Observer()
-    observer.schedule(event_handler, pasta_registros, recursive=False)
+    observer.schedule(event_handler, pasta_registros, recursive=True)
     observer.start()
-    
+
     try:
         while True:
             time.sleep(1)
+            # A idade máxima vence mesmo sem novos registros
+            retencao.aplicar_limites()
     except KeyboardInterrupt:
         observer.stop()
-    
+
     observer.join()
 
 if __name__ == "__main__":
-    # Ajustando o caminho para a pasta de registros
-    PASTA_REGISTROS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "registros")
-    
+    # Ajustando o caminho para a pasta de registros (a mesma usada pelo monitoramento)
+    PASTA_REGISTROS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "registros")
+
+    parser = argparse.ArgumentParser(description="Retenção da pasta registros")
+    parser.add_argument('--pasta', default=PASTA_REGISTROS)
+    parser.add_argument('--limite-mb', type=float, default=1024, help="Tamanho máximo da pasta em MB")
+    parser.add_argument('--limite-eventos', type=int, default=None, help="Quantidade máxima de eventos")
+    parser.add_argument('--idade-maxima-horas', type=float, default=None, help="Idade máxima de um evento")
+    parser.add_argument('--marca-inferior', type=float, default=0.9,
+                        help="Fração dos limites até onde a limpeza remove eventos")
+    args = parser.parse_args()
+
     # Certifique-se de que a pasta existe
-    if not os.path.exists(PASTA_REGISTROS):
-        os.makedirs(PASTA_REGISTROS)
-    
-    iniciar_monitoramento(PASTA_REGISTROS)
\ No newline at end of file
+    if not os.path.exists(args.pasta):
+        os.makedirs(args.pasta)
+
+    retencao = ServicoRetencao(
+        args.pasta,
+        limite_bytes=int(args.limite_mb * 1024 * 1024),
+        limite_eventos=args.limite_eventos,
+        idade_maxima=args.idade_maxima_horas * 3600 if args.idade_maxima_horas else None,
+        marca_inferior=args.marca_inferior,
+    )
+    iniciar_monitoramento(args.pasta, retencao)
@@ -1,3 +1,12 @@
-# Importação simplificada
-from src.monitoramento import nomeMonitoramento
-from src.interface import nomeInterface
+# Importação simplificada, sob demanda: "import src" não carrega OpenCV nem Tk
+__all__ = ['nomeMonitoramento', 'nomeInterface']
+
+
+def __getattr__(nome):
+    if nome == 'nomeMonitoramento':
+        from src.monitoramento import nomeMonitoramento
+        return nomeMonitoramento
+    if nome == 'nomeInterface':
+        from src.interface import nomeInterface
+        return nomeInterface
+    raise AttributeError(f"module 'src' has no attribute '{nome}'")
@@ -0,0 +1,91 @@
+"""
+Artefatos de um evento codificados uma única vez: o JPEG do frame inteiro,
+uma miniatura e o recorte da região com as detecções. Disco, prévia e
+envio de alertas usam esses mesmos bytes; o envio prefere as variantes
+leves, gravadas ao lado da foto com sufixos próprios.
+"""
+import os
+
+import cv2
+
+SUFIXO_RECORTE = '_recorte.jpg'
+SUFIXO_MINIATURA = '_miniatura.jpg'
+
+
+def caminho_variante(caminho_foto, sufixo):
+    return caminho_foto[:-len('.jpg')] + sufixo
+
+
+def variante_envio(caminho_foto, preferencia='recorte'):
+    """Variante mais leve existente da foto: recorte, miniatura ou a própria foto"""
+    ordem = {'recorte': (SUFIXO_RECORTE, SUFIXO_MINIATURA), 'miniatura': (SUFIXO_MINIATURA,)}
+    for sufixo in ordem.get(preferencia, ()):
+        caminho = caminho_variante(caminho_foto, sufixo)
+        if os.path.exists(caminho):
+            return caminho
+    return caminho_foto
+
+
+class ArtefatoEvento:
+    """
+    Bytes JPEG do evento. O recorte envolve todas as caixas com margem e é
+    omitido quando cobriria quase o frame todo (a miniatura já serve).
+    """
+    def __init__(self, frame, caixas=(), qualidade=95, qualidade_leve=80, lado_miniatura=320,
+                 lado_recorte=960, margem=0.25, fracao_maxima_recorte=0.6):
+        self.qualidade_leve = qualidade_leve
+        self.jpeg = self._codificar(frame, qualidade)
+
+        altura, largura = frame.shape[:2]
+        fator = min(1.0, lado_miniatura / float(max(altura, largura)))
+        miniatura = cv2.resize(frame, (max(1, int(largura * fator)), max(1, int(altura * fator))),
+                               interpolation=cv2.INTER_AREA)
+        self.miniatura = self._codificar(miniatura, qualidade_leve)
+
+        self.recorte = None
+        self.caixa_recorte = self._envolvente(caixas, largura, altura, margem)
+        if self.caixa_recorte is not None:
+            x, y, w, h = self.caixa_recorte
+            if w * h <= fracao_maxima_recorte * largura * altura:
+                regiao = frame[y:y+h, x:x+w]
+                fator = min(1.0, lado_recorte / float(max(w, h)))
+                if fator < 1.0:
+                    regiao = cv2.resize(regiao, (max(1, int(w * fator)), max(1, int(h * fator))),
+                                        interpolation=cv2.INTER_AREA)
+                self.recorte = self._codificar(regiao, qualidade_leve)
+            else:
+                self.caixa_recorte = None
+
+    @staticmethod
+    def _codificar(imagem, qualidade):
+        ok, jpeg = cv2.imencode('.jpg', imagem, [int(cv2.IMWRITE_JPEG_QUALITY), qualidade])
+        if not ok:
+            raise ValueError("Falha ao codificar JPEG")
+        return jpeg.tobytes()
+
+    @staticmethod
+    def _envolvente(caixas, largura, altura, margem):
+        if not len(caixas):
+            return None
+        x1 = min(c[0] for c in caixas)
+        y1 = min(c[1] for c in caixas)
+        x2 = max(c[0] + c[2] for c in caixas)
+        y2 = max(c[1] + c[3] for c in caixas)
+        mx = max(32, int((x2 - x1) * margem))
+        my = max(32, int((y2 - y1) * margem))
+        x1, y1 = max(0, x1 - mx), max(0, y1 - my)
+        x2, y2 = min(largura, x2 + mx), min(altura, y2 + my)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+
+    @property
+    def tamanho(self):
+        return len(self.jpeg) + len(self.miniatura) + (len(self.recorte) if self.recorte else 0)
+
+    def variantes(self, caminho_foto):
+        """(caminho, bytes) das variantes leves a gravar ao lado da foto"""
+        variantes = [(caminho_variante(caminho_foto, SUFIXO_MINIATURA), self.miniatura)]
+        if self.recorte is not None:
+            variantes.insert(0, (caminho_variante(caminho_foto, SUFIXO_RECORTE), self.recorte))
+        return variantes
@@ -0,0 +1,81 @@
+"""
+Compara os motores de movimento sobre a mesma gravação: custo do motor
+por frame e quantas vezes cada um aciona o Haar/HOG (um recorte com
+movimento é uma chamada), que é o que domina o custo do pipeline.
+
+Uso (na raiz do projeto):
+    python -m src.benchmark_movimento gravacao.mp4
+    python -m src.benchmark_movimento gravacao.mp4 --motores diferenca mog2 --escalas 0.5 0.25
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.fontes import abrir_fonte
+from src.monitoramento import nomeMonitoramento
+from src.movimento import MOTORES
+
+
+def medir(monitor, origem, max_frames):
+    fonte = abrir_fonte(origem)
+    fonte.abrir()
+    monitor.criar_buffers(fonte.largura, fonte.altura)
+
+    tempos_movimento = []
+    tempo_pessoas = 0.0
+    frames_com_movimento = 0
+    chamadas_hog = 0
+    try:
+        while max_frames is None or len(tempos_movimento) < max_frames:
+            ret, frame = fonte.read()
+            if not ret:
+                break
+
+            preproc = monitor.preprocessar(frame)
+            t0 = time.perf_counter()
+            movimento, contornos, mascara = monitor.detectar_movimento_significativo(frame, preproc)
+            tempos_movimento.append(time.perf_counter() - t0)
+
+            if movimento:
+                frames_com_movimento += 1
+                chamadas_hog += len(monitor.regioes_de_movimento(contornos, frame.shape))
+                t0 = time.perf_counter()
+                monitor.localizar_pessoas(frame, movimento, contornos, mascara, preproc)
+                tempo_pessoas += time.perf_counter() - t0
+    finally:
+        fonte.liberar()
+
+    frames = len(tempos_movimento)
+    tempos_movimento = np.array(tempos_movimento) * 1000
+    return {
+        'frames': frames,
+        'ms_movimento': tempos_movimento.mean() if frames else 0.0,
+        'p95_movimento': np.percentile(tempos_movimento, 95) if frames else 0.0,
+        'frames_com_movimento': frames_com_movimento,
+        'chamadas_hog': chamadas_hog,
+        'ms_pessoas': tempo_pessoas * 1000 / frames if frames else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os motores de movimento numa gravação")
+    parser.add_argument('origem', help="Arquivo de vídeo ou pasta com imagens")
+    parser.add_argument('--motores', nargs='+', default=list(MOTORES), choices=list(MOTORES))
+    parser.add_argument('--escalas', nargs='+', type=float, default=[0.5])
+    parser.add_argument('--max-frames', type=int, default=None)
+    args = parser.parse_args()
+
+    monitor = nomeMonitoramento()
+    print(f"{'motor':<10} {'escala':>6} {'frames':>6} {'ms/frame':>9} {'p95 ms':>7} "
+          f"{'c/ movimento':>12} {'chamadas HOG':>12} {'Haar+HOG ms/frame':>18}")
+    for nome in args.motores:
+        for escala in args.escalas:
+            monitor.definir_motor_movimento(nome, escala)
+            r = medir(monitor, args.origem, args.max_frames)
+            print(f"{nome:<10} {escala:>6.2f} {r['frames']:>6} {r['ms_movimento']:>9.2f} {r['p95_movimento']:>7.2f} "
+                  f"{r['frames_com_movimento']:>12} {r['chamadas_hog']:>12} {r['ms_pessoas']:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
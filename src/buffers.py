@@ -0,0 +1,48 @@
+import numpy as np
+
+
+class PoolBuffers:
+    """
+    Arrays preallocados a partir da resolução negociada com a câmera.
+    Cada etapa do loop escreve no seu buffer via dst=, evitando alocar
+    arrays novos a cada frame.
+    """
+    def __init__(self, largura, altura, escala=0.5):
+        self.largura = largura
+        self.altura = altura
+        self.escala = escala
+
+        largura_p = int(round(largura * escala))
+        altura_p = int(round(altura * escala))
+
+        # Resolução cheia
+        self.exibicao = np.empty((altura, largura, 3), np.uint8)
+        self.cinza = np.empty((altura, largura), np.uint8)
+        self.equalizado = np.empty((altura, largura), np.uint8)
+
+        # Níveis da pirâmide até a escala de processamento (nível 0 é o frame)
+        self.piramide = [None]
+        w, h = largura, altura
+        while w > largura_p and h > altura_p:
+            w, h = int(round(w * 0.5)), int(round(h * 0.5))
+            self.piramide.append(np.empty((h, w, 3), np.uint8))
+
+        # Escala de processamento do movimento
+        self.pequeno = np.empty((altura_p, largura_p, 3), np.uint8)
+        self.cinza_pequeno = np.empty((altura_p, largura_p), np.uint8)
+        self.diferenca = np.empty((altura_p, largura_p), np.uint8)
+        self.limiar = np.empty((altura_p, largura_p), np.uint8)
+        self.dilatado = np.empty((altura_p, largura_p), np.uint8)
+
+        # Dois buffers alternados: o frame atual e o anterior usado no absdiff
+        self._borrado = [np.empty((altura_p, largura_p), np.uint8) for _ in range(2)]
+        self._indice_borrado = 0
+
+    def compativel(self, frame, escala=None):
+        if escala is not None and escala != self.escala:
+            return False
+        return frame.shape == self.exibicao.shape and frame.dtype == np.uint8
+
+    def proximo_borrado(self):
+        self._indice_borrado ^= 1
+        return self._borrado[self._indice_borrado]
@@ -0,0 +1,150 @@
+"""
+Caixa de saída dos alertas em SQLite: o handler da pasta só enfileira e
+um trabalhador envia, com nova tentativa e espera crescente. Os alertas
+pendentes sobrevivem a reinícios, e um alerta já enviado não volta para a
+fila (o log do evento é a chave). A coluna recebido guarda o instante da
+detecção, o mesmo relógio do índice de eventos, e não o da chegada à caixa.
+
+Situação da fila (na raiz do projeto):
+    python -m src.caixa_saida [pasta_registros]
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from src.indice_eventos import timestamp_evento
+
+NOME_ARQUIVO = 'alertas.db'
+
+PENDENTE = 'pendente'
+ENVIADO = 'enviado'
+DESCARTADO = 'descartado'  # arquivos removidos antes do envio
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS alertas (
+    id INTEGER PRIMARY KEY,
+    caminho_txt TEXT NOT NULL UNIQUE,
+    caminho_foto TEXT NOT NULL,
+    recebido REAL NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa REAL NOT NULL DEFAULT 0,
+    enviado_em REAL,
+    erro TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alertas_estado ON alertas (estado, proxima_tentativa);
+"""
+
+
+class CaixaSaida:
+    """Alertas pendentes e enviados, com espera exponencial entre tentativas"""
+    def __init__(self, pasta_registros, espera_inicial=5.0, espera_maxima=300.0):
+        self.pasta_registros = pasta_registros
+        self.caminho_db = os.path.join(pasta_registros, NOME_ARQUIVO)
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho_db, timeout=10, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('PRAGMA synchronous=FULL')
+        self._conexao.executescript(_ESQUEMA)
+
+    def enfileirar(self, caminho_foto, caminho_txt, recebido=None):
+        """
+        Retorna False se o evento já estava na caixa (pendente ou enviado).
+        Sem recebido, vale o instante da detecção no nome da foto.
+        """
+        if recebido is None:
+            recebido = timestamp_evento(caminho_foto)
+        with self._lock, self._conexao:
+            cursor = self._conexao.execute(
+                'INSERT OR IGNORE INTO alertas (caminho_txt, caminho_foto, recebido) VALUES (?, ?, ?)',
+                (caminho_txt, caminho_foto, time.time() if recebido is None else recebido)
+            )
+        return cursor.rowcount > 0
+
+    def prontos(self, agora=None):
+        """Pendentes cuja espera já terminou, do mais antigo ao mais novo"""
+        with self._lock:
+            linhas = self._conexao.execute(
+                'SELECT * FROM alertas WHERE estado = ? AND proxima_tentativa <= ? ORDER BY recebido, id',
+                (PENDENTE, time.time() if agora is None else agora)).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def proxima_tentativa(self):
+        """Momento (time.time) em que o próximo pendente fica pronto, ou None"""
+        with self._lock:
+            return self._conexao.execute(
+                'SELECT MIN(proxima_tentativa) FROM alertas WHERE estado = ?', (PENDENTE,)).fetchone()[0]
+
+    def marcar_enviados(self, ids):
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                'UPDATE alertas SET estado = ?, enviado_em = ?, erro = NULL WHERE id = ?',
+                [(ENVIADO, agora, i) for i in ids])
+
+    def descartar(self, ids, motivo):
+        with self._lock, self._conexao:
+            self._conexao.executemany('UPDATE alertas SET estado = ?, erro = ? WHERE id = ?',
+                                      [(DESCARTADO, motivo, i) for i in ids])
+
+    def adiar(self, ids, erro=None):
+        """Nova tentativa depois de espera_inicial * 2^tentativas, limitada a espera_maxima"""
+        agora = time.time()
+        with self._lock, self._conexao:
+            for i in ids:
+                linha = self._conexao.execute('SELECT tentativas FROM alertas WHERE id = ?', (i,)).fetchone()
+                if linha is None:
+                    continue
+                espera = min(self.espera_inicial * 2 ** linha['tentativas'], self.espera_maxima)
+                self._conexao.execute(
+                    'UPDATE alertas SET tentativas = tentativas + 1, proxima_tentativa = ?, erro = ? WHERE id = ?',
+                    (agora + espera, erro, i))
+
+    def ultimo_recebido(self):
+        with self._lock:
+            return self._conexao.execute('SELECT MAX(recebido) FROM alertas').fetchone()[0]
+
+    def pendentes(self):
+        with self._lock:
+            return self._conexao.execute(
+                'SELECT COUNT(*) FROM alertas WHERE estado = ?', (PENDENTE,)).fetchone()[0]
+
+    def idade_mais_antigo(self):
+        """Segundos desde a detecção do pendente mais antigo (0 sem pendentes)"""
+        with self._lock:
+            recebido = self._conexao.execute(
+                'SELECT MIN(recebido) FROM alertas WHERE estado = ?', (PENDENTE,)).fetchone()[0]
+        return time.time() - recebido if recebido is not None else 0.0
+
+    def remover_enviados(self, mais_antigos_que):
+        """Esquece alertas resolvidos detectados há mais de mais_antigos_que segundos"""
+        with self._lock, self._conexao:
+            self._conexao.execute('DELETE FROM alertas WHERE estado != ? AND recebido < ?',
+                                  (PENDENTE, time.time() - mais_antigos_que))
+
+    def resumo(self):
+        return f"Alertas pendentes: {self.pendentes()} | mais antigo: {self.idade_mais_antigo():.0f} s"
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Situação da caixa de saída de alertas")
+    parser.add_argument('pasta', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'registros'))
+    args = parser.parse_args()
+
+    caixa = CaixaSaida(args.pasta)
+    print(caixa.resumo())
+    caixa.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+
+class CaixasArray:
+    """
+    Conjunto de caixas (x, y, w, h) guardado num array NumPy Nx4, com
+    sobreposição e IoU calculados de forma vetorizada.
+    """
+    def __init__(self, caixas=()):
+        self.dados = np.asarray(caixas, dtype=np.int64).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.dados)
+
+    def __iter__(self):
+        for x, y, w, h in self.dados.tolist():
+            yield (x, y, w, h)
+
+    def __getitem__(self, indices):
+        return CaixasArray(self.dados[indices])
+
+    def lista(self):
+        return list(self)
+
+    @property
+    def x(self):
+        return self.dados[:, 0]
+
+    @property
+    def y(self):
+        return self.dados[:, 1]
+
+    @property
+    def w(self):
+        return self.dados[:, 2]
+
+    @property
+    def h(self):
+        return self.dados[:, 3]
+
+    @property
+    def areas(self):
+        return self.w * self.h
+
+    def deslocar(self, dx, dy):
+        return CaixasArray(self.dados + (dx, dy, 0, 0))
+
+    def intersecoes(self, outras):
+        """Matriz NxM com a área de interseção entre cada par de caixas"""
+        a, b = self.dados[:, None, :], outras.dados[None, :, :]
+        largura = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+        altura = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+        return np.maximum(largura, 0) * np.maximum(altura, 0)
+
+    def iou(self, outras):
+        inter = self.intersecoes(outras)
+        uniao = self.areas[:, None] + outras.areas[None, :] - inter
+        return np.divide(inter, uniao, out=np.zeros(inter.shape), where=uniao > 0)
+
+    def mesclar(self):
+        """
+        Mescla gulosa em uma passada, da maior para a menor caixa: a atual
+        absorve, em ordem, as restantes que tocam a caixa já ampliada.
+        """
+        restantes = [tuple(c) for c in self.dados[np.argsort(-self.areas, kind='stable')].tolist()]
+        mescladas = []
+        while restantes:
+            x1, y1, w1, h1 = restantes.pop(0)
+            sobras = []
+            for (x2, y2, w2, h2) in restantes:
+                if x1 < x2 + w2 and x1 + w1 > x2 and y1 < y2 + h2 and y1 + h1 > y2:
+                    x1 = min(x1, x2)
+                    y1 = min(y1, y2)
+                    # Largura e altura medidas a partir do canto já atualizado,
+                    # como no laço original de mesclar_deteccoes
+                    w1 = max(x1 + w1, x2 + w2) - x1
+                    h1 = max(y1 + h1, y2 + h2) - y1
+                else:
+                    sobras.append((x2, y2, w2, h2))
+            restantes = sobras
+            mescladas.append((x1, y1, w1, h1))
+        return CaixasArray(mescladas)
+
+    def medias_na_mascara(self, mascara, escala=1.0):
+        """
+        Média da máscara dentro de cada caixa (recortada aos limites), via
+        imagem integral. Com a máscara reduzida pela escala de processamento,
+        as caixas em coordenadas do frame são levadas para a escala dela.
+        """
+        altura, largura = mascara.shape[:2]
+        x1 = np.clip(np.floor(self.x * escala).astype(np.int64), 0, largura)
+        y1 = np.clip(np.floor(self.y * escala).astype(np.int64), 0, altura)
+        x2 = np.clip(np.ceil((self.x + self.w) * escala).astype(np.int64), 0, largura)
+        y2 = np.clip(np.ceil((self.y + self.h) * escala).astype(np.int64), 0, altura)
+        area = (x2 - x1) * (y2 - y1)
+        integral = cv2.integral(mascara, sdepth=cv2.CV_64F)
+        soma = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+        # Caixas totalmente fora da máscara ficam com média 0
+        return np.divide(soma, area, out=np.zeros(len(self)), where=area > 0)
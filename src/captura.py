@@ -0,0 +1,107 @@
+import threading
+import time
+
+from src.metricas import Metricas
+
+
+class CapturaUltimoFrame:
+    """
+    Thread de captura que mantém apenas o frame mais recente da câmera.
+    O frame é lido com grab/retrieve logo que o driver o entrega, esvaziando
+    o buffer interno; se a análise ainda não consumiu o frame anterior, ele
+    é substituído e contado como descartado.
+    """
+    def __init__(self, cap, metricas=None):
+        self.cap = cap
+        self.metricas = metricas if metricas is not None else Metricas()
+        self._condicao = threading.Condition()
+        self._thread = None
+        self._rodando = False
+
+        # Slot único com o frame mais novo ainda não entregue
+        self._frame = None
+        self._timestamp = None
+
+        self.erro = None
+
+        # Contadores
+        self.frames_capturados = 0
+        self.frames_descartados = 0
+        self.frames_entregues = 0
+        self.idade_ultimo_frame = 0.0
+        self.idade_maxima = 0.0
+        self.soma_idades = 0.0
+
+    @property
+    def ativa(self):
+        return self._rodando
+
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name='captura', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _loop(self):
+        while self._rodando:
+            # grab() apenas avança o buffer do driver; o timestamp é tomado
+            # aqui para medir a idade real do frame
+            with self.metricas.etapa('captura'):
+                if not self.cap.grab():
+                    self.erro = "Erro ao ler frame da câmera"
+                    break
+                timestamp = time.monotonic()
+
+                ret, frame = self.cap.retrieve()
+                if not ret:
+                    self.erro = "Erro ao decodificar frame da câmera"
+                    break
+
+            with self._condicao:
+                if self._frame is not None:
+                    self.frames_descartados += 1
+                    self.metricas.incrementar('frames_descartados')
+                self._frame = frame
+                self._timestamp = timestamp
+                self.frames_capturados += 1
+                self._condicao.notify()
+
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+
+    def ler(self, timeout=1.0):
+        """
+        Aguarda e retorna (ok, frame, idade) com o frame mais recente.
+        A idade é o tempo em segundos entre a captura e a entrega à análise.
+        """
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._frame is not None or not self._rodando, timeout)
+            if self._frame is None:
+                return False, None, 0.0
+
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = None
+
+        idade = time.monotonic() - timestamp
+        self.frames_entregues += 1
+        self.idade_ultimo_frame = idade
+        self.metricas.registrar('idade_frame', idade)
+        self.idade_maxima = max(self.idade_maxima, idade)
+        self.soma_idades += idade
+        return True, frame, idade
+
+    def resumo(self):
+        idade_media = self.soma_idades / self.frames_entregues if self.frames_entregues else 0.0
+        return (f"Frames capturados: {self.frames_capturados} | "
+                f"analisados: {self.frames_entregues} | "
+                f"descartados: {self.frames_descartados} | "
+                f"idade média: {idade_media * 1000:.1f} ms | "
+                f"idade máxima: {self.idade_maxima * 1000:.1f} ms")
@@ -0,0 +1,245 @@
+"""
+Clipes de antes e depois de cada evento: os últimos segundos de frames
+ficam num buffer circular, reduzidos e em JPEG, com teto de memória. O
+loop só copia cada frame para uma fila curta; uma thread reduz e codifica,
+e com a fila cheia o frame fica fora do clipe em vez de atrasar o loop.
+Uma detecção congela o trecho anterior, junta os frames seguintes e manda
+o clipe para outra thread, que decodifica e grava o vídeo. O teto de
+memória vale para o buffer mais os clipes abertos ou ainda na fila.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from src.metricas import Metricas
+
+
+class BufferCircular:
+    """Frames (instante, JPEG) dos últimos segundos, limitados também em bytes"""
+    def __init__(self, segundos=5.0, escala=0.5, qualidade=70, limite_bytes=32 * 1024 * 1024):
+        self.segundos = segundos
+        self.escala = escala
+        self.parametros = [int(cv2.IMWRITE_JPEG_QUALITY), qualidade]
+        self.limite_bytes = limite_bytes
+        self.frames = deque()
+        self.total_bytes = 0
+        self._reduzido = None
+
+    def codificar(self, frame):
+        if self.escala != 1.0:
+            altura, largura = frame.shape[:2]
+            tamanho = (max(1, int(largura * self.escala)), max(1, int(altura * self.escala)))
+            if self._reduzido is None or self._reduzido.shape[:2] != tamanho[::-1]:
+                self._reduzido = np.empty((tamanho[1], tamanho[0], 3), np.uint8)
+            frame = cv2.resize(frame, tamanho, dst=self._reduzido, interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', frame, self.parametros)
+        return jpeg.tobytes() if ok else None
+
+    def adicionar(self, instante, jpeg, limite_bytes=None):
+        """Com limite_bytes, o buffer cede memória aos clipes e fica abaixo do teto dele"""
+        limite_bytes = self.limite_bytes if limite_bytes is None else min(limite_bytes, self.limite_bytes)
+        self.frames.append((instante, jpeg))
+        self.total_bytes += len(jpeg)
+        while self.frames and (self.total_bytes > limite_bytes or
+                               instante - self.frames[0][0] > self.segundos):
+            self.total_bytes -= len(self.frames.popleft()[1])
+
+    def desde(self, instante):
+        return [item for item in self.frames if item[0] >= instante]
+
+
+class _Clipe:
+    __slots__ = ('caminho', 'frames', 'fim', 'limite', 'bytes')
+
+    def __init__(self, caminho, frames, fim, limite):
+        self.caminho = caminho
+        self.frames = frames
+        self.fim = fim
+        self.limite = limite
+        self.bytes = sum(len(jpeg) for _, jpeg in frames)
+
+    def adicionar(self, instante, jpeg):
+        self.frames.append((instante, jpeg))
+        self.bytes += len(jpeg)
+
+
+class GravadorClipes:
+    """
+    Buffer circular mais a gravação dos clipes numa thread de fundo. Uma
+    detecção durante um clipe ainda aberto só estende o fim dele (até
+    duracao_maxima), então o mesmo clipe cobre a sequência de eventos.
+
+    limite_bytes vale para tudo o que está em memória: buffer, clipe aberto
+    e clipes esperando gravação. Frames que estão no buffer e no clipe ao
+    mesmo tempo contam duas vezes, então o teto é conservador. Passando
+    dele, o buffer encolhe e o clipe aberto é encerrado antes do fim.
+    Os frames esperando codificação ficam fora da conta, limitados pelo
+    tamanho da fila (fila_quadros).
+    """
+    def __init__(self, pre=5.0, pos=5.0, escala=0.5, qualidade=70, limite_bytes=32 * 1024 * 1024,
+                 duracao_maxima=30.0, metricas=None, fila_quadros=4):
+        self.pre = pre
+        self.pos = pos
+        self.duracao_maxima = duracao_maxima
+        self.limite_bytes = limite_bytes
+        self.buffer = BufferCircular(pre, escala, qualidade, limite_bytes)
+        self.metricas = metricas if metricas is not None else Metricas()
+        self.fila = queue.Queue()
+        self.quadros = queue.Queue(maxsize=fila_quadros)
+        self.ativo = None
+        self.gravados = 0
+        self.ao_gravar = None             # Chamado com (caminho, bytes) depois de cada clipe gravado
+        self.cortados = 0                 # Clipes encerrados pelo teto de memória
+        self.descartados = 0              # Frames que chegaram com a fila de codificação cheia
+        self._bytes_pendentes = 0         # Clipes fechados que a thread ainda não gravou
+        self._lock = threading.RLock()    # Buffer e clipe aberto, entre o loop e a codificação
+        self._thread = None
+        self._codificador = None
+
+    @property
+    def bytes_clipes(self):
+        """Memória dos frames do clipe aberto e dos que esperam gravação"""
+        return self._bytes_pendentes + (self.ativo.bytes if self.ativo is not None else 0)
+
+    @property
+    def total_bytes(self):
+        return self.buffer.total_bytes + self.bytes_clipes
+
+    def adicionar(self, frame, instante=None):
+        """
+        Chamado a cada frame do loop; só copia o frame (o loop reaproveita
+        os buffers) para a fila da thread de codificação, sem esperar
+        """
+        instante = time.monotonic() if instante is None else instante
+        if self._codificador is None:
+            self._codificador = threading.Thread(target=self._codificar, name='clipes-jpeg', daemon=True)
+            self._codificador.start()
+        try:
+            self.quadros.put_nowait((instante, frame.copy()))
+        except queue.Full:
+            self.descartados += 1
+            self.metricas.incrementar('clipe_frames_descartados')
+
+    def aguardar(self):
+        """Espera a codificação dos frames já entregues por adicionar"""
+        self.quadros.join()
+
+    def _codificar(self):
+        while True:
+            item = self.quadros.get()
+            try:
+                if item is None:
+                    break
+                instante, frame = item
+                with self.metricas.etapa('buffer_clipe'):
+                    jpeg = self.buffer.codificar(frame)
+                if jpeg is not None:
+                    with self._lock:
+                        self._guardar(instante, jpeg)
+            except Exception as e:
+                print(f"Erro ao codificar frame do clipe: {str(e)}")
+            finally:
+                self.quadros.task_done()
+
+    def _guardar(self, instante, jpeg):
+        self.buffer.adicionar(instante, jpeg, self.limite_bytes - self.bytes_clipes)
+
+        if self.ativo is not None:
+            if self.total_bytes + len(jpeg) > self.limite_bytes:
+                self.cortados += 1
+                print(f"Clipe {os.path.basename(self.ativo.caminho)} encerrado no teto de memória")
+                self._fechar()
+            else:
+                self.ativo.adicionar(instante, jpeg)
+                if instante >= self.ativo.fim:
+                    self._fechar()
+        self.metricas.definir('buffer_clipe_bytes', self.total_bytes)
+
+    def caminho_clipe(self, caminho):
+        """Caminho em que disparar(caminho) gravaria: o do clipe aberto, se houver"""
+        with self._lock:
+            return self.ativo.caminho if self.ativo is not None else caminho
+
+    def disparar(self, caminho, instante=None):
+        """
+        Abre (ou estende) o clipe do evento; retorna o caminho em que ele será
+        gravado. Um clipe estendido mantém o nome do evento que o abriu.
+        Frames ainda na fila de codificação entram depois no clipe aberto.
+        """
+        instante = time.monotonic() if instante is None else instante
+        with self._lock:
+            if self.ativo is not None:
+                self.ativo.fim = min(instante + self.pos, self.ativo.limite)
+                return self.ativo.caminho
+            frames = self.buffer.desde(instante - self.pre)
+            inicio = frames[0][0] if frames else instante
+            self.ativo = _Clipe(caminho, frames, instante + self.pos, inicio + self.duracao_maxima)
+            return caminho
+
+    def _fechar(self):
+        clipe, self.ativo = self.ativo, None
+        with self._lock:
+            self._bytes_pendentes += clipe.bytes
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='clipes', daemon=True)
+            self._thread.start()
+        self.fila.put(clipe)
+
+    def _loop(self):
+        while True:
+            clipe = self.fila.get()
+            if clipe is None:
+                break
+            inicio = time.perf_counter()
+            try:
+                self._gravar(clipe)
+                self.gravados += 1
+                if self.ao_gravar is not None and os.path.exists(clipe.caminho):
+                    self.ao_gravar(clipe.caminho, os.path.getsize(clipe.caminho))
+            except Exception as e:
+                print(f"Erro ao gravar clipe {clipe.caminho}: {str(e)}")
+            with self._lock:
+                self._bytes_pendentes -= clipe.bytes
+            self.metricas.registrar('gravacao_clipe', time.perf_counter() - inicio)
+
+    def _gravar(self, clipe):
+        if not clipe.frames:
+            return
+        primeiro = cv2.imdecode(np.frombuffer(clipe.frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        altura, largura = primeiro.shape[:2]
+        # FPS real do trecho, para o clipe tocar na velocidade da cena
+        duracao = clipe.frames[-1][0] - clipe.frames[0][0]
+        fps = min(60.0, max(1.0, (len(clipe.frames) - 1) / duracao)) if duracao > 0 else 10.0
+
+        # Temporário oculto renomeado no fim, como as fotos do gravador
+        pasta, nome = os.path.split(clipe.caminho)
+        temporario = os.path.join(pasta, f'.{nome}.tmp{os.path.splitext(nome)[1]}')
+        escritor = cv2.VideoWriter(temporario, cv2.VideoWriter_fourcc(*'MJPG'), fps, (largura, altura))
+        if not escritor.isOpened():
+            raise ValueError("Falha ao abrir o VideoWriter")
+        try:
+            escritor.write(primeiro)
+            for _, jpeg in clipe.frames[1:]:
+                escritor.write(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR))
+        finally:
+            escritor.release()
+        os.replace(temporario, clipe.caminho)
+
+    def parar(self):
+        """Codifica os frames na fila, fecha o clipe em andamento e espera a gravação dos pendentes"""
+        if self._codificador is not None:
+            self.quadros.put(None)
+            self._codificador.join()
+            self._codificador = None
+        with self._lock:
+            if self.ativo is not None:
+                self._fechar()
+        if self._thread is not None:
+            self.fila.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,114 @@
+"""
+Deduplicação de eventos quase idênticos (cortina balançando, monitor
+ligado): o dHash da região em volta das detecções é comparado com os
+hashes dos eventos recentes. Um evento parecido, com as detecções no mesmo
+lugar e o mesmo número de pessoas, vira repetição do anterior em vez de
+foto e alerta novos. Hash da região, e não do frame inteiro, para que uma
+pessoa nova no mesmo lugar mude o hash; e cada evento só absorve
+repetições por um tempo e uma quantidade limitados.
+"""
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from src.caixas import CaixasArray
+
+
+def dhash(imagem, lado=8):
+    """Hash de diferença de lado*lado bits; aceita imagem em cinza ou BGR"""
+    reduzida = cv2.resize(imagem, (lado + 1, lado), interpolation=cv2.INTER_AREA)
+    if reduzida.ndim == 3:
+        reduzida = cv2.cvtColor(reduzida, cv2.COLOR_BGR2GRAY)
+    bits = np.packbits(reduzida[:, 1:] > reduzida[:, :-1])
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def dhash_regiao(imagem, caixa, margem=0.25, lado=8):
+    """dHash do recorte em volta da caixa (x, y, w, h), com margem; sem caixa, da imagem inteira"""
+    if caixa is not None:
+        altura, largura = imagem.shape[:2]
+        x, y, w, h = caixa
+        mx, my = int(w * margem), int(h * margem)
+        x1, y1 = max(0, x - mx), max(0, y - my)
+        x2, y2 = min(largura, x + w + mx), min(altura, y + h + my)
+        if x2 > x1 and y2 > y1:
+            imagem = imagem[y1:y2, x1:x2]
+    return dhash(imagem, lado)
+
+
+def distancia_hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def caixa_envolvente(pessoas, objetos):
+    caixas = [p['corpo'] for p in pessoas] + list(objetos)
+    if not caixas:
+        return None
+    caixas = CaixasArray(caixas)
+    x1, y1 = caixas.x.min(), caixas.y.min()
+    x2, y2 = (caixas.x + caixas.w).max(), (caixas.y + caixas.h).max()
+    return (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+
+
+class EventoRecente:
+    __slots__ = ('hash', 'caixa', 'pessoas', 'caminho_foto', 'criado_em', 'visto_em', 'repeticoes')
+
+    def __init__(self, hash, caixa, pessoas, caminho_foto, visto_em):
+        self.hash = hash
+        self.caixa = caixa
+        self.pessoas = pessoas
+        self.caminho_foto = caminho_foto
+        self.criado_em = visto_em
+        self.visto_em = visto_em
+        self.repeticoes = 0
+
+
+class DeduplicadorEventos:
+    """
+    LRU dos últimos eventos salvos. Entradas sem repetição por validade
+    segundos expiram; mesmo repetidas, saem depois de idade_maxima segundos
+    ou max_repeticoes repetições, e a cena seguinte vira um evento novo.
+    """
+    def __init__(self, capacidade=16, distancia_maxima=6, iou_minimo=0.5, validade=600.0,
+                 idade_maxima=1800.0, max_repeticoes=100):
+        self.capacidade = capacidade
+        self.distancia_maxima = distancia_maxima
+        self.iou_minimo = iou_minimo
+        self.validade = validade
+        self.idade_maxima = idade_maxima
+        self.max_repeticoes = max_repeticoes
+        self.recentes = OrderedDict()
+
+    def _vencido(self, evento, agora):
+        return (agora - evento.visto_em > self.validade or agora - evento.criado_em > self.idade_maxima or
+                evento.repeticoes >= self.max_repeticoes)
+
+    def _expirar(self, agora):
+        for chave in [c for c, e in self.recentes.items() if self._vencido(e, agora)]:
+            del self.recentes[chave]
+
+    def procurar(self, hash, pessoas, objetos, agora=None):
+        """Evento recente do qual este é repetição, ou None"""
+        agora = time.monotonic() if agora is None else agora
+        self._expirar(agora)
+        caixa = caixa_envolvente(pessoas, objetos)
+        for chave, evento in reversed(self.recentes.items()):
+            if evento.pessoas != len(pessoas) or distancia_hamming(hash, evento.hash) > self.distancia_maxima:
+                continue
+            if caixa is not None and evento.caixa is not None and \
+                    CaixasArray([caixa]).iou(CaixasArray([evento.caixa]))[0, 0] < self.iou_minimo:
+                continue
+            evento.visto_em = agora
+            evento.repeticoes += 1
+            self.recentes.move_to_end(chave)
+            return evento
+        return None
+
+    def registrar(self, hash, pessoas, objetos, caminho_foto, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        self.recentes[caminho_foto] = EventoRecente(hash, caixa_envolvente(pessoas, objetos), len(pessoas),
+                                                    caminho_foto, agora)
+        while len(self.recentes) > self.capacidade:
+            self.recentes.popitem(last=False)
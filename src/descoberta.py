@@ -0,0 +1,184 @@
+"""
+Descoberta da câmera local: os índices são sondados ao mesmo tempo, um
+por thread daemon que tenta os backends daquele índice em sequência, e
+entre as combinações que entregam um frame vence a primeira na ordem de
+preferência (índice 0 com CAP_ANY antes de tudo). Uma sonda travada no
+VideoCapture não segura a inicialização: depois do timeout ela é
+abandonada e libera a câmera quando terminar. A configuração vencedora
+fica num JSON e é tentada sozinha no próximo início.
+"""
+import json
+import os
+import threading
+import time
+
+import cv2
+
+CACHE_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'camera_cache.json')
+
+# Backends tentados, na ordem de preferência; os indisponíveis na plataforma são ignorados
+BACKENDS = [
+    cv2.CAP_ANY,      # Deixar OpenCV escolher
+    cv2.CAP_DSHOW,    # DirectShow
+    cv2.CAP_MSMF,     # Media Foundation
+    cv2.CAP_V4L2,     # Video4Linux
+]
+
+
+def nome_backend(backend):
+    if backend == cv2.CAP_ANY:
+        return 'ANY'
+    try:
+        return cv2.videoio_registry.getBackendName(backend)
+    except cv2.error:
+        return str(backend)
+
+
+def backends_disponiveis():
+    disponiveis = set(cv2.videoio_registry.getCameraBackends())
+    return [b for b in BACKENDS if b == cv2.CAP_ANY or b in disponiveis]
+
+
+class CameraEncontrada:
+    """VideoCapture aberto e já com um frame lido, com a configuração negociada"""
+    def __init__(self, cap, indice, backend, largura, altura, fps, frame, tempo):
+        self.cap = cap
+        self.indice = indice
+        self.backend = backend
+        self.largura = largura
+        self.altura = altura
+        self.fps = fps
+        self.frame = frame
+        self.tempo = tempo
+
+    def configuracao(self):
+        return {'indice': self.indice, 'backend': self.backend,
+                'largura': self.largura, 'altura': self.altura, 'fps': self.fps}
+
+
+def sondar(indice, backend, largura, altura, fps):
+    """Abre, configura e lê um frame; retorna CameraEncontrada ou None"""
+    inicio = time.monotonic()
+    cap = cv2.VideoCapture(indice, backend)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, largura)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, altura)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    ok, frame = cap.read()
+    if not ok:
+        cap.release()
+        return None
+    return CameraEncontrada(cap, indice, backend,
+                            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                            int(cap.get(cv2.CAP_PROP_FPS)), frame, time.monotonic() - inicio)
+
+
+def sondar_em_paralelo(candidatos, timeout=3.0):
+    """
+    Sonda (indice, backend, largura, altura, fps) em paralelo entre índices;
+    os backends de um mesmo índice são tentados um de cada vez, na ordem,
+    para o dispositivo não ser aberto por dois backends ao mesmo tempo.
+    Entre as câmeras que entregam frame dentro do timeout vence a primeira
+    na ordem dos candidatos, a mesma preferência da busca sequencial; a
+    espera acaba antes se todos os candidatos à frente dela já falharam. As
+    demais câmeras abertas, inclusive as que respondem depois, são liberadas.
+    """
+    resultados = [None] * len(candidatos)   # None: pendente, False: falhou ou não foi preciso
+    condicao = threading.Condition()
+    encerrada = []
+
+    por_indice = {}
+    for posicao, candidato in enumerate(candidatos):
+        por_indice.setdefault(candidato[0], []).append(posicao)
+
+    def trabalho(posicoes):
+        for n, posicao in enumerate(posicoes):
+            with condicao:
+                if encerrada:
+                    return
+            candidato = candidatos[posicao]
+            try:
+                camera = sondar(*candidato)
+            except Exception as e:
+                print(f"Erro ao tentar câmera {candidato[0]} com backend {nome_backend(candidato[1])}: {str(e)}")
+                camera = None
+            with condicao:
+                if not encerrada:
+                    resultados[posicao] = camera if camera is not None else False
+                    if camera is not None:
+                        # Backends seguintes deste índice não seriam preferidos a este
+                        for seguinte in posicoes[n + 1:]:
+                            resultados[seguinte] = False
+                    condicao.notify()
+                    if camera is None:
+                        continue
+                    return
+            # Depois da escolha (ou do timeout) a câmera só é liberada
+            if camera is not None:
+                camera.cap.release()
+            return
+
+    def decidida():
+        for resultado in resultados:
+            if resultado is None:
+                return False     # um candidato preferido ainda pode responder
+            if resultado is not False:
+                return True
+        return True              # todos falharam
+
+    for indice, posicoes in por_indice.items():
+        threading.Thread(target=trabalho, args=(posicoes,), name=f'sonda-{indice}', daemon=True).start()
+
+    with condicao:
+        condicao.wait_for(decidida, timeout)
+        encerrada.append(True)
+        abertas = [resultado for resultado in resultados if resultado]
+    for camera in abertas[1:]:
+        camera.cap.release()
+    return abertas[0] if abertas else None
+
+
+def ler_cache(caminho):
+    try:
+        with open(caminho, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def salvar_cache(caminho, configuracao):
+    temporario = caminho + '.tmp'
+    try:
+        with open(temporario, 'w') as f:
+            json.dump(configuracao, f, indent=2)
+        os.replace(temporario, caminho)
+    except OSError as e:
+        print(f"Erro ao salvar cache da câmera: {str(e)}")
+
+
+def descobrir_camera(indices=range(2), largura=640, altura=480, fps=30, timeout=3.0, cache=CACHE_PADRAO):
+    """Câmera do cache, se ainda responder; senão, todas as combinações, com os índices em paralelo"""
+    inicio = time.monotonic()
+    camera = None
+
+    salva = ler_cache(cache) if cache else None
+    if salva and salva.get('indice') in indices:
+        print(f"Tentando câmera {salva['indice']} com backend {nome_backend(salva['backend'])} (cache)")
+        camera = sondar_em_paralelo([(salva['indice'], salva['backend'], salva.get('largura', largura),
+                                      salva.get('altura', altura), salva.get('fps', fps))], timeout)
+
+    if camera is None:
+        candidatos = [(i, b, largura, altura, fps) for b in backends_disponiveis() for i in indices]
+        print(f"Sondando {len(candidatos)} combinações de câmera e backend, com os índices em paralelo")
+        camera = sondar_em_paralelo(candidatos, timeout)
+
+    if camera is None:
+        return None
+
+    print(f"Câmera {camera.indice} aberta com backend {nome_backend(camera.backend)}: "
+          f"primeiro frame em {time.monotonic() - inicio:.2f} s")
+    if cache and camera.configuracao() != salva:
+        salvar_cache(cache, camera.configuracao())
+    return camera
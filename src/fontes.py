@@ -0,0 +1,125 @@
+import os
+
+import cv2
+
+from src.descoberta import CACHE_PADRAO, descobrir_camera
+
+
+class FonteFrames:
+    """
+    Origem de frames com a mesma interface de leitura do cv2.VideoCapture
+    (grab/retrieve/read), usada pela captura e pelo modo de reprodução.
+    """
+    ao_vivo = False
+
+    def __init__(self):
+        self.cap = None
+        self.largura = 0
+        self.altura = 0
+        self.fps = 0
+
+    def abrir(self):
+        raise NotImplementedError
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self):
+        return self.cap.retrieve()
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def liberar(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _ler_propriedades(self):
+        self.largura = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.altura = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = int(self.cap.get(cv2.CAP_PROP_FPS))
+
+
+class FonteCamera(FonteFrames):
+    """Câmera local, descoberta em paralelo entre backends e índices (com cache)"""
+    ao_vivo = True
+
+    def __init__(self, indices=range(2), largura=640, altura=480, fps=30, timeout=3.0, cache=CACHE_PADRAO):
+        super().__init__()
+        self.indices = indices
+        self.largura_desejada = largura
+        self.altura_desejada = altura
+        self.fps_desejado = fps
+        self.timeout = timeout
+        self.cache = cache
+
+    def abrir(self):
+        camera = descobrir_camera(self.indices, self.largura_desejada, self.altura_desejada,
+                                  self.fps_desejado, self.timeout, self.cache)
+        if camera is None:
+            raise Exception("Não foi possível acessar nenhuma câmera. Verifique se a câmera está conectada e funcionando.")
+
+        self.cap = camera.cap
+        self._ler_propriedades()
+
+
+class FonteVideo(FonteFrames):
+    """Arquivo de vídeo gravado (ou URL de stream suportada pelo OpenCV)"""
+    def __init__(self, caminho):
+        super().__init__()
+        self.caminho = caminho
+
+    def abrir(self):
+        self.cap = cv2.VideoCapture(self.caminho)
+        if not self.cap.isOpened():
+            raise Exception(f"Não foi possível abrir o vídeo: {self.caminho}")
+        self._ler_propriedades()
+
+
+class FonteSequencia(FonteFrames):
+    """Pasta de imagens, lidas em ordem alfabética"""
+    extensoes = ('.jpg', '.jpeg', '.png', '.bmp')
+
+    def __init__(self, pasta, fps=30):
+        super().__init__()
+        self.pasta = pasta
+        self.fps = fps
+        self.arquivos = []
+        self._indice = -1
+
+    def abrir(self):
+        self.arquivos = sorted(
+            os.path.join(self.pasta, f) for f in os.listdir(self.pasta)
+            if f.lower().endswith(self.extensoes)
+        )
+        if not self.arquivos:
+            raise Exception(f"Nenhuma imagem encontrada em: {self.pasta}")
+
+        primeiro = cv2.imread(self.arquivos[0])
+        if primeiro is None:
+            raise Exception(f"Não foi possível ler a imagem: {self.arquivos[0]}")
+        self.altura, self.largura = primeiro.shape[:2]
+        self._indice = -1
+
+    def grab(self):
+        self._indice += 1
+        return self._indice < len(self.arquivos)
+
+    def retrieve(self):
+        frame = cv2.imread(self.arquivos[self._indice])
+        return frame is not None, frame
+
+    def liberar(self):
+        self.arquivos = []
+
+
+def abrir_fonte(origem):
+    """Cria a fonte adequada: índice de câmera, pasta de imagens ou arquivo de vídeo"""
+    if isinstance(origem, int) or str(origem).isdigit():
+        return FonteCamera(indices=[int(origem)])
+    if os.path.isdir(origem):
+        return FonteSequencia(origem)
+    return FonteVideo(origem)
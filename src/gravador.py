@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+import time
+
+from src.artefato import ArtefatoEvento
+from src.metricas import Metricas
+
+
+def escrever_atomico(caminho, dados, modo='wb'):
+    """
+    Escreve num temporário oculto na mesma pasta e renomeia, para que quem
+    observa a pasta nunca veja o arquivo pela metade.
+    """
+    pasta, nome = os.path.split(caminho)
+    temporario = os.path.join(pasta, f'.{nome}.tmp')
+    with open(temporario, modo) as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+
+class GravadorAssincrono:
+    """
+    Codifica os artefatos do evento e grava fotos e log numa thread de
+    fundo, com fila limitada. As fotos são publicadas antes do .txt, que é
+    o gatilho dos consumidores da pasta registros.
+    """
+    def __init__(self, capacidade=8, qualidade=95, metricas=None):
+        self.fila = queue.Queue(maxsize=capacidade)
+        self.qualidade = qualidade
+        self.metricas = metricas if metricas is not None else Metricas()
+        self.descartados = 0
+        self.previa = None                # ServidorPrevia que reaproveita o JPEG do evento
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='gravador', daemon=True)
+                self._thread.start()
+
+    def enfileirar(self, caminho_foto, frame, caminho_txt, texto, copiar=True, indice=None, evento=None):
+        """
+        Agenda a gravação; retorna False se a fila estiver cheia. Com um
+        IndiceEventos, o evento é indexado depois que os arquivos existem.
+        """
+        self.iniciar()
+        # O frame costuma ser um buffer reutilizado pelo loop
+        if copiar:
+            frame = frame.copy()
+        try:
+            self.fila.put_nowait((caminho_foto, frame, caminho_txt, texto, indice, evento))
+        except queue.Full:
+            self.descartados += 1
+            self.metricas.incrementar('gravacoes_descartadas')
+            print(f"Fila de gravação cheia, registro descartado: {caminho_foto}")
+            return False
+        self.metricas.definir('fila_gravacao', self.fila.qsize())
+        return True
+
+    def _loop(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                break
+            inicio = time.perf_counter()
+            try:
+                self._gravar(*item)
+            except Exception as e:
+                print(f"Erro ao gravar registro {item[0]}: {str(e)}")
+            self.metricas.registrar('gravacao', time.perf_counter() - inicio)
+            self.metricas.definir('fila_gravacao', self.fila.qsize())
+
+    def _gravar(self, caminho_foto, frame, caminho_txt, texto, indice, evento):
+        caixas = (evento or {}).get('caixas') or {}
+        artefato = ArtefatoEvento(frame, caixas.get('pessoas', []) + caixas.get('objetos', []),
+                                  qualidade=self.qualidade)
+        for caminho, dados in artefato.variantes(caminho_foto):
+            escrever_atomico(caminho, dados)
+        escrever_atomico(caminho_foto, artefato.jpeg)
+        escrever_atomico(caminho_txt, texto, 'w')
+        if self.previa is not None:
+            self.previa.publicar_jpeg(artefato.jpeg)
+
+        if indice is not None:
+            indice.registrar(caminho_foto=caminho_foto, caminho_txt=caminho_txt,
+                             bytes_foto=artefato.tamanho, **(evento or {}))
+
+    def parar(self):
+        """Grava o que ainda estiver na fila e encerra a thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self.fila.put(None)
+            thread.join()
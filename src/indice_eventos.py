@@ -0,0 +1,275 @@
+"""
+Índice SQLite dos eventos gravados na pasta registros, usado pelo envio
+de alertas e pela limpeza no lugar de varreduras da pasta.
+
+Reconstrução a partir de uma pasta existente (na raiz do projeto):
+    python -m src.indice_eventos --reconstruir [pasta_registros]
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+
+NOME_ARQUIVO = 'eventos.db'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    camera TEXT NOT NULL DEFAULT '',
+    pessoas INTEGER NOT NULL DEFAULT 0,
+    objetos INTEGER NOT NULL DEFAULT 0,
+    caixas TEXT,
+    caminho_foto TEXT NOT NULL UNIQUE,
+    caminho_txt TEXT,
+    bytes_foto INTEGER NOT NULL DEFAULT 0,
+    bytes_txt INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_timestamp ON eventos (timestamp);
+"""
+
+# Colunas acrescentadas depois da primeira versão; bancos antigos ganham-nas ao abrir
+_COLUNAS_NOVAS = (
+    ('trilhas', 'TEXT'),
+    ('caminho_clipe', 'TEXT'),
+    ('repeticoes', 'INTEGER NOT NULL DEFAULT 0'),
+    ('ultima_repeticao', 'REAL'),
+    ('bytes_clipe', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+_PADRAO_FOTO = re.compile(r'^(\d{8}_\d{6})_movimento\.jpg$')
+
+
+class IndiceEventos:
+    """
+    Eventos com data, câmera, contagens, caixas, caminhos e tamanhos. Os
+    caminhos são guardados relativos à pasta registros onde fica o banco.
+    """
+    def __init__(self, pasta_registros):
+        self.pasta_registros = pasta_registros
+        self.caminho_db = os.path.join(pasta_registros, NOME_ARQUIVO)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho_db, timeout=10, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('PRAGMA synchronous=NORMAL')
+        self._conexao.executescript(_ESQUEMA)
+        self._migrar()
+
+    def _migrar(self):
+        existentes = {linha[1] for linha in self._conexao.execute('PRAGMA table_info(eventos)')}
+        with self._conexao:
+            for nome, tipo in _COLUNAS_NOVAS:
+                if nome not in existentes:
+                    self._conexao.execute(f'ALTER TABLE eventos ADD COLUMN {nome} {tipo}')
+
+    def _relativo(self, caminho):
+        return os.path.relpath(caminho, self.pasta_registros) if caminho else caminho
+
+    def absoluto(self, caminho):
+        return os.path.join(self.pasta_registros, caminho) if caminho else caminho
+
+    def _evento(self, linha):
+        evento = dict(linha)
+        evento['caminho_foto'] = self.absoluto(evento['caminho_foto'])
+        evento['caminho_txt'] = self.absoluto(evento['caminho_txt'])
+        evento['caminho_clipe'] = self.absoluto(evento['caminho_clipe'])
+        evento['caixas'] = json.loads(evento['caixas']) if evento['caixas'] else None
+        evento['trilhas'] = json.loads(evento['trilhas']) if evento['trilhas'] else None
+        return evento
+
+    def registrar(self, timestamp, caminho_foto, caminho_txt, camera='', pessoas=0, objetos=0,
+                  caixas=None, bytes_foto=None, bytes_txt=None, trilhas=None,
+                  caminho_clipe=None):
+        if bytes_foto is None:
+            bytes_foto = tamanho_foto(caminho_foto)
+        if bytes_txt is None:
+            bytes_txt = os.path.getsize(caminho_txt) if caminho_txt and os.path.exists(caminho_txt) else 0
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                'INSERT OR REPLACE INTO eventos (timestamp, camera, pessoas, objetos, caixas, '
+                'caminho_foto, caminho_txt, bytes_foto, bytes_txt, trilhas, caminho_clipe) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (timestamp, camera, pessoas, objetos, json.dumps(caixas) if caixas is not None else None,
+                 self._relativo(caminho_foto), self._relativo(caminho_txt), bytes_foto, bytes_txt,
+                 json.dumps(trilhas) if trilhas is not None else None, self._relativo(caminho_clipe))
+            )
+
+    def registrar_clipe(self, caminho_clipe, bytes_clipe):
+        """
+        Tamanho do clipe gravado depois do evento. Um clipe estendido por
+        eventos seguintes conta só no evento que o abriu (mesmo prefixo).
+        """
+        with self._lock, self._conexao:
+            self._conexao.execute('UPDATE eventos SET bytes_clipe = ? WHERE caminho_foto = ?',
+                                  (bytes_clipe, self._relativo(foto_do_clipe(caminho_clipe))))
+
+    def registrar_repeticao(self, caminho_foto, timestamp):
+        """Um evento quase igual a este foi descartado como repetição"""
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                'UPDATE eventos SET repeticoes = repeticoes + 1, ultima_repeticao = ? WHERE caminho_foto = ?',
+                (timestamp, self._relativo(caminho_foto)))
+
+    def ultimo(self):
+        with self._lock:
+            linha = self._conexao.execute(
+                'SELECT * FROM eventos ORDER BY timestamp DESC, id DESC LIMIT 1').fetchone()
+        return self._evento(linha) if linha else None
+
+    def por_foto(self, caminho_foto):
+        with self._lock:
+            linha = self._conexao.execute(
+                'SELECT * FROM eventos WHERE caminho_foto = ?', (self._relativo(caminho_foto),)).fetchone()
+        return self._evento(linha) if linha else None
+
+    def desde(self, timestamp):
+        """Eventos posteriores a timestamp, do mais antigo ao mais novo"""
+        with self._lock:
+            linhas = self._conexao.execute(
+                'SELECT * FROM eventos WHERE timestamp > ? ORDER BY timestamp, id', (timestamp,)).fetchall()
+        return [self._evento(linha) for linha in linhas]
+
+    def mais_antigos(self, limite):
+        with self._lock:
+            linhas = self._conexao.execute(
+                'SELECT * FROM eventos ORDER BY timestamp, id LIMIT ?', (limite,)).fetchall()
+        return [self._evento(linha) for linha in linhas]
+
+    def tamanho_total(self):
+        with self._lock:
+            total = self._conexao.execute(
+                'SELECT COALESCE(SUM(bytes_foto + bytes_txt + bytes_clipe), 0) FROM eventos').fetchone()[0]
+        return total
+
+    def quantidade(self):
+        with self._lock:
+            return self._conexao.execute('SELECT COUNT(*) FROM eventos').fetchone()[0]
+
+    def remover(self, ids):
+        with self._lock, self._conexao:
+            self._conexao.executemany('DELETE FROM eventos WHERE id = ?', [(i,) for i in ids])
+
+    def remover_por_foto(self, caminhos_foto):
+        with self._lock, self._conexao:
+            self._conexao.executemany('DELETE FROM eventos WHERE caminho_foto = ?',
+                                      [(self._relativo(c),) for c in caminhos_foto])
+
+    def reconstruir(self):
+        """Recria o índice a partir das fotos e logs existentes na pasta"""
+        eventos = []
+        for raiz, _, arquivos in os.walk(self.pasta_registros):
+            for arquivo in arquivos:
+                encontrado = _PADRAO_FOTO.match(arquivo)
+                if not encontrado:
+                    continue
+                caminho_foto = os.path.join(raiz, arquivo)
+                caminho_txt = caminho_foto[:-len('.jpg')] + '.txt'
+                data = datetime.datetime.strptime(encontrado.group(1), "%Y%m%d_%H%M%S")
+                pessoas, objetos = ler_contagens(caminho_txt)
+                caminho_clipe = ler_clipe(caminho_txt)
+                if caminho_clipe:
+                    caminho_clipe = os.path.join(raiz, caminho_clipe)
+                # Mesmos tamanhos que o gravador registra ao vivo, mais o clipe aberto por este evento
+                bytes_clipe = 0
+                if caminho_clipe and foto_do_clipe(caminho_clipe) == caminho_foto and os.path.exists(caminho_clipe):
+                    bytes_clipe = os.path.getsize(caminho_clipe)
+                camera = os.path.relpath(raiz, self.pasta_registros)
+                eventos.append((
+                    data.timestamp(), '' if camera == '.' else camera, pessoas, objetos,
+                    self._relativo(caminho_foto),
+                    self._relativo(caminho_txt) if os.path.exists(caminho_txt) else None,
+                    tamanho_foto(caminho_foto),
+                    os.path.getsize(caminho_txt) if os.path.exists(caminho_txt) else 0,
+                    self._relativo(caminho_clipe),
+                    bytes_clipe,
+                ))
+
+        with self._lock, self._conexao:
+            # Caixas, trilhas e repetições não estão nos arquivos: manter as já indexadas
+            anteriores = {
+                linha[0]: linha[1:] for linha in self._conexao.execute(
+                    'SELECT caminho_foto, caixas, trilhas, repeticoes, ultima_repeticao FROM eventos')
+            }
+            self._conexao.execute('DELETE FROM eventos')
+            self._conexao.executemany(
+                'INSERT OR REPLACE INTO eventos (timestamp, camera, pessoas, objetos, '
+                'caminho_foto, caminho_txt, bytes_foto, bytes_txt, caminho_clipe, bytes_clipe, '
+                'caixas, trilhas, repeticoes, ultima_repeticao) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [evento + anteriores.get(evento[4], (None, None, 0, None)) for evento in eventos]
+            )
+        return len(eventos)
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+def timestamp_evento(caminho_foto):
+    """Instante da detecção pelo nome da foto (AAAAMMDD_HHMMSS_movimento.jpg), ou None"""
+    encontrado = _PADRAO_FOTO.match(os.path.basename(caminho_foto))
+    if not encontrado:
+        return None
+    return datetime.datetime.strptime(encontrado.group(1), "%Y%m%d_%H%M%S").timestamp()
+
+
+def tamanho_foto(caminho_foto):
+    """Bytes da foto mais as variantes leves gravadas ao lado dela (ArtefatoEvento.tamanho)"""
+    # Importado aqui: src.artefato traz o OpenCV, que o índice não precisa para abrir
+    from src.artefato import SUFIXO_MINIATURA, SUFIXO_RECORTE, caminho_variante
+    total = os.path.getsize(caminho_foto)
+    for sufixo in (SUFIXO_RECORTE, SUFIXO_MINIATURA):
+        variante = caminho_variante(caminho_foto, sufixo)
+        if os.path.exists(variante):
+            total += os.path.getsize(variante)
+    return total
+
+
+def foto_do_clipe(caminho_clipe):
+    """Foto do evento que abriu o clipe (mesmo prefixo)"""
+    return os.path.splitext(caminho_clipe)[0] + '.jpg'
+
+
+def ler_contagens(caminho_txt):
+    """Pessoas e objetos a partir do log de texto de um evento"""
+    pessoas = objetos = 0
+    if caminho_txt and os.path.exists(caminho_txt):
+        with open(caminho_txt, 'r') as f:
+            for linha in f:
+                if linha.startswith("Pessoas detectadas:"):
+                    pessoas = int(linha.split(':', 1)[1])
+                elif linha.startswith("Objetos detectados:"):
+                    objetos = int(linha.split(':', 1)[1])
+    return pessoas, objetos
+
+
+def ler_clipe(caminho_txt):
+    """Nome do clipe registrado no log de texto do evento, se houver"""
+    if caminho_txt and os.path.exists(caminho_txt):
+        with open(caminho_txt, 'r') as f:
+            for linha in f:
+                if linha.startswith("Clipe:"):
+                    return linha.split(':', 1)[1].strip()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de eventos da pasta registros")
+    parser.add_argument('pasta', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'registros'))
+    parser.add_argument('--reconstruir', action='store_true', help="Recriar o índice a partir da pasta")
+    args = parser.parse_args()
+
+    indice = IndiceEventos(args.pasta)
+    if args.reconstruir:
+        print(f"Eventos indexados: {indice.reconstruir()}")
+    print(f"Eventos no índice: {indice.quantidade()} ({indice.tamanho_total() / (1024 * 1024):.1f} MB)")
+    indice.fechar()
+
+
+if __name__ == "__main__":
+    main()
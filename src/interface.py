@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import messagebox
-from src.monitoramento import nomeMonitoramento
 
 class nomeInterface:
     def __init__(self):
@@ -8,9 +7,16 @@ class nomeInterface:
         self.root.title("nome - Monitoramento")
         self.root.geometry("400x300")
         
-        self.monitoramento = nomeMonitoramento()
+        self._monitoramento = None        # Criado ao escolher um modo (OpenCV e modelos sob demanda)
         self.criar_interface_principal()
 
+    @property
+    def monitoramento(self):
+        if self._monitoramento is None:
+            from src.monitoramento import nomeMonitoramento
+            self._monitoramento = nomeMonitoramento()
+        return self._monitoramento
+
     def criar_interface_principal(self):
         # Limpar janela atual
         for widget in self.root.winfo_children():
@@ -1,11 +1,57 @@
+import argparse
 import os
 import sys
 
 # Adicionar diretório raiz ao PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from src.interface import nomeInterface
+from src.perfil_inicio import PerfilInicio
+
+
+def perfilar_inicio():
+    """Mede importações, criação da interface e do monitor e carga dos modelos, e sai"""
+    perfil = PerfilInicio()
+    for modulo in ('tkinter', 'numpy', 'cv2', 'src.monitoramento', 'src.interface'):
+        perfil.importar(modulo)
+    from src.interface import nomeInterface
+    try:
+        with perfil.etapa('nomeInterface()'):
+            interface = nomeInterface()
+        interface.root.destroy()
+    except Exception as e:
+        print(f"Interface não criada ({str(e)}); seguindo sem ela")
+    from src.monitoramento import nomeMonitoramento
+    with perfil.etapa('nomeMonitoramento()'):
+        monitor = nomeMonitoramento()
+    monitor.carregar_modelos()
+    perfil.modelos()
+    print(perfil.relatorio())
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="nome - Monitoramento")
+    parser.add_argument('--metricas-arquivo', help="Exportar métricas por etapa no formato Prometheus neste arquivo")
+    parser.add_argument('--metricas-porta', type=int, help="Servir métricas em http://127.0.0.1:PORTA/metrics")
+    parser.add_argument('--zonas', help="JSON com as zonas de interesse/exclusão (entrada 'padrao')")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Mostrar o tempo de importações e carga dos modelos e sair")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        perfilar_inicio()
+        sys.exit(0)
+
+    from src.interface import nomeInterface
     interface = nomeInterface()
-    interface.iniciar()
+    metricas = args.metricas_arquivo or args.metricas_porta
+    if metricas:
+        interface.monitoramento.ativar_metricas(args.metricas_arquivo, args.metricas_porta)
+    if args.zonas:
+        from src.zonas import carregar_zonas
+        interface.monitoramento.definir_zonas(carregar_zonas(args.zonas))
+    try:
+        interface.iniciar()
+    finally:
+        # Fechar a janela sem ter iniciado o monitoramento também faz a exportação final
+        if metricas:
+            interface.monitoramento.metricas.parar()
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Contexto reutilizado quando a instrumentação está desligada
+_NULO = nullcontext()
+
+PREFIXO = 'monitoramento'
+QUANTIS = (0.5, 0.95, 0.99)
+
+
+class HistogramaLatencia:
+    """Janela deslizante das últimas amostras, com contagem e soma acumuladas"""
+    def __init__(self, janela=1024):
+        self.amostras = deque(maxlen=janela)
+        self.contagem = 0
+        self.soma = 0.0
+
+    def registrar(self, segundos):
+        self.amostras.append(segundos)
+        self.contagem += 1
+        self.soma += segundos
+
+    def quantis(self, quantis=QUANTIS):
+        ordenadas = sorted(self.amostras)
+        if not ordenadas:
+            return {q: 0.0 for q in quantis}
+        return {q: ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] for q in quantis}
+
+
+class _Cronometro:
+    __slots__ = ('metricas', 'nome', 'inicio')
+
+    def __init__(self, metricas, nome):
+        self.metricas = metricas
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metricas.registrar(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+class Metricas:
+    """
+    Temporizadores por etapa do loop, contadores e medidores, exportados no
+    formato texto do Prometheus. Desligada, etapa() devolve um contexto nulo.
+    """
+    def __init__(self, ativo=False, janela=1024):
+        self.ativo = ativo
+        self.janela = janela
+        self.etapas = {}
+        self.contadores = {}
+        self.medidores = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread_exportacao = None
+        self._caminho_exportacao = None
+        self._servidor = None
+
+    def etapa(self, nome):
+        if not self.ativo:
+            return _NULO
+        return _Cronometro(self, nome)
+
+    def registrar(self, nome, segundos):
+        if not self.ativo:
+            return
+        with self._lock:
+            histograma = self.etapas.get(nome)
+            if histograma is None:
+                histograma = self.etapas[nome] = HistogramaLatencia(self.janela)
+            histograma.registrar(segundos)
+
+    def incrementar(self, nome, valor=1):
+        if not self.ativo:
+            return
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + valor
+
+    def definir(self, nome, valor):
+        if not self.ativo:
+            return
+        self.medidores[nome] = valor
+
+    def texto_prometheus(self):
+        with self._lock:
+            etapas = {nome: (h.quantis(), h.soma, h.contagem) for nome, h in self.etapas.items()}
+            contadores = dict(self.contadores)
+        medidores = dict(self.medidores)
+
+        linhas = [
+            f"# HELP {PREFIXO}_etapa_segundos Latência por etapa do loop de monitoramento",
+            f"# TYPE {PREFIXO}_etapa_segundos summary",
+        ]
+        for nome, (quantis, soma, contagem) in sorted(etapas.items()):
+            for q, valor in quantis.items():
+                linhas.append(f'{PREFIXO}_etapa_segundos{{etapa="{nome}",quantile="{q}"}} {valor:.6f}')
+            linhas.append(f'{PREFIXO}_etapa_segundos_sum{{etapa="{nome}"}} {soma:.6f}')
+            linhas.append(f'{PREFIXO}_etapa_segundos_count{{etapa="{nome}"}} {contagem}')
+        for nome, valor in sorted(contadores.items()):
+            linhas.append(f"# TYPE {PREFIXO}_{nome}_total counter")
+            linhas.append(f"{PREFIXO}_{nome}_total {valor}")
+        for nome, valor in sorted(medidores.items()):
+            linhas.append(f"# TYPE {PREFIXO}_{nome} gauge")
+            linhas.append(f"{PREFIXO}_{nome} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def resumo(self):
+        with self._lock:
+            etapas = {nome: (h.quantis(), h.contagem) for nome, h in self.etapas.items()}
+        linhas = []
+        for nome, (quantis, contagem) in sorted(etapas.items()):
+            p50, p95, p99 = (quantis[q] * 1000 for q in QUANTIS)
+            linhas.append(f"{nome:<26} n={contagem:<6} p50 {p50:7.2f} ms | p95 {p95:7.2f} ms | p99 {p99:7.2f} ms")
+        return "\n".join(linhas)
+
+    def exportar_arquivo(self, caminho):
+        # Escrita atômica para o coletor nunca ler um arquivo pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w') as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+
+    def exportar(self):
+        """Exporta para o arquivo configurado, se houver; erro de escrita só é avisado"""
+        if self._caminho_exportacao is None:
+            return
+        try:
+            self.exportar_arquivo(self._caminho_exportacao)
+        except OSError as e:
+            print(f"Erro ao exportar métricas: {str(e)}")
+
+    def iniciar_exportacao(self, caminho, intervalo=15):
+        self._parar.clear()
+        self._caminho_exportacao = caminho
+
+        def loop():
+            while not self._parar.wait(intervalo):
+                self.exportar()
+            # Exportação final ao parar, com os números do fim da execução
+            self.exportar()
+
+        self._thread_exportacao = threading.Thread(target=loop, name='metricas', daemon=True)
+        self._thread_exportacao.start()
+
+    def iniciar_servidor(self, porta, host='127.0.0.1'):
+        metricas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                corpo = metricas.texto_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((host, porta), Handler)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name='metricas-http', daemon=True).start()
+        print(f"Métricas disponíveis em http://{host}:{porta}/metrics")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread_exportacao is not None:
+            self._thread_exportacao.join(timeout=2)
+            self._thread_exportacao = None
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
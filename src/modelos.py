@@ -0,0 +1,43 @@
+"""
+Modelos dos detectores carregados no primeiro uso e compartilhados pelo
+processo: vários monitores usam o mesmo CascadeClassifier e o mesmo
+HOGDescriptor em vez de ler o XML e o SVM cada um.
+"""
+import threading
+import time
+
+import cv2
+
+_lock = threading.Lock()
+_modelos = {}
+
+# Tempo de carga de cada modelo, para o relatório de inicialização
+TEMPOS_CARGA = {}
+
+
+def _carregar(chave, fabrica):
+    with _lock:
+        modelo = _modelos.get(chave)
+        if modelo is None:
+            inicio = time.perf_counter()
+            modelo = _modelos[chave] = fabrica()
+            TEMPOS_CARGA[chave] = time.perf_counter() - inicio
+        return modelo
+
+
+def carregar_cascade(caminho):
+    def fabrica():
+        cascade = cv2.CascadeClassifier(caminho)
+        if cascade.empty():
+            raise ValueError(f"Erro ao carregar o arquivo Haar Cascade em: {caminho}")
+        return cascade
+    return _carregar(('haar', caminho), fabrica)
+
+
+def carregar_hog():
+    def fabrica():
+        # Detector HOG para corpo inteiro
+        hog = cv2.HOGDescriptor()
+        hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        return hog
+    return _carregar(('hog', 'pessoas'), fabrica)
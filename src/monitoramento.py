@@ -3,24 +3,36 @@ import numpy as np
 import datetime
 import os
 import time
+from src.captura import CapturaUltimoFrame
+from src.preprocessamento import FramePreprocessado
+from src.buffers import PoolBuffers
+from src.clipes import GravadorClipes
+from src.deduplicacao import DeduplicadorEventos, caixa_envolvente, dhash_regiao
+from src.caixas import CaixasArray
+from src.fontes import FonteCamera
+from src.metricas import Metricas
+from src.gravador import GravadorAssincrono
+from src.indice_eventos import IndiceEventos
+from src.modelos import carregar_cascade, carregar_hog
+from src.movimento import criar_motor
+from src.rastreamento import Rastreador
 
 class nomeMonitoramento:
-    def __init__(self, pasta_registros='../registros', rosto_cascade_path='assets/haarcascade_frontalface_default.xml'):
+    def __init__(self, pasta_registros=None, rosto_cascade_path='assets/haarcascade_frontalface_default.xml',
+                 indice=None, camera=''):
         # Usar caminho relativo para pasta registros na raiz
-        pasta_registros = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'registros')
+        if pasta_registros is None:
+            pasta_registros = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'registros')
         os.makedirs(pasta_registros, exist_ok=True)
         self.pasta_registros = pasta_registros
         
-        # Carregar os classificadores
+        # Classificadores carregados no primeiro uso (src.modelos), compartilhados no processo
         cascade_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), rosto_cascade_path)
-        self.rosto_cascade = cv2.CascadeClassifier(cascade_path)
-        
-        if self.rosto_cascade.empty():
+        if not os.path.exists(cascade_path):
             raise ValueError(f"Erro ao carregar o arquivo Haar Cascade em: {cascade_path}")
-        
-        # Adicionar detector HOG para corpo inteiro
-        self.hog = cv2.HOGDescriptor()
-        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.caminho_cascade = cascade_path
+        self._rosto_cascade = None
+        self._hog = None
         
         # Ajustar parâmetros
         self.area_minima_objeto = 2500
@@ -28,26 +40,132 @@ class nomeMonitoramento:
         self.limiar_movimento = 25
         self.min_movimento = 20
         self.historia_movimento = 30
-        self.skip_frames = 2
+        self.skip_frames = 2              # Frames sem Haar/HOG entre os keyframes, com trilhas ativas
         self.margem_pessoa = 40
         self.confianca_pessoa = 0.2       # Reduzir para detectar mais pessoas
         self.min_movimento_pessoa = 20
-        self.tamanho_buffer = 3
         self.frame_count = 0
-        self.ultimo_frame = None
-        self.buffer_deteccoes = []        # Buffer para estabilizar detecções
+        self.rastreamento = True          # Manter identidades entre passadas do detector
+        self.rastreadores = {'pessoa': Rastreador(), 'objeto': Rastreador()}
+        self.passadas_detector = 0
+        self.passadas_poupadas = 0
         self.frame_atual = None
         self.modo_automatico = False
         self.modo_manual = False
         self.ultima_detecao = None
         self.monitorando = False
         self.intervalo_fotos = 5  # intervalo em segundos entre fotos
+        self.deteccao_por_regiao = True   # Rodar Haar/HOG só em recortes com movimento
+        self.margem_regiao = 32           # Margem em pixels ao redor do movimento
+        self.kernel_movimento = np.ones((3, 3), np.uint8)
+        self.buffers = None               # PoolBuffers criado ao abrir a câmera
+        self.gravar_registros = True      # Salvar fotos e logs em 'registros'
+        self.metricas = Metricas()        # Instrumentação por etapa (desligada)
+        self.gravador = GravadorAssincrono(metricas=self.metricas)
+        self.indice = indice              # IndiceEventos, aberto no primeiro registro
+        self.camera = camera
+        self.zonas = None                 # ZonasCamera com áreas de interesse/exclusão
+        self.recorte_zona = None          # (x, y, w, h) do frame que contém as zonas
+        self.mascara_zona = None          # Zonas rasterizadas na escala de processamento
+        self.exibicao = None              # Frame de exibição inteiro quando há recorte
+        self.tamanho_frame = None
+        self.sem_janela = False           # Modo serviço: sem imshow/waitKey nem pausa no loop
+        self.previa = None                # ServidorPrevia MJPEG opcional
+        self.clipes = None                # GravadorClipes de antes/depois dos eventos
+        self.deduplicador = DeduplicadorEventos()  # Eventos quase iguais aos recentes viram repetições
+        self.definir_motor_movimento('diferenca')
+
+    @property
+    def rosto_cascade(self):
+        if self._rosto_cascade is None:
+            self._rosto_cascade = carregar_cascade(self.caminho_cascade)
+        return self._rosto_cascade
+
+    @property
+    def hog(self):
+        if self._hog is None:
+            self._hog = carregar_hog()
+        return self._hog
+
+    def carregar_modelos(self):
+        """Antecipa a carga dos detectores (ex.: nos processos trabalhadores)"""
+        return self.rosto_cascade, self.hog
+
+    def definir_motor_movimento(self, nome, escala=0.5, **parametros):
+        """Troca o motor de movimento (diferenca, mog2 ou media) e a escala em que ele trabalha"""
+        if nome == 'mog2':
+            parametros.setdefault('historia', self.historia_movimento)
+        self.motor_movimento = criar_motor(nome, escala, limiar=self.limiar_movimento, **parametros)
+        # Buffers e máscara das zonas de outra escala não servem mais
+        if self.tamanho_frame is not None:
+            self.criar_buffers(*self.tamanho_frame)
+
+    def definir_zonas(self, zonas):
+        """Zonas de interesse/exclusão (ZonasCamera); rasterizadas com a resolução da fonte"""
+        self.zonas = zonas or None
+        if self.tamanho_frame is not None:
+            self.criar_buffers(*self.tamanho_frame)
+
+    def criar_buffers(self, largura, altura):
+        """Buffers do loop e máscara das zonas, calculados uma vez por resolução"""
+        escala = self.motor_movimento.escala
+        self.tamanho_frame = (largura, altura)
+        self.recorte_zona = self.mascara_zona = None
+        if self.zonas:
+            recorte, self.mascara_zona = self.zonas.rasterizar(largura, altura, escala)
+            if recorte is None:
+                raise ValueError("As zonas configuradas não deixam nenhuma área para analisar")
+            if recorte != (0, 0, largura, altura):
+                self.recorte_zona = recorte
         
-        self.fundo_subtrator = cv2.createBackgroundSubtractorMOG2(
-            detectShadows=False,
-            history=self.historia_movimento,
-            varThreshold=self.limiar_movimento
-        )
+        # Só o recorte passa pelo pipeline; a exibição continua com o frame inteiro
+        _, _, w, h = self.recorte_zona or (0, 0, largura, altura)
+        self.buffers = PoolBuffers(w, h, escala)
+        self.exibicao = np.empty((altura, largura, 3), np.uint8) if self.recorte_zona else None
+        self.motor_movimento.reiniciar()
+
+    def recortar_zona(self, frame):
+        """Recorte do frame com as zonas (sem cópia) e o deslocamento dele no frame"""
+        if self.recorte_zona is None:
+            return frame, (0, 0)
+        x, y, w, h = self.recorte_zona
+        return frame[y:y+h, x:x+w], (x, y)
+
+    def deslocar_deteccoes(self, contornos, pessoas, deslocamento):
+        """Leva contornos e pessoas das coordenadas do recorte para as do frame"""
+        dx, dy = deslocamento
+        if not dx and not dy:
+            return contornos, pessoas
+        for c in contornos:
+            c += (dx, dy)
+        pessoas = [{
+            'corpo': (p['corpo'][0] + dx, p['corpo'][1] + dy, p['corpo'][2], p['corpo'][3]),
+            'rosto': (p['rosto'][0] + dx, p['rosto'][1] + dy, p['rosto'][2], p['rosto'][3]),
+        } for p in pessoas]
+        return contornos, pessoas
+
+    def preprocessar(self, frame):
+        return FramePreprocessado(frame, escala=self.motor_movimento.escala, buffers=self.buffers)
+
+    def ativar_clipes(self, pre=5.0, pos=5.0, limite_mb=32, escala=0.5):
+        """Guarda os últimos segundos em memória e grava um clipe em volta de cada evento"""
+        self.clipes = GravadorClipes(pre, pos, escala=escala, limite_bytes=int(limite_mb * 1024 * 1024),
+                                     metricas=self.metricas)
+        self.clipes.ao_gravar = self.clipe_gravado
+
+    def clipe_gravado(self, caminho_clipe, tamanho):
+        """Chamado pela thread dos clipes: o tamanho do clipe entra no índice"""
+        if self.indice is None:
+            self.indice = IndiceEventos(self.pasta_registros)
+        self.indice.registrar_clipe(caminho_clipe, tamanho)
+
+    def ativar_metricas(self, arquivo=None, porta=None, intervalo=15):
+        """Liga a instrumentação por etapa, exportando para arquivo e/ou HTTP local"""
+        self.metricas.ativo = True
+        if arquivo:
+            self.metricas.iniciar_exportacao(arquivo, intervalo)
+        if porta:
+            self.metricas.iniciar_servidor(porta)
 
     def verificar_horario_operacao(self):
         # Se estiver em modo manual, sempre permitir operação
@@ -61,129 +179,231 @@ class nomeMonitoramento:
             
         return False  # Se não estiver em nenhum modo, não operar
 
-    def detectar_movimento_significativo(self, frame):
-        frame_pequeno = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        cinza = cv2.cvtColor(frame_pequeno, cv2.COLOR_BGR2GRAY)
-        cinza = cv2.GaussianBlur(cinza, (11, 11), 0)  # Reduzir kernel do blur
+    def detectar_movimento_significativo(self, frame, preproc=None):
+        if preproc is None:
+            preproc = FramePreprocessado(frame, escala=self.motor_movimento.escala)
+        with self.metricas.etapa('redimensionar_borrar'):
+            cinza = preproc.borrado
         
-        if self.ultimo_frame is None:
-            self.ultimo_frame = cinza
-            return False, [], cinza
+        # Com o pool de buffers, cada etapa escreve no seu array preallocado
+        buffers = preproc.buffers
         
-        # Detectar movimento
-        diff_frame = cv2.absdiff(self.ultimo_frame, cinza)
-        self.ultimo_frame = cinza
+        with self.metricas.etapa('diferenca_limiar_dilatar'):
+            # Máscara de primeiro plano do motor escolhido
+            thresh = self.motor_movimento.mascara(cinza, buffers)
+            if thresh is None:
+                return False, [], cinza
+            # Movimento fora das zonas de interesse é descartado
+            if self.mascara_zona is not None and thresh.shape == self.mascara_zona.shape:
+                cv2.bitwise_and(thresh, self.mascara_zona, dst=thresh)
+            thresh = cv2.dilate(thresh, self.kernel_movimento, iterations=3,  # Aumentar iterações
+                                dst=buffers.dilatado if buffers else None)
         
-        # Threshold mais sensível
-        thresh = cv2.threshold(diff_frame, self.limiar_movimento, 255, cv2.THRESH_BINARY)[1]
-        kernel = np.ones((3,3), np.uint8)
-        thresh = cv2.dilate(thresh, kernel, iterations=3)  # Aumentar iterações
+        with self.metricas.etapa('contornos'):
+            contornos, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        contornos, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Áreas e coordenadas voltam da escala de processamento para o frame original
+        fator = 1.0 / preproc.escala
+        fator_area = fator * fator
         
         contornos_significativos = []
         for c in contornos:
-            area = cv2.contourArea(c) * 4
+            area = cv2.contourArea(c) * fator_area
             if area > self.area_minima_objeto:
                 # Verificar movimento na região
                 x, y, w, h = cv2.boundingRect(c)
                 roi = thresh[y:y+h, x:x+w]
-                if np.mean(roi) > self.min_movimento:
-                    c = c * 2  # Ajustar para tamanho original
+                if cv2.mean(roi)[0] > self.min_movimento:
+                    np.multiply(c, fator, out=c, casting='unsafe')  # Ajustar para tamanho original
                     contornos_significativos.append(c)
         
         return len(contornos_significativos) > 0, contornos_significativos, thresh
 
+    def iniciar_quadro(self):
+        """Avança a contagem de frames e descarta trilhas abandonadas"""
+        self.frame_count += 1
+        for rastreador in self.rastreadores.values():
+            rastreador.avancar()
+
+    def precisa_detectar(self, caixas_movimento):
+        """
+        Haar/HOG só rodam nos keyframes, quando alguma pessoa some do detector
+        ou quando aparece movimento fora das trilhas já conhecidas.
+        """
+        pessoas = self.rastreadores['pessoa']
+        objetos = self.rastreadores['objeto']
+        if not self.rastreamento or not (pessoas.trilhas or objetos.trilhas):
+            return True
+        if self.frame_count % (self.skip_frames + 1) == 0 or pessoas.perdidas:
+            return True
+        return not (pessoas.cobertas(caixas_movimento) | objetos.cobertas(caixas_movimento)).all()
+
+    def manter_trilhas(self, caixas_movimento):
+        """Frame sem detector: pessoas estimadas pelas trilhas com movimento sobre elas"""
+        self.rastreadores['objeto'].manter(caixas_movimento)
+        pessoas = []
+        for trilha in self.rastreadores['pessoa'].manter(caixas_movimento):
+            pessoa = dict(trilha.dados or {'corpo': trilha.caixa, 'rosto': trilha.caixa})
+            pessoa['id'] = trilha.id
+            pessoas.append(pessoa)
+        return pessoas
+
     def estabilizar_deteccoes(self, deteccoes_atuais, tipo='objeto'):
-        if not deteccoes_atuais:
-            return []
-            
-        self.buffer_deteccoes.append(deteccoes_atuais)
-        if len(self.buffer_deteccoes) > self.tamanho_buffer:
-            self.buffer_deteccoes.pop(0)
-        
-        return deteccoes_atuais  # Retornar detecções sem estabilização por enquanto
+        """Associa as detecções às trilhas do tipo e retorna os ids delas"""
+        rastreador = self.rastreadores[tipo]
+        if tipo == 'pessoa':
+            ids = rastreador.atualizar([p['corpo'] for p in deteccoes_atuais], deteccoes_atuais)
+            for pessoa, id_trilha in zip(deteccoes_atuais, ids):
+                pessoa['id'] = id_trilha
+            return ids
+        return rastreador.atualizar(deteccoes_atuais)
 
-    def detectar_pessoas(self, frame, mascara_movimento):
-        pessoas_detectadas = []
+    def detectar_pessoas(self, frame, mascara_movimento, regiao=None, preproc=None):
+        if preproc is None:
+            preproc = FramePreprocessado(frame)
         
-        # 1. Primeiro tentar detectar rostos
-        cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        cinza = cv2.equalizeHist(cinza)
+        # Restringir os detectores a um recorte do frame, se informado
+        if regiao is not None:
+            rx0, ry0, rw0, rh0 = regiao
+            imagem = frame[ry0:ry0+rh0, rx0:rx0+rw0]
+            cinza = preproc.equalizado[ry0:ry0+rh0, rx0:rx0+rw0]
+        else:
+            rx0, ry0 = 0, 0
+            imagem = frame
+            cinza = preproc.equalizado
         
-        rostos = self.rosto_cascade.detectMultiScale(
-            cinza,
-            scaleFactor=1.2,
-            minNeighbors=4,
-            minSize=(25, 25),
-            maxSize=(150, 150)
-        )
+        # 1. Primeiro tentar detectar rostos
+        with self.metricas.etapa('haar'):
+            rostos = self.rosto_cascade.detectMultiScale(
+                cinza,
+                scaleFactor=1.2,
+                minNeighbors=4,
+                minSize=(25, 25),
+                maxSize=(150, 150)
+            )
         
         # 2. Detectar corpos (sempre)
-        corpos, weights = self.hog.detectMultiScale(
-            frame,
-            winStride=(4, 4),
-            padding=(8, 8),
-            scale=1.05
-        )
-        
-        # Processar detecções de corpo primeiro
-        for (x, y, w, h), peso in zip(corpos, weights):
-            if peso > self.confianca_pessoa:
-                area = w * h
-                if area > self.area_minima_pessoa:
-                    # Verificar movimento na região
-                    roi = mascara_movimento[y:y+h, x:x+w]
-                    if roi.size > 0 and np.mean(roi) > self.min_movimento_pessoa:
-                        # Procurar rosto próximo
-                        rosto_encontrado = False
-                        for (rx, ry, rw, rh) in rostos:
-                            if (rx > x - w//4 and rx < x + w and
-                                ry > y - h//4 and ry < y + h):
-                                pessoas_detectadas.append({
-                                    'corpo': (x, y, w, h),
-                                    'rosto': (rx, ry, rw, rh)
-                                })
-                                rosto_encontrado = True
-                                break
-                        
-                        # Se não encontrou rosto, mas detectou corpo em movimento
-                        if not rosto_encontrado:
-                            # Criar área estimada do rosto
-                            rosto_y = max(0, y + h//4)
-                            rosto_h = h//4
-                            rosto_w = w//3
-                            rosto_x = x + (w - rosto_w)//2
-                            
-                            pessoas_detectadas.append({
-                                'corpo': (x, y, w, h),
-                                'rosto': (rosto_x, rosto_y, rosto_w, rosto_h)
-                            })
-        
-        # 3. Processar rostos que não foram associados a corpos
-        for (x, y, w, h) in rostos:
-            ja_detectado = False
-            for pessoa in pessoas_detectadas:
-                rx, ry, rw, rh = pessoa['rosto']
-                if abs(x - rx) < w and abs(y - ry) < h:
-                    ja_detectado = True
-                break
+        with self.metricas.etapa('hog'):
+            corpos, weights = self.hog.detectMultiScale(
+                imagem,
+                winStride=(4, 4),
+                padding=(8, 8),
+                scale=1.05
+            )
+        
+        # Voltar as caixas do recorte para coordenadas do frame
+        rostos = CaixasArray(rostos).deslocar(rx0, ry0)
+        corpos = CaixasArray(corpos).deslocar(rx0, ry0)
+        
+        return self.associar_pessoas(corpos, weights, rostos, mascara_movimento, frame.shape)
+
+    def associar_pessoas(self, corpos, pesos, rostos, mascara_movimento, shape):
+        pessoas_detectadas = []
+        # A máscara está na escala de processamento do motor; as caixas, na do frame
+        escala = mascara_movimento.shape[1] / float(shape[1])
+        
+        # Corpos confiáveis, grandes o bastante e com movimento na região
+        pesos = np.asarray(pesos, dtype=np.float64).reshape(-1)
+        validos = (pesos > self.confianca_pessoa) & (corpos.areas > self.area_minima_pessoa)
+        corpos = corpos[validos]
+        if len(corpos):
+            corpos = corpos[corpos.medias_na_mascara(mascara_movimento, escala) > self.min_movimento_pessoa]
+        
+        if len(corpos):
+            # Primeiro rosto próximo de cada corpo, se houver
+            x, y, w, h = (v[:, None] for v in (corpos.x, corpos.y, corpos.w, corpos.h))
+            proximo = ((rostos.x > x - w//4) & (rostos.x < x + w) &
+                       (rostos.y > y - h//4) & (rostos.y < y + h))
+            tem_rosto = proximo.any(axis=1)
+            indice_rosto = proximo.argmax(axis=1) if len(rostos) else np.zeros(len(corpos), np.int64)
             
-            if not ja_detectado:
-                roi_rosto = mascara_movimento[y:y+h, x:x+w]
-                if roi_rosto.size > 0 and np.mean(roi_rosto) > self.min_movimento_pessoa:
-                    # Expandir área para corpo
-                    y2 = min(frame.shape[0], y + h * 3)
-                    x1 = max(0, x - w//2)
-                    x2 = min(frame.shape[1], x + w + w//2)
-                    
-                    pessoas_detectadas.append({
-                        'corpo': (x1, y, x2-x1, y2-y),
-                        'rosto': (x, y, w, h)
-                    })
+            for i, (x, y, w, h) in enumerate(corpos):
+                if tem_rosto[i]:
+                    rosto = tuple(rostos.dados[indice_rosto[i]].tolist())
+                else:
+                    # Corpo em movimento sem rosto: criar área estimada do rosto
+                    rosto_y = max(0, y + h//4)
+                    rosto_h = h//4
+                    rosto_w = w//3
+                    rosto_x = x + (w - rosto_w)//2
+                    rosto = (rosto_x, rosto_y, rosto_w, rosto_h)
+                
+                pessoas_detectadas.append({
+                    'corpo': (x, y, w, h),
+                    'rosto': rosto
+                })
+        
+        # Rostos que não foram associados a corpos
+        if len(rostos):
+            movimento = rostos.medias_na_mascara(mascara_movimento, escala) > self.min_movimento_pessoa
+            # Cada rosto é comparado só com a primeira pessoa da lista; sem
+            # corpos, ela passa a ser o primeiro rosto aceito
+            if pessoas_detectadas:
+                rx, ry = pessoas_detectadas[0]['rosto'][:2]
+                primeiro = None
+            else:
+                primeiro = int(movimento.argmax())
+                rx, ry = rostos.x[primeiro], rostos.y[primeiro]
+            ja_detectado = (np.abs(rostos.x - rx) < rostos.w) & (np.abs(rostos.y - ry) < rostos.h)
+            if primeiro is not None:
+                ja_detectado[primeiro] = False
+            rostos = rostos[movimento & ~ja_detectado]
+        if len(rostos):
+            for (x, y, w, h) in rostos:
+                # Expandir área para corpo
+                y2 = min(shape[0], y + h * 3)
+                x1 = max(0, x - w//2)
+                x2 = min(shape[1], x + w + w//2)
+                
+                pessoas_detectadas.append({
+                    'corpo': (x1, y, x2-x1, y2-y),
+                    'rosto': (x, y, w, h)
+                })
         
         return pessoas_detectadas
 
+    def regioes_de_movimento(self, contornos, shape):
+        """Recortes do frame, com margem, ao redor dos contornos de movimento mesclados"""
+        altura, largura = shape[:2]
+        # A janela do HOG tem 64x128; recortes menores nunca teriam detecção
+        min_w, min_h = 64 + 16, 128 + 16
+        
+        regioes = []
+        for (x, y, w, h) in self.mesclar_deteccoes([cv2.boundingRect(c) for c in contornos]):
+            x1 = max(0, x - self.margem_regiao)
+            y1 = max(0, y - self.margem_regiao)
+            x2 = min(largura, x + w + self.margem_regiao)
+            y2 = min(altura, y + h + self.margem_regiao)
+            
+            # Expandir em volta do centro até o tamanho mínimo
+            if x2 - x1 < min_w:
+                x1 = max(0, min(x1 - (min_w - (x2 - x1)) // 2, largura - min_w))
+                x2 = min(largura, x1 + min_w)
+            if y2 - y1 < min_h:
+                y1 = max(0, min(y1 - (min_h - (y2 - y1)) // 2, altura - min_h))
+                y2 = min(altura, y1 + min_h)
+            
+            regioes.append((x1, y1, x2 - x1, y2 - y1))
+        
+        # As margens podem fazer recortes vizinhos se tocarem
+        return self.mesclar_deteccoes(regioes)
+
+    def localizar_pessoas(self, frame, movimento_detectado, contornos, mascara_movimento, preproc=None):
+        if preproc is None:
+            preproc = FramePreprocessado(frame)
+        
+        if not self.deteccao_por_regiao:
+            return self.detectar_pessoas(frame, mascara_movimento, preproc=preproc)
+        
+        # Sem movimento significativo não há o que procurar
+        if not movimento_detectado:
+            return []
+        
+        pessoas = []
+        for regiao in self.regioes_de_movimento(contornos, frame.shape):
+            pessoas.extend(self.detectar_pessoas(frame, mascara_movimento, regiao, preproc))
+        return pessoas
+
     def verificar_sobreposicao(self, det1, det2):
         x1, y1, w1, h1 = det1
         x2, y2, w2, h2 = det2
@@ -193,144 +413,209 @@ class nomeMonitoramento:
                 abs(y1 - y2) < (h1 + h2)/2 + 50)
 
     def mesclar_deteccoes(self, deteccoes):
-        if not deteccoes:
+        if len(deteccoes) == 0:
             return []
         
-        # Mesclar detecções sobrepostas
-        deteccoes_mescladas = []
-        deteccoes = sorted(deteccoes, key=lambda x: x[2] * x[3], reverse=True)
-        
-        while deteccoes:
-            atual = deteccoes.pop(0)
-            x1, y1, w1, h1 = atual
+        # Mesclar detecções sobrepostas, partindo da maior área
+        return CaixasArray(deteccoes).mesclar().lista()
+
+    def classificar_deteccoes(self, shape, pessoas, contornos):
+        """Objetos em movimento válidos: nem pequenos/grandes demais nem sobre pessoas"""
+        objetos_validos = []
+        caixas = CaixasArray([cv2.boundingRect(c) for c in contornos])
+        if len(caixas):
+            # Filtrar objetos muito pequenos ou muito grandes
+            area_minima = shape[0] * shape[1] * 0.001  # 0.1% da imagem
+            area_maxima = shape[0] * shape[1] * 0.5    # 50% da imagem
+            areas = caixas.areas
+            validos = (area_minima < areas) & (areas < area_maxima)
             
-            # Verificar sobreposição com outras detecções
-            i = 0
-            while i < len(deteccoes):
-                x2, y2, w2, h2 = deteccoes[i]
-                
-                # Se houver sobreposição significativa
-                if (x1 < x2 + w2 and x1 + w1 > x2 and
-                    y1 < y2 + h2 and y1 + h1 > y2):
-                    # Usar a maior área
-                    x1 = min(x1, x2)
-                    y1 = min(y1, y2)
-                    w1 = max(x1 + w1, x2 + w2) - x1
-                    h1 = max(y1 + h1, y2 + h2) - y1
-                    deteccoes.pop(i)
-                else:
-                    i += 1
+            # Descartar objetos que se sobrepõem a pessoas
+            if pessoas:
+                caixas_pessoas = CaixasArray([p['corpo'] for p in pessoas])
+                limite = 0.3 * np.minimum(areas[:, None], caixas_pessoas.areas[None, :])
+                validos &= ~(caixas.intersecoes(caixas_pessoas) > limite).any(axis=1)
             
-            deteccoes_mescladas.append((x1, y1, w1, h1))
+            objetos_validos = [(x, y, w, h) for (x, y, w, h) in caixas[validos]]
         
-        return deteccoes_mescladas
+        return objetos_validos, pessoas
 
-    def desenhar_deteccoes(self, frame, pessoas, contornos):
-        objetos_validos = []
-        
-        # Primeiro, processar as pessoas detectadas
-        areas_pessoas = []
+    def desenhar_anotacoes(self, frame, pessoas, objetos):
         for pessoa in pessoas:
-            rx, ry, rw, rh = pessoa['rosto']
             cx, cy, cw, ch = pessoa['corpo']
             
             # Desenhar retângulo do corpo
             cv2.rectangle(frame, (cx, cy), (cx + cw, cy + ch), (0, 0, 255), 2)
-            cv2.putText(frame, "Pessoa em movimento", (cx, cy-10), 
+            rotulo = f"Pessoa em movimento #{pessoa['id']}" if 'id' in pessoa else "Pessoa em movimento"
+            cv2.putText(frame, rotulo, (cx, cy-10), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-            
-            # Guardar área da pessoa para comparação
-            areas_pessoas.append((cx, cy, cw, ch))
-        
-        # Depois, processar os contornos de movimento
-        for contorno in contornos:
-            x, y, w, h = cv2.boundingRect(contorno)
-            area_objeto = w * h
-            
-            # Filtrar objetos muito pequenos ou muito grandes
-            area_minima = frame.shape[0] * frame.shape[1] * 0.001  # 0.1% da imagem
-            area_maxima = frame.shape[0] * frame.shape[1] * 0.5    # 50% da imagem
-            
-            if area_minima < area_objeto < area_maxima:
-                # Verificar sobreposição com pessoas
-                sobrepoe_pessoa = False
-                for px, py, pw, ph in areas_pessoas:
-                    x_overlap = max(0, min(x + w, px + pw) - max(x, px))
-                    y_overlap = max(0, min(y + h, py + ph) - max(y, py))
-                    area_overlap = x_overlap * y_overlap
-                    
-                    if area_overlap > 0.3 * min(area_objeto, pw * ph):
-                        sobrepoe_pessoa = True
-                        break
-                
-                # Se não sobrepõe com pessoa, marcar como objeto
-                if not sobrepoe_pessoa:
-                    objetos_validos.append((x, y, w, h))
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    cv2.putText(frame, "Objeto em movimento", (x, y-10), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
+        for (x, y, w, h) in objetos:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(frame, "Objeto em movimento", (x, y-10), 
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+    def desenhar_deteccoes(self, frame, pessoas, contornos):
+        objetos_validos, pessoas = self.classificar_deteccoes(frame.shape, pessoas, contornos)
+        self.desenhar_anotacoes(frame, pessoas, objetos_validos)
         return objetos_validos, pessoas
 
-    def salvar_deteccoes(self, frame, movimento_detectado, pessoas, objetos):
+    def registro_pendente(self, agora=None):
+        """Se uma detecção agora seria salva (já passou o intervalo entre fotos)"""
+        agora = agora or datetime.datetime.now()
+        return (not self.ultima_detecao or
+                (agora - self.ultima_detecao).total_seconds() > self.intervalo_fotos)
+
+    def registrar_repeticao(self, evento, agora):
+        """Conta a repetição no evento original, sem foto nem alerta novos"""
+        self.ultima_detecao = agora
+        self.metricas.incrementar('registros_repetidos')
+        if self.indice is None:
+            self.indice = IndiceEventos(self.pasta_registros)
+        self.indice.registrar_repeticao(evento.caminho_foto, agora.timestamp())
+        print(f"Repetição de {os.path.basename(evento.caminho_foto)} ({evento.repeticoes}x)")
+
+    def salvar_deteccoes(self, frame, movimento_detectado, pessoas, objetos, ids_objetos=None, original=None):
         agora = datetime.datetime.now()
         
         if len(pessoas) > 0 or len(objetos) > 0:
-            if (not self.ultima_detecao or 
-                (agora - self.ultima_detecao).total_seconds() > self.intervalo_fotos):
+            if self.registro_pendente(agora):
+                
+                # Cena quase igual a um evento recente: só conta a repetição
+                hash_frame = None
+                if self.deduplicador is not None:
+                    with self.metricas.etapa('deduplicacao'):
+                        # Hash da região das detecções no frame sem anotações, se houver
+                        hash_frame = dhash_regiao(original if original is not None else frame,
+                                                  caixa_envolvente(pessoas, objetos))
+                        repetido = self.deduplicador.procurar(hash_frame, pessoas, objetos)
+                    if repetido is not None:
+                        self.registrar_repeticao(repetido, agora)
+                        return
                 
                 prefixo = agora.strftime("%Y%m%d_%H%M%S")
                 caminho_foto = os.path.join(self.pasta_registros, f'{prefixo}_movimento.jpg')
-                cv2.imwrite(caminho_foto, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                caminho_txt = os.path.join(self.pasta_registros, f'{prefixo}_movimento.txt')
                 
                 # Log mais detalhado
-                with open(os.path.join(self.pasta_registros, f'{prefixo}_movimento.txt'), 'w') as f:
-                    f.write(f"Detecção em: {agora}\n")
-                    if len(pessoas) > 0:
-                        f.write(f"Pessoas detectadas: {len(pessoas)}\n")
-                    if len(objetos) > 0:
-                        f.write(f"Objetos detectados: {len(objetos)}\n")
+                texto = f"Detecção em: {agora}\n"
+                if len(pessoas) > 0:
+                    texto += f"Pessoas detectadas: {len(pessoas)}\n"
+                if len(objetos) > 0:
+                    texto += f"Objetos detectados: {len(objetos)}\n"
+                ids_pessoas = [p['id'] for p in pessoas if 'id' in p]
+                ids_objetos = [i for i in (ids_objetos or []) if i is not None]
+                if ids_pessoas or ids_objetos:
+                    texto += (f"Trilhas: pessoas {', '.join(map(str, ids_pessoas)) or '-'}"
+                              f" | objetos {', '.join(map(str, ids_objetos)) or '-'}\n")
                 
-                self.ultima_detecao = agora
-                print(f"Detecção salva em: {caminho_foto}")
-
-    def iniciar_monitoramento(self):
-        try:
-            # Tentar diferentes backends e índices de câmera
-            cap = None
-            backends = [
-                cv2.CAP_ANY,      # Deixar OpenCV escolher
-                cv2.CAP_DSHOW,    # DirectShow
-                cv2.CAP_MSMF      # Media Foundation
-            ]
-            
-            for backend in backends:
-                for camera_index in range(2):
-                    try:
-                        print(f"Tentando câmera {camera_index} com backend {backend}")
-                        cap = cv2.VideoCapture(camera_index + backend)
-                        if cap is not None and cap.isOpened():
-                            print(f"Câmera {camera_index} aberta com sucesso usando backend {backend}")
-                            break
-                    except Exception as e:
-                        print(f"Erro ao tentar câmera {camera_index} com backend {backend}: {str(e)}")
-                        continue
+                # O clipe é gravado depois, quando terminar o trecho posterior ao evento;
+                # só é disparado se o evento entrar na fila do gravador
+                caminho_clipe = None
+                if self.clipes is not None:
+                    caminho_clipe = self.clipes.caminho_clipe(os.path.join(self.pasta_registros,
+                                                                           f'{prefixo}_movimento.avi'))
+                    texto += f"Clipe: {os.path.basename(caminho_clipe)}\n"
                 
-                if cap is not None and cap.isOpened():
-                    break
+                if self.indice is None:
+                    self.indice = IndiceEventos(self.pasta_registros)
+                evento = {
+                    'timestamp': agora.timestamp(),
+                    'camera': self.camera,
+                    'pessoas': len(pessoas),
+                    'objetos': len(objetos),
+                    'caixas': {
+                        'pessoas': [list(map(int, p['corpo'])) for p in pessoas],
+                        'objetos': [list(map(int, o)) for o in objetos],
+                    },
+                    'trilhas': {'pessoas': ids_pessoas, 'objetos': ids_objetos},
+                    'caminho_clipe': caminho_clipe,
+                }
+                
+                # Codificação, escrita e indexação ficam com o gravador, fora do loop
+                with self.metricas.etapa('enfileirar_gravacao'):
+                    enfileirado = self.gravador.enfileirar(caminho_foto, frame, caminho_txt, texto,
+                                                           indice=self.indice, evento=evento)
+                
+                if enfileirado:
+                    if caminho_clipe is not None:
+                        self.clipes.disparar(caminho_clipe)
+                    if hash_frame is not None:
+                        self.deduplicador.registrar(hash_frame, pessoas, objetos, caminho_foto)
+                    self.ultima_detecao = agora
+                    self.metricas.incrementar('registros_salvos')
+                    print(f"Detecção salva em: {caminho_foto}")
 
-            if cap is None or not cap.isOpened():
-                raise Exception("Não foi possível acessar nenhuma câmera. Verifique se a câmera está conectada e funcionando.")
+    def processar_frame(self, frame):
+        """Pipeline do modo automático: movimento, pessoas, desenho e registro"""
+        if self.clipes is not None:
+            self.clipes.adicionar(frame)
+        
+        # Só o recorte com as zonas de interesse é analisado
+        recorte, deslocamento = self.recortar_zona(frame)
+        
+        # Conversões do frame feitas uma única vez e compartilhadas
+        preproc = self.preprocessar(recorte)
+        
+        # Detectar movimento e pessoas
+        self.iniciar_quadro()
+        movimento_detectado, contornos, mascara_movimento = self.detectar_movimento_significativo(recorte, preproc)
+        dx, dy = deslocamento
+        caixas_movimento = [(x + dx, y + dy, w, h) for (x, y, w, h) in map(cv2.boundingRect, contornos)]
+        
+        # Entre keyframes, as trilhas cobrem o movimento já conhecido
+        if (movimento_detectado or not self.deteccao_por_regiao) and self.precisa_detectar(caixas_movimento):
+            self.passadas_detector += 1
+            pessoas = self.localizar_pessoas(recorte, movimento_detectado, contornos, mascara_movimento, preproc)
+            contornos, pessoas = self.deslocar_deteccoes(contornos, pessoas, deslocamento)
+            self.estabilizar_deteccoes(pessoas, 'pessoa')
+        else:
+            self.passadas_poupadas += movimento_detectado
+            contornos, _ = self.deslocar_deteccoes(contornos, [], deslocamento)
+            pessoas = self.manter_trilhas(caixas_movimento)
+        
+        objetos_validos, pessoas_detectadas = self.classificar_deteccoes(frame.shape, pessoas, contornos)
+        ids_objetos = self.estabilizar_deteccoes(objetos_validos, 'objeto')
+        registrar = (self.gravar_registros and (len(pessoas_detectadas) > 0 or len(objetos_validos) > 0)
+                     and self.registro_pendente())
+        publicar = self.previa is not None and self.previa.quer_quadro()
+        
+        # Sem janela, só se desenha para a foto do registro ou para a prévia
+        if self.sem_janela and not registrar and not publicar:
+            return frame, pessoas_detectadas, objetos_validos
+        
+        if self.exibicao is not None and self.exibicao.shape == frame.shape:
+            frame_exibicao = self.exibicao
+            np.copyto(frame_exibicao, frame)
+        elif self.buffers is not None and self.buffers.compativel(frame):
+            frame_exibicao = self.buffers.exibicao
+            np.copyto(frame_exibicao, frame)
+        else:
+            frame_exibicao = frame.copy()
+        with self.metricas.etapa('desenho'):
+            self.desenhar_anotacoes(frame_exibicao, pessoas_detectadas, objetos_validos)
+        
+        # Salvar se houver detecções
+        if registrar:
+            self.salvar_deteccoes(frame_exibicao, movimento_detectado, pessoas_detectadas, objetos_validos,
+                                  ids_objetos, frame)
+        # Frame salvo agora vai à prévia pelo gravador, com o JPEG do próprio evento
+        if publicar and not (registrar and self.gravador.previa is self.previa):
+            with self.metricas.etapa('previa'):
+                self.previa.publicar(frame_exibicao)
+        
+        return frame_exibicao, pessoas_detectadas, objetos_validos
 
-            # Configurar parâmetros da câmera
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            cap.set(cv2.CAP_PROP_FPS, 30)
+    def iniciar_monitoramento(self, fonte=None):
+        captura = None
+        try:
+            if fonte is None:
+                fonte = FonteCamera()
+            fonte.abrir()
             
-            # Verificar se as configurações foram aplicadas
-            largura_atual = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            altura_atual = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps_atual = int(cap.get(cv2.CAP_PROP_FPS))
+            largura_atual = fonte.largura
+            altura_atual = fonte.altura
+            fps_atual = fonte.fps
             
             print("\nConfiguração da câmera:")
             print(f"Resolução: {largura_atual}x{altura_atual}")
@@ -343,31 +628,47 @@ class nomeMonitoramento:
             print(f"Resolução: {largura_atual}x{altura_atual}")
             print(f"FPS: {fps_atual}")
 
+            # Buffers do loop dimensionados pela resolução negociada
+            self.criar_buffers(largura_atual, altura_atual)
+
+            # Fontes ao vivo são lidas numa thread que mantém só o frame mais recente;
+            # vídeos e sequências são lidos quadro a quadro
+            if fonte.ao_vivo:
+                captura = CapturaUltimoFrame(fonte, self.metricas)
+                captura.iniciar()
+
             while self.monitorando:
-                ret, frame = cap.read()
-                if not ret:
-                    print("Erro ao ler frame da câmera")
-                    break
-                
-                if self.modo_automatico:
-                    frame_exibicao = frame.copy()
-                    
-                    # Detectar movimento e pessoas
-                    movimento_detectado, contornos, mascara_movimento = self.detectar_movimento_significativo(frame)
-                    pessoas = self.detectar_pessoas(frame, mascara_movimento)
-                    
-                    # Desenhar detecções
-                    objetos_validos, pessoas_detectadas = self.desenhar_deteccoes(frame_exibicao, pessoas, contornos)
-                    
-                    # Salvar se houver detecções
-                    if len(pessoas_detectadas) > 0 or len(objetos_validos) > 0:
-                        self.salvar_deteccoes(frame_exibicao, movimento_detectado, pessoas_detectadas, objetos_validos)
-                    
-                    cv2.imshow('nome - Monitoramento', frame_exibicao)
+                if captura is not None:
+                    ret, frame, idade_frame = captura.ler()
+                    if not ret:
+                        if captura.ativa:
+                            continue
+                        print(captura.erro or "Erro ao ler frame da câmera")
+                        break
                 else:
-                    cv2.imshow('nome - Monitoramento', frame)
+                    with self.metricas.etapa('captura'):
+                        ret, frame = fonte.read()
+                    if not ret:
+                        print("Fim da fonte de frames")
+                        break
                 
-                if cv2.waitKey(1) & 0xFF == ord('s'):
+                self.metricas.incrementar('frames')
+                with self.metricas.etapa('frame_total'):
+                    if self.modo_automatico:
+                        frame_exibicao, _, _ = self.processar_frame(frame)
+                    else:
+                        frame_exibicao = frame
+                
+                if self.sem_janela:
+                    # Serviço: sem HighGUI nem pausa; a captura já bloqueia até o próximo frame
+                    if not self.modo_automatico and self.previa is not None:
+                        self.previa.publicar(frame_exibicao)
+                    continue
+                
+                with self.metricas.etapa('exibicao'):
+                    cv2.imshow('nome - Monitoramento', frame_exibicao)
+                    tecla = cv2.waitKey(1) & 0xFF
+                if tecla == ord('s'):
                     break
                 
                 time.sleep(0.01)
@@ -375,9 +676,94 @@ class nomeMonitoramento:
         except Exception as e:
             print(f"Erro ao iniciar monitoramento: {str(e)}")
         finally:
-            if cap is not None:
-                cap.release()
-            cv2.destroyAllWindows()
+            if captura is not None:
+                captura.parar()
+                print(captura.resumo())
+            if fonte is not None:
+                fonte.liberar()
+            self.gravador.parar()
+            if self.clipes is not None:
+                self.clipes.parar()
+            if self.previa is not None:
+                self.previa.parar()
+            if not self.sem_janela:
+                cv2.destroyAllWindows()
+            if self.metricas.ativo:
+                print(self.metricas.resumo())
+                # Pela interface o monitoramento pode ser iniciado de novo: só exporta aqui,
+                # a exportação periódica para quando o programa fecha
+                self.metricas.exportar()
             print("Monitoramento finalizado.")
 
-
+    def reproduzir(self, fonte, max_frames=None):
+        """
+        Roda o pipeline do modo automático sobre uma fonte gravada o mais rápido
+        possível, sem interface gráfica nem pausas, e retorna as estatísticas.
+        """
+        fonte.abrir()
+        self.criar_buffers(fonte.largura, fonte.altura)
+        for rastreador in self.rastreadores.values():
+            rastreador.reiniciar()
+        self.frame_count = self.passadas_detector = self.passadas_poupadas = 0
+        
+        latencias = []
+        frames_com_pessoas = 0
+        frames_com_objetos = 0
+        inicio = time.perf_counter()
+        try:
+            while max_frames is None or len(latencias) < max_frames:
+                with self.metricas.etapa('captura'):
+                    ret, frame = fonte.read()
+                if not ret:
+                    break
+                
+                t0 = time.perf_counter()
+                _, pessoas, objetos = self.processar_frame(frame)
+                latencias.append(time.perf_counter() - t0)
+                self.metricas.registrar('frame_total', latencias[-1])
+                self.metricas.incrementar('frames')
+                
+                frames_com_pessoas += len(pessoas) > 0
+                frames_com_objetos += len(objetos) > 0
+        finally:
+            fonte.liberar()
+            self.gravador.parar()
+            if self.clipes is not None:
+                self.clipes.parar()
+        duracao = time.perf_counter() - inicio
+        
+        latencias = np.array(latencias) * 1000
+        estatisticas = {
+            'frames': len(latencias),
+            'duracao': duracao,
+            'fps': len(latencias) / duracao if duracao > 0 else 0.0,
+            'latencia_media_ms': float(latencias.mean()) if len(latencias) else 0.0,
+            'latencia_p50_ms': float(np.percentile(latencias, 50)) if len(latencias) else 0.0,
+            'latencia_p95_ms': float(np.percentile(latencias, 95)) if len(latencias) else 0.0,
+            'latencia_max_ms': float(latencias.max()) if len(latencias) else 0.0,
+            'frames_com_pessoas': frames_com_pessoas,
+            'frames_com_objetos': frames_com_objetos,
+        }
+        
+        print(f"Frames processados: {estatisticas['frames']} em {duracao:.2f} s "
+              f"({estatisticas['fps']:.1f} frames/s)")
+        print(f"Latência por frame: média {estatisticas['latencia_media_ms']:.1f} ms | "
+              f"p50 {estatisticas['latencia_p50_ms']:.1f} ms | "
+              f"p95 {estatisticas['latencia_p95_ms']:.1f} ms | "
+              f"máx {estatisticas['latencia_max_ms']:.1f} ms")
+        print(f"Frames com pessoas: {frames_com_pessoas} | com objetos: {frames_com_objetos}")
+        estatisticas['passadas_detector'] = self.passadas_detector
+        estatisticas['passadas_poupadas'] = self.passadas_poupadas
+        estatisticas['trilhas'] = {tipo: r.criadas for tipo, r in self.rastreadores.items()}
+        print(f"Haar/HOG: {self.passadas_detector} passadas, {self.passadas_poupadas} frames com movimento "
+              f"cobertos pelas trilhas | trilhas: {estatisticas['trilhas']['pessoa']} pessoas, "
+              f"{estatisticas['trilhas']['objeto']} objetos")
+        if self.zonas:
+            largura, altura = self.tamanho_frame
+            _, _, w, h = self.recorte_zona or (0, 0, largura, altura)
+            estatisticas['fracao_analisada'] = self.zonas.fracao_analisada(largura, altura)
+            print(f"Zonas: {estatisticas['fracao_analisada'] * 100:.0f}% do frame analisado, "
+                  f"recorte {w}x{h} de {largura}x{altura}")
+        if self.metricas.ativo:
+            print(self.metricas.resumo())
+        return estatisticas
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+
+class MotorMovimento:
+    """
+    Gera a máscara binária de primeiro plano na escala de processamento,
+    a partir do frame cinza reduzido e borrado do FramePreprocessado.
+    A escala define a redução do frame antes da análise.
+    """
+    nome = None
+
+    def __init__(self, escala=0.5, limiar=25):
+        self.escala = escala
+        self.limiar = limiar
+
+    def reiniciar(self):
+        """Esquece o histórico (troca de fonte ou de resolução)"""
+
+    def mascara(self, cinza, buffers=None):
+        """Máscara 0/255, ou None enquanto o motor ainda não tem referência"""
+        raise NotImplementedError
+
+
+class MotorDiferenca(MotorMovimento):
+    """Diferença entre o frame atual e o anterior: barata, mas sensível a cintilação"""
+    nome = 'diferenca'
+
+    def __init__(self, escala=0.5, limiar=25):
+        super().__init__(escala, limiar)
+        self.ultimo_frame = None
+
+    def reiniciar(self):
+        self.ultimo_frame = None
+
+    def mascara(self, cinza, buffers=None):
+        if self.ultimo_frame is None or self.ultimo_frame.shape != cinza.shape:
+            self.ultimo_frame = cinza
+            return None
+        # Com o pool de buffers, o frame anterior fica no outro buffer alternado
+        diferenca = cv2.absdiff(self.ultimo_frame, cinza, dst=buffers.diferenca if buffers else None)
+        self.ultimo_frame = cinza
+        return cv2.threshold(diferenca, self.limiar, 255, cv2.THRESH_BINARY,
+                             dst=buffers.limiar if buffers else None)[1]
+
+
+class MotorMOG2(MotorMovimento):
+    """Modelo de fundo por mistura de gaussianas: absorve cintilação e mudanças lentas"""
+    nome = 'mog2'
+
+    def __init__(self, escala=0.5, limiar=25, historia=30):
+        super().__init__(escala, limiar)
+        self.historia = historia
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.subtrator = cv2.createBackgroundSubtractorMOG2(
+            detectShadows=False,
+            history=self.historia,
+            varThreshold=self.limiar
+        )
+        self._forma = None
+
+    def mascara(self, cinza, buffers=None):
+        if self._forma != cinza.shape:
+            if self._forma is not None:
+                self.reiniciar()
+            self._forma = cinza.shape
+            self.subtrator.apply(cinza)
+            return None
+        return self.subtrator.apply(cinza, buffers.limiar if buffers else None)
+
+
+class MotorMediaMovel(MotorMovimento):
+    """
+    Fundo como média móvel ponderada (accumulateWeighted); o primeiro plano
+    é o que se afasta da média mais que o limiar.
+    """
+    nome = 'media'
+
+    def __init__(self, escala=0.5, limiar=25, alfa=0.1):
+        super().__init__(escala, limiar)
+        self.alfa = alfa
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.media = None
+        self._media_8bits = None
+
+    def mascara(self, cinza, buffers=None):
+        if self.media is None or self.media.shape != cinza.shape:
+            self.media = cinza.astype(np.float32)
+            self._media_8bits = np.empty_like(cinza)
+            return None
+        cv2.convertScaleAbs(self.media, dst=self._media_8bits)
+        diferenca = cv2.absdiff(self._media_8bits, cinza, dst=buffers.diferenca if buffers else None)
+        cv2.accumulateWeighted(cinza, self.media, self.alfa)
+        return cv2.threshold(diferenca, self.limiar, 255, cv2.THRESH_BINARY,
+                             dst=buffers.limiar if buffers else None)[1]
+
+
+MOTORES = {motor.nome: motor for motor in (MotorDiferenca, MotorMOG2, MotorMediaMovel)}
+
+
+def criar_motor(nome='diferenca', escala=0.5, **parametros):
+    try:
+        return MOTORES[nome](escala=escala, **parametros)
+    except KeyError:
+        raise ValueError(f"Motor de movimento desconhecido: {nome} (opções: {', '.join(MOTORES)})")
@@ -0,0 +1,305 @@
+"""
+Monitoramento de várias câmeras: cada câmera tem captura e detecção de
+movimento próprias, e o trabalho caro (Haar/HOG) vai para um pool de
+processos compartilhado, com agendamento justo entre as câmeras.
+
+Uso (na raiz do projeto):
+    python -m src.multicamera 0 1 portaria=rtsp://10.0.0.5/stream --fps-max 10 --trabalhadores 2
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from src.captura import CapturaUltimoFrame
+from src.fontes import abrir_fonte
+from src.indice_eventos import IndiceEventos
+from src.monitoramento import nomeMonitoramento
+from src.movimento import MOTORES
+from src.zonas import carregar_zonas
+
+# Monitor usado pelos processos do pool; carrega Haar e HOG uma vez por processo
+_monitor_trabalhador = None
+
+
+def _iniciar_trabalhador():
+    global _monitor_trabalhador
+    _monitor_trabalhador = nomeMonitoramento()
+    _monitor_trabalhador.carregar_modelos()
+
+
+def _localizar_pessoas(frame, contornos, mascara_movimento):
+    return _monitor_trabalhador.localizar_pessoas(frame, True, contornos, mascara_movimento)
+
+
+class TrabalhoDeteccao:
+    """
+    Frame com movimento aguardando a detecção de pessoas. Só o recorte das
+    zonas de interesse vai para o processo de detecção; o frame inteiro
+    fica para o desenho e o registro.
+    """
+    def __init__(self, frame, contornos, mascara_movimento, recorte=None, deslocamento=(0, 0)):
+        self.frame = frame
+        self.recorte = frame if recorte is None else recorte
+        self.deslocamento = deslocamento
+        self.contornos = contornos
+        # A máscara vem do pool de buffers da câmera e é sobrescrita no próximo frame
+        self.mascara_movimento = mascara_movimento.copy()
+        self.criado_em = time.monotonic()
+
+
+class AgendadorDeteccao:
+    """
+    Distribui os trabalhos de detecção entre as câmeras de forma justa:
+    cada câmera tem no máximo um trabalho em execução e um pendente. Um
+    frame novo de uma câmera ocupada substitui o pendente (que é descartado),
+    e as câmeras com pendência são atendidas em ordem de chegada.
+    """
+    def __init__(self, trabalhadores=None):
+        self.trabalhadores = trabalhadores or max(1, (os.cpu_count() or 2) - 1)
+        self.executor = ProcessPoolExecutor(max_workers=self.trabalhadores,
+                                            initializer=_iniciar_trabalhador)
+        self._condicao = threading.Condition()
+        self._pendentes = {}
+        self._em_execucao = set()
+        self._fila = deque()
+        self._rodando = True
+        self._thread = threading.Thread(target=self._despachar, name='agendador', daemon=True)
+        self._thread.start()
+
+    def oferecer(self, camera, trabalho):
+        with self._condicao:
+            if camera in self._pendentes:
+                camera.descartados_ocupada += 1
+            else:
+                self._fila.append(camera)
+            self._pendentes[camera] = trabalho
+            self._condicao.notify()
+
+    def _proxima(self):
+        if len(self._em_execucao) >= self.trabalhadores:
+            return None
+        for camera in self._fila:
+            if camera not in self._em_execucao:
+                return camera
+        return None
+
+    def _despachar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: not self._rodando or self._proxima() is not None)
+                if not self._rodando:
+                    return
+                camera = self._proxima()
+                self._fila.remove(camera)
+                trabalho = self._pendentes.pop(camera)
+                self._em_execucao.add(camera)
+
+            futuro = self.executor.submit(_localizar_pessoas, trabalho.recorte,
+                                          trabalho.contornos, trabalho.mascara_movimento)
+            futuro.add_done_callback(lambda f, c=camera, t=trabalho: self._concluido(c, t, f))
+
+    def _concluido(self, camera, trabalho, futuro):
+        with self._condicao:
+            self._em_execucao.discard(camera)
+            self._condicao.notify()
+        camera.resultados.put((trabalho, futuro))
+
+    def parar(self):
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        self._thread.join(timeout=2)
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class CameraMonitorada:
+    """Captura e detecção de movimento de uma câmera, com registros em subpasta própria"""
+    def __init__(self, nome, fonte, agendador, pasta_registros, fps_max=None, indice=None,
+                 motor='diferenca', escala=0.5, zonas=None):
+        self.nome = nome
+        self.fonte = fonte
+        self.agendador = agendador
+        self.fps_max = fps_max
+        # O índice de eventos é um só, na raiz de registros, com a câmera em cada evento
+        self.monitor = nomeMonitoramento(pasta_registros=os.path.join(pasta_registros, nome),
+                                         indice=indice, camera=nome)
+        self.monitor.modo_automatico = True
+        self.monitor.definir_motor_movimento(motor, escala)
+        self.monitor.definir_zonas(zonas)
+        self.resultados = queue.SimpleQueue()
+        self.captura = None
+        self._thread = None
+        self._rodando = False
+
+        # Estatísticas
+        self.frames_analisados = 0
+        self.frames_com_movimento = 0
+        self.descartados_fps = 0
+        self.descartados_ocupada = 0
+        self.cobertos_trilhas = 0
+        self.deteccoes = 0
+        self.latencia_deteccao = 0.0
+        self.inicio = None
+
+    def iniciar(self):
+        self.fonte.abrir()
+        self.monitor.criar_buffers(self.fonte.largura, self.fonte.altura)
+        self.captura = CapturaUltimoFrame(self.fonte)
+        self.captura.iniciar()
+        self._rodando = True
+        self.inicio = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name=f'camera-{self.nome}', daemon=True)
+        self._thread.start()
+        print(f"[{self.nome}] Câmera iniciada: {self.fonte.largura}x{self.fonte.altura} @ {self.fonte.fps} FPS")
+
+    @property
+    def ativa(self):
+        return self._rodando
+
+    def _loop(self):
+        intervalo = 1.0 / self.fps_max if self.fps_max else 0.0
+        ultimo = 0.0
+        while self._rodando:
+            self.processar_resultados()
+
+            ret, frame, _ = self.captura.ler(timeout=0.2)
+            if not ret:
+                if self.captura.ativa:
+                    continue
+                print(f"[{self.nome}] {self.captura.erro or 'Fim da fonte de frames'}")
+                break
+
+            # Limite de FPS por câmera
+            agora = time.monotonic()
+            if agora - ultimo < intervalo:
+                self.descartados_fps += 1
+                continue
+            ultimo = agora
+
+            self.frames_analisados += 1
+            self.monitor.iniciar_quadro()
+            recorte, deslocamento = self.monitor.recortar_zona(frame)
+            preproc = self.monitor.preprocessar(recorte)
+            movimento, contornos, mascara = self.monitor.detectar_movimento_significativo(recorte, preproc)
+            if movimento:
+                self.frames_com_movimento += 1
+                dx, dy = deslocamento
+                caixas = [(x + dx, y + dy, w, h) for (x, y, w, h) in map(cv2.boundingRect, contornos)]
+                # Movimento já coberto pelas trilhas fora dos keyframes não vai aos trabalhadores
+                if self.monitor.precisa_detectar(caixas):
+                    self.agendador.oferecer(self, TrabalhoDeteccao(frame, contornos, mascara,
+                                                                   recorte, deslocamento))
+                else:
+                    self.monitor.manter_trilhas(caixas)
+                    self.cobertos_trilhas += 1
+
+        self._rodando = False
+
+    def processar_resultados(self):
+        while True:
+            try:
+                trabalho, futuro = self.resultados.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                pessoas = futuro.result()
+            except Exception as e:
+                print(f"[{self.nome}] Erro na detecção de pessoas: {str(e)}")
+                continue
+
+            self.latencia_deteccao = time.monotonic() - trabalho.criado_em
+            contornos, pessoas = self.monitor.deslocar_deteccoes(trabalho.contornos, pessoas,
+                                                                 trabalho.deslocamento)
+            self.monitor.estabilizar_deteccoes(pessoas, 'pessoa')
+            # O frame do trabalho não é mais usado pela captura: desenhar nele mesmo,
+            # guardando antes uma cópia sem anotações para o hash de deduplicação
+            original = trabalho.frame.copy() if self.monitor.deduplicador is not None else None
+            objetos, pessoas = self.monitor.desenhar_deteccoes(trabalho.frame, pessoas, contornos)
+            ids_objetos = self.monitor.estabilizar_deteccoes(objetos, 'objeto')
+            if pessoas or objetos:
+                self.deteccoes += 1
+                self.monitor.salvar_deteccoes(trabalho.frame, True, pessoas, objetos, ids_objetos,
+                                              original=original)
+
+    def parar(self):
+        self._rodando = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self.captura is not None:
+            self.captura.parar()
+        self.fonte.liberar()
+        self.monitor.gravador.parar()
+
+    def resumo(self):
+        duracao = time.monotonic() - self.inicio if self.inicio else 0.0
+        fps = self.frames_analisados / duracao if duracao > 0 else 0.0
+        return (f"[{self.nome}] analisados: {self.frames_analisados} ({fps:.1f} FPS) | "
+                f"com movimento: {self.frames_com_movimento} | "
+                f"descartados (limite FPS): {self.descartados_fps} | "
+                f"descartados (câmera ocupada): {self.descartados_ocupada} | "
+                f"cobertos pelas trilhas: {self.cobertos_trilhas} | "
+                f"detecções: {self.deteccoes} | "
+                f"última latência de detecção: {self.latencia_deteccao * 1000:.0f} ms")
+
+
+def _separar_origem(argumento, indice):
+    """Aceita 'origem' ou 'nome=origem'"""
+    nome, separador, origem = argumento.partition('=')
+    if separador and '/' not in nome and ':' not in nome:
+        return nome, origem
+    return f"cam{indice}", argumento
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitoramento de várias câmeras")
+    parser.add_argument('origens', nargs='+', help="Índices de câmera, vídeos ou pastas (opcionalmente nome=origem)")
+    parser.add_argument('--fps-max', type=float, default=None, help="FPS máximo analisado por câmera")
+    parser.add_argument('--trabalhadores', type=int, default=None, help="Processos para Haar/HOG")
+    parser.add_argument('--motor', default='diferenca', choices=list(MOTORES), help="Motor de movimento")
+    parser.add_argument('--escala', type=float, default=0.5, help="Redução do frame para o motor de movimento")
+    parser.add_argument('--zonas', help="JSON com as zonas de interesse/exclusão por nome de câmera")
+    parser.add_argument('--intervalo-resumo', type=float, default=10.0)
+    args = parser.parse_args()
+
+    pasta_registros = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'registros')
+    os.makedirs(pasta_registros, exist_ok=True)
+    indice = IndiceEventos(pasta_registros)
+    agendador = AgendadorDeteccao(args.trabalhadores)
+    cameras = []
+    try:
+        for i, argumento in enumerate(args.origens):
+            nome, origem = _separar_origem(argumento, i)
+            zonas = carregar_zonas(args.zonas, nome) if args.zonas else None
+            camera = CameraMonitorada(nome, abrir_fonte(origem), agendador, pasta_registros,
+                                      args.fps_max, indice, args.motor, args.escala, zonas)
+            camera.iniciar()
+            cameras.append(camera)
+
+        print(f"Monitorando {len(cameras)} câmera(s) com {agendador.trabalhadores} processo(s) de detecção")
+        proximo_resumo = time.monotonic() + args.intervalo_resumo
+        while any(c.ativa for c in cameras):
+            time.sleep(0.5)
+            if time.monotonic() >= proximo_resumo:
+                proximo_resumo += args.intervalo_resumo
+                for camera in cameras:
+                    print(camera.resumo())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for camera in cameras:
+            camera.parar()
+        agendador.parar()
+        for camera in cameras:
+            # Detecções concluídas depois que a câmera parou
+            camera.processar_resultados()
+            camera.monitor.gravador.parar()
+            print(camera.resumo())
+        print("Monitoramento finalizado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Relatório de alocações por frame do caminho de movimento e desenho.
+
+Uso (na raiz do projeto):
+    python -m src.perfil_alocacao --frames 300 --largura 640 --altura 480
+"""
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.buffers import PoolBuffers
+from src.monitoramento import nomeMonitoramento
+from src.preprocessamento import FramePreprocessado
+
+
+def gerar_frames(largura, altura, quantidade):
+    """Fundo com ruído fixo e um retângulo claro atravessando a cena"""
+    rng = np.random.default_rng(0)
+    fundo = rng.integers(0, 255, (altura, largura, 3), dtype=np.uint8)
+    frames = []
+    for i in range(quantidade):
+        frame = fundo.copy()
+        x = (i * 7) % max(1, largura - largura // 4)
+        cv2.rectangle(frame, (x, altura // 4), (x + largura // 8, altura // 4 + altura // 3),
+                      (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+
+def processar(monitor, frame, buffers):
+    if buffers is not None:
+        frame_exibicao = buffers.exibicao
+        np.copyto(frame_exibicao, frame)
+    else:
+        frame_exibicao = frame.copy()
+    preproc = FramePreprocessado(frame, escala=monitor.motor_movimento.escala, buffers=buffers)
+    _, contornos, _ = monitor.detectar_movimento_significativo(frame, preproc)
+    monitor.desenhar_deteccoes(frame_exibicao, [], contornos)
+
+
+def medir(monitor, frames, buffers, aquecimento):
+    monitor.motor_movimento.reiniciar()
+    for frame in frames[:aquecimento]:
+        processar(monitor, frame, buffers)
+
+    tracemalloc.start()
+    transitorios = []
+    inicio = tracemalloc.take_snapshot()
+    for frame in frames[aquecimento:]:
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        processar(monitor, frame, buffers)
+        transitorios.append(tracemalloc.get_traced_memory()[1] - antes)
+    fim = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    retido = sum(stat.size_diff for stat in fim.compare_to(inicio, 'filename'))
+    return np.array(transitorios), retido
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alocações por frame no loop de monitoramento")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--aquecimento', type=int, default=30)
+    parser.add_argument('--largura', type=int, default=640)
+    parser.add_argument('--altura', type=int, default=480)
+    args = parser.parse_args()
+
+    frames = gerar_frames(args.largura, args.altura, args.frames + args.aquecimento)
+    monitor = nomeMonitoramento()
+
+    print(f"Frames medidos: {args.frames} ({args.largura}x{args.altura})")
+    for nome, buffers in (("sem pool", None),
+                          ("com pool", PoolBuffers(args.largura, args.altura))):
+        transitorios, retido = medir(monitor, frames, buffers, args.aquecimento)
+        print(f"{nome}: alocação transitória por frame média {transitorios.mean() / 1024:.1f} KiB, "
+              f"máxima {transitorios.max() / 1024:.1f} KiB, "
+              f"retida ao final {retido / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Relatório de inicialização (--profile-startup): tempo de cada importação
+pesada, da criação dos objetos e da carga dos modelos, na ordem em que
+acontecem. Módulos já importados aparecem com tempo zero.
+"""
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+
+class PerfilInicio:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas.append((nome, time.perf_counter() - inicio))
+
+    def importar(self, modulo):
+        ja_importado = modulo in sys.modules
+        with self.etapa(f"import {modulo}" + (" (já carregado)" if ja_importado else "")):
+            return importlib.import_module(modulo)
+
+    def modelos(self):
+        """Inclui as cargas de modelo feitas pelo src.modelos até aqui"""
+        from src.modelos import TEMPOS_CARGA
+        for (tipo, nome), segundos in TEMPOS_CARGA.items():
+            self.etapas.append((f"modelo {tipo} ({nome.rsplit('/', 1)[-1]})", segundos))
+
+    def relatorio(self):
+        total = time.perf_counter() - self.inicio
+        linhas = ["Perfil de inicialização:"]
+        for nome, segundos in self.etapas:
+            linhas.append(f"  {nome:<48} {segundos * 1000:8.1f} ms")
+        linhas.append(f"  {'total (desde o início do perfil)':<48} {total * 1000:8.1f} ms")
+        return "\n".join(linhas)
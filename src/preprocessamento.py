@@ -0,0 +1,71 @@
+import cv2
+from functools import cached_property
+
+
+class FramePreprocessado:
+    """
+    Variações de um frame (reduzido, cinza, borrado, equalizado e pirâmide)
+    calculadas sob demanda uma única vez e compartilhadas pelos detectores.
+    Com um PoolBuffers compatível, cada variação é escrita no buffer
+    preallocado correspondente.
+    """
+    def __init__(self, frame, escala=0.5, kernel_blur=(11, 11), buffers=None):
+        self.frame = frame
+        self.escala = escala
+        self.kernel_blur = kernel_blur
+        if buffers is not None and not buffers.compativel(frame, escala):
+            buffers = None
+        self.buffers = buffers
+        self._piramide = [frame]
+
+    def _destino(self, nome):
+        return getattr(self.buffers, nome) if self.buffers is not None else None
+
+    def nivel(self, indice):
+        """Nível da pirâmide: cada nível tem metade da resolução do anterior"""
+        while len(self._piramide) <= indice:
+            i = len(self._piramide)
+            anterior = self._piramide[-1]
+            if self.buffers is not None and i < len(self.buffers.piramide):
+                destino = self.buffers.piramide[i]
+                nivel = cv2.resize(anterior, (destino.shape[1], destino.shape[0]), dst=destino)
+            else:
+                nivel = cv2.resize(anterior, (0, 0), fx=0.5, fy=0.5)
+            self._piramide.append(nivel)
+        return self._piramide[indice]
+
+    def piramide(self, niveis):
+        self.nivel(niveis - 1)
+        return self._piramide[:niveis]
+
+    @cached_property
+    def pequeno(self):
+        # Escalas 1/2, 1/4, ... reaproveitam a pirâmide
+        indice = 0
+        escala = 1.0
+        while escala > self.escala:
+            escala /= 2
+            indice += 1
+        if escala == self.escala:
+            return self.nivel(indice)
+        destino = self._destino('pequeno')
+        if destino is not None:
+            return cv2.resize(self.frame, (destino.shape[1], destino.shape[0]), dst=destino)
+        return cv2.resize(self.frame, (0, 0), fx=self.escala, fy=self.escala)
+
+    @cached_property
+    def cinza_pequeno(self):
+        return cv2.cvtColor(self.pequeno, cv2.COLOR_BGR2GRAY, dst=self._destino('cinza_pequeno'))
+
+    @cached_property
+    def borrado(self):
+        destino = self.buffers.proximo_borrado() if self.buffers is not None else None
+        return cv2.GaussianBlur(self.cinza_pequeno, self.kernel_blur, 0, dst=destino)
+
+    @cached_property
+    def cinza(self):
+        return cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY, dst=self._destino('cinza'))
+
+    @cached_property
+    def equalizado(self):
+        return cv2.equalizeHist(self.cinza, dst=self._destino('equalizado'))
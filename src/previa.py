@@ -0,0 +1,119 @@
+"""
+Prévia MJPEG do monitoramento em http://127.0.0.1:PORTA/, para o modo
+serviço sem janela. O loop só desenha e codifica JPEG enquanto houver
+algum cliente conectado, e cada cliente recebe no máximo fps_max frames/s.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+FRONTEIRA = 'quadro'
+
+
+class ServidorPrevia:
+    """Último JPEG publicado pelo loop, entregue a cada cliente no ritmo dele"""
+    def __init__(self, porta, host='127.0.0.1', fps_max=5.0, qualidade=70):
+        self.porta = porta
+        self.host = host
+        self.intervalo = 1.0 / fps_max if fps_max else 0.0
+        self.parametros = [int(cv2.IMWRITE_JPEG_QUALITY), qualidade]
+        self._condicao = threading.Condition()
+        self._jpeg = None
+        self._sequencia = 0
+        self._publicado_em = 0.0
+        self._clientes = 0
+        self._rodando = False
+        self._servidor = None
+
+    @property
+    def clientes(self):
+        return self._clientes
+
+    def quer_quadro(self):
+        """Há cliente conectado e já passou o intervalo desde o último frame publicado"""
+        return self._clientes > 0 and time.monotonic() - self._publicado_em >= self.intervalo
+
+    def publicar(self, frame):
+        """Codifica o frame para os clientes; sem ninguém assistindo, não faz nada"""
+        if not self.quer_quadro():
+            return False
+        ok, jpeg = cv2.imencode('.jpg', frame, self.parametros)
+        if not ok:
+            return False
+        self.publicar_jpeg(jpeg.tobytes())
+        return True
+
+    def publicar_jpeg(self, jpeg):
+        """Publica um JPEG já codificado (ex.: a foto de um evento), sem codificar de novo"""
+        if not self._clientes:
+            return
+        with self._condicao:
+            self._jpeg = jpeg
+            self._sequencia += 1
+            self._publicado_em = time.monotonic()
+            self._condicao.notify_all()
+
+    def _proximo(self, ultima_sequencia, timeout=1.0):
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._sequencia != ultima_sequencia or not self._rodando, timeout)
+            return self._sequencia, self._jpeg
+
+    def _transmitir(self, saida):
+        with self._condicao:
+            self._clientes += 1
+        try:
+            sequencia = 0
+            enviado_em = 0.0
+            while self._rodando:
+                # Limite por cliente: espera o intervalo antes de pedir o próximo frame
+                espera = self.intervalo - (time.monotonic() - enviado_em)
+                if espera > 0:
+                    time.sleep(espera)
+                nova, jpeg = self._proximo(sequencia)
+                if nova == sequencia or jpeg is None:
+                    continue
+                sequencia = nova
+                enviado_em = time.monotonic()
+                saida.write(f"--{FRONTEIRA}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode('ascii'))
+                saida.write(jpeg)
+                saida.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._condicao:
+                self._clientes -= 1
+
+    def iniciar(self):
+        previa = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/mjpeg'):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={FRONTEIRA}')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                previa._transmitir(self.wfile)
+
+            def log_message(self, *args):
+                pass
+
+        self._rodando = True
+        self._servidor = ThreadingHTTPServer((self.host, self.porta), Handler)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name='previa-http', daemon=True).start()
+        print(f"Prévia disponível em http://{self.host}:{self.porta}/")
+
+    def parar(self):
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
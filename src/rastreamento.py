@@ -0,0 +1,113 @@
+import numpy as np
+
+from src.caixas import CaixasArray
+
+
+class Trilha:
+    """Uma identidade acompanhada entre frames"""
+    def __init__(self, id, caixa, quadro, dados=None):
+        self.id = id
+        self.caixa = tuple(caixa)
+        self.dados = dados           # Detecção original (ex.: dicionário da pessoa com o rosto)
+        self.criada_em = quadro
+        self.vista_em = quadro       # Último frame em que foi associada a uma detecção
+        self.mantida_em = quadro     # Último frame com detecção ou movimento sobre ela
+        self.deteccoes = 1
+
+
+class Rastreador:
+    """
+    Associação gulosa entre detecções e trilhas pelo IoU das caixas; sem
+    sobreposição, vale a distância entre os centróides relativa ao tamanho
+    da trilha. Trilhas sem detecção nem movimento por max_ausencia frames
+    são descartadas.
+    """
+    def __init__(self, limiar_iou=0.3, distancia_maxima=0.5, max_ausencia=15):
+        self.limiar_iou = limiar_iou
+        self.distancia_maxima = distancia_maxima
+        self.max_ausencia = max_ausencia
+        self.trilhas = []
+        self.quadro = 0
+        self.ultima_deteccao = 0
+        self.criadas = 0             # Trilhas abertas desde o início (ou o último reiniciar)
+        self._proximo_id = 1
+
+    def avancar(self):
+        """Início de um frame novo; descarta as trilhas abandonadas"""
+        self.quadro += 1
+        self.trilhas = [t for t in self.trilhas if self.quadro - t.mantida_em <= self.max_ausencia]
+
+    def _pontuacoes(self, atuais, anteriores):
+        iou = atuais.iou(anteriores)
+        cx = (atuais.x + atuais.w / 2)[:, None] - (anteriores.x + anteriores.w / 2)[None, :]
+        cy = (atuais.y + atuais.h / 2)[:, None] - (anteriores.y + anteriores.h / 2)[None, :]
+        tamanho = np.maximum(anteriores.w, anteriores.h)[None, :].astype(np.float64)
+        distancia = np.hypot(cx, cy) / np.maximum(tamanho, 1)
+        # IoU suficiente vence sempre; proximidade dos centróides só desempata o resto
+        return np.where(iou >= self.limiar_iou, 1.0 + iou,
+                        np.where(distancia < self.distancia_maxima, 1.0 - distancia, 0.0))
+
+    def atualizar(self, caixas, dados=None):
+        """Associa as detecções do frame às trilhas e retorna o id de cada uma"""
+        self.ultima_deteccao = self.quadro
+        dados = dados if dados is not None else [None] * len(caixas)
+        ids = [None] * len(caixas)
+        if len(caixas) and self.trilhas:
+            pontuacoes = self._pontuacoes(CaixasArray(caixas), CaixasArray([t.caixa for t in self.trilhas]))
+            for i, j in zip(*np.unravel_index(np.argsort(-pontuacoes, axis=None), pontuacoes.shape)):
+                if pontuacoes[i, j] <= 0:
+                    break
+                trilha = self.trilhas[j]
+                if ids[i] is not None or trilha.vista_em == self.quadro:
+                    continue
+                trilha.caixa = tuple(caixas[i])
+                trilha.dados = dados[i]
+                trilha.vista_em = trilha.mantida_em = self.quadro
+                trilha.deteccoes += 1
+                ids[i] = trilha.id
+
+        for i, caixa in enumerate(caixas):
+            if ids[i] is None:
+                trilha = Trilha(self._proximo_id, caixa, self.quadro, dados[i])
+                self._proximo_id += 1
+                self.criadas += 1
+                self.trilhas.append(trilha)
+                ids[i] = trilha.id
+        return ids
+
+    def manter(self, caixas_movimento):
+        """
+        Sem detector neste frame: trilhas com movimento sobre elas continuam
+        vivas. Retorna essas trilhas.
+        """
+        if not self.trilhas or not len(caixas_movimento):
+            return []
+        tocadas = (CaixasArray([t.caixa for t in self.trilhas]).intersecoes(CaixasArray(caixas_movimento)) > 0).any(axis=1)
+        mantidas = []
+        for trilha, tocada in zip(self.trilhas, tocadas):
+            if tocada:
+                trilha.mantida_em = self.quadro
+                mantidas.append(trilha)
+        return mantidas
+
+    def cobertas(self, caixas, fracao=0.5):
+        """Para cada caixa, se ao menos fracao da área dela está dentro de alguma trilha"""
+        if not len(caixas):
+            return np.zeros(0, dtype=bool)
+        if not self.trilhas:
+            return np.zeros(len(caixas), dtype=bool)
+        caixas = CaixasArray(caixas)
+        dentro = caixas.intersecoes(CaixasArray([t.caixa for t in self.trilhas])).max(axis=1)
+        return dentro >= fracao * np.maximum(caixas.areas, 1)
+
+    @property
+    def perdidas(self):
+        """Trilhas que a última passada do detector não encontrou"""
+        return [t for t in self.trilhas if t.vista_em < self.ultima_deteccao]
+
+    def reiniciar(self):
+        self.trilhas = []
+        self.quadro = 0
+        self.ultima_deteccao = 0
+        self.criadas = 0
+        self._proximo_id = 1
@@ -0,0 +1,68 @@
+"""
+Reprodução sem interface gráfica de vídeos ou pastas de frames gravados,
+rodando o pipeline completo do modo automático o mais rápido possível.
+
+Uso (na raiz do projeto):
+    python -m src.reproducao gravacao.mp4
+    python -m src.reproducao pasta_de_frames --sem-registros --max-frames 500
+    python -m src.reproducao gravacao.mp4 --metricas --metricas-arquivo metricas.prom
+    python -m src.reproducao gravacao.mp4 --motor mog2 --escala 0.25
+    python -m src.reproducao gravacao.mp4 --zonas zonas.json --camera portaria
+"""
+import argparse
+
+from src.fontes import abrir_fonte
+from src.monitoramento import nomeMonitoramento
+from src.movimento import MOTORES
+from src.zonas import carregar_zonas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz uma gravação pelo pipeline de detecção")
+    parser.add_argument('origem', help="Arquivo de vídeo ou pasta com imagens")
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--sem-registros', action='store_true',
+                        help="Não salvar fotos e logs na pasta registros")
+    parser.add_argument('--motor', default='diferenca', choices=list(MOTORES), help="Motor de movimento")
+    parser.add_argument('--escala', type=float, default=0.5, help="Redução do frame para o motor de movimento")
+    parser.add_argument('--zonas', help="JSON com as zonas de interesse/exclusão")
+    parser.add_argument('--skip-frames', type=int, default=2,
+                        help="Frames sem Haar/HOG entre keyframes quando as trilhas cobrem o movimento")
+    parser.add_argument('--sem-rastreamento', action='store_true',
+                        help="Rodar Haar/HOG em todo frame com movimento, sem trilhas")
+    parser.add_argument('--camera', default='', help="Câmera cujas zonas usar (padrão: entrada 'padrao')")
+    parser.add_argument('--metricas', action='store_true',
+                        help="Medir a latência de cada etapa e mostrar p50/p95/p99 ao final")
+    parser.add_argument('--sem-deduplicacao', action='store_true',
+                        help="Salvar e alertar mesmo eventos quase iguais aos recentes")
+    parser.add_argument('--clipes', action='store_true',
+                        help="Gravar um clipe de antes/depois de cada evento (registros/*_movimento.avi)")
+    parser.add_argument('--clipe-pre', type=float, default=5.0, help="Segundos antes do evento no clipe")
+    parser.add_argument('--clipe-pos', type=float, default=5.0, help="Segundos depois do evento no clipe")
+    parser.add_argument('--clipe-memoria-mb', type=float, default=32, help="Teto do buffer circular de frames")
+    parser.add_argument('--metricas-arquivo', help="Exportar métricas no formato Prometheus neste arquivo")
+    parser.add_argument('--metricas-porta', type=int, help="Servir métricas em http://127.0.0.1:PORTA/metrics")
+    args = parser.parse_args()
+
+    monitor = nomeMonitoramento()
+    monitor.modo_automatico = True
+    monitor.gravar_registros = not args.sem_registros
+    monitor.definir_motor_movimento(args.motor, args.escala)
+    monitor.skip_frames = args.skip_frames
+    monitor.rastreamento = not args.sem_rastreamento
+    if args.sem_deduplicacao:
+        monitor.deduplicador = None
+    if args.clipes:
+        monitor.ativar_clipes(args.clipe_pre, args.clipe_pos, args.clipe_memoria_mb)
+    if args.zonas:
+        monitor.definir_zonas(carregar_zonas(args.zonas, args.camera))
+    if args.metricas or args.metricas_arquivo or args.metricas_porta:
+        monitor.ativar_metricas(args.metricas_arquivo, args.metricas_porta)
+    try:
+        monitor.reproduzir(abrir_fonte(args.origem), max_frames=args.max_frames)
+    finally:
+        monitor.metricas.parar()
+
+
+if __name__ == "__main__":
+    main()
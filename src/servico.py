@@ -0,0 +1,96 @@
+"""
+Monitoramento como serviço, sem janela: nenhuma chamada ao HighGUI nem
+pausa fixa no loop, e desenho só para as fotos dos registros ou para a
+prévia MJPEG opcional em localhost. Encerra com Ctrl+C ou SIGTERM.
+
+Uso (na raiz do projeto):
+    python -m src.servico
+    python -m src.servico 0 --previa-porta 8080 --previa-fps 5
+    python -m src.servico rtsp://10.0.0.5/stream --zonas zonas.json --camera portaria
+    python -m src.servico --profile-startup
+"""
+import argparse
+import signal
+import sys
+
+from src.perfil_inicio import PerfilInicio
+
+
+def main():
+    # Importações pesadas medidas uma a uma para o --profile-startup
+    perfil = PerfilInicio()
+    for modulo in ('numpy', 'cv2', 'src.monitoramento', 'src.fontes', 'src.previa', 'src.zonas'):
+        perfil.importar(modulo)
+    from src.fontes import abrir_fonte, FonteCamera
+    from src.monitoramento import nomeMonitoramento
+    from src.movimento import MOTORES
+    from src.previa import ServidorPrevia
+    from src.zonas import carregar_zonas
+
+    parser = argparse.ArgumentParser(description="Monitoramento sem interface gráfica")
+    parser.add_argument('origem', nargs='?', help="Índice de câmera, vídeo, pasta ou URL (padrão: câmeras 0 e 1)")
+    parser.add_argument('--previa-porta', type=int, help="Servir a prévia MJPEG em http://127.0.0.1:PORTA/")
+    parser.add_argument('--previa-fps', type=float, default=5.0, help="Frames/s máximo por cliente da prévia")
+    parser.add_argument('--motor', default='diferenca', choices=list(MOTORES), help="Motor de movimento")
+    parser.add_argument('--escala', type=float, default=0.5, help="Redução do frame para o motor de movimento")
+    parser.add_argument('--zonas', help="JSON com as zonas de interesse/exclusão")
+    parser.add_argument('--camera', default='', help="Câmera cujas zonas usar (padrão: entrada 'padrao')")
+    parser.add_argument('--sem-deduplicacao', action='store_true',
+                        help="Salvar e alertar mesmo eventos quase iguais aos recentes")
+    parser.add_argument('--clipes', action='store_true',
+                        help="Gravar um clipe de antes/depois de cada evento (registros/*_movimento.avi)")
+    parser.add_argument('--clipe-pre', type=float, default=5.0, help="Segundos antes do evento no clipe")
+    parser.add_argument('--clipe-pos', type=float, default=5.0, help="Segundos depois do evento no clipe")
+    parser.add_argument('--clipe-memoria-mb', type=float, default=32, help="Teto do buffer circular de frames")
+    parser.add_argument('--metricas-arquivo', help="Exportar métricas no formato Prometheus neste arquivo")
+    parser.add_argument('--metricas-porta', type=int, help="Servir métricas em http://127.0.0.1:PORTA/metrics")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Mostrar o tempo de importações, modelos e primeiro frame e sair")
+    args = parser.parse_args()
+
+    with perfil.etapa('nomeMonitoramento()'):
+        monitor = nomeMonitoramento(camera=args.camera)
+    monitor.modo_automatico = True
+    monitor.sem_janela = True
+    monitor.definir_motor_movimento(args.motor, args.escala)
+    if args.sem_deduplicacao:
+        monitor.deduplicador = None
+    if args.clipes:
+        monitor.ativar_clipes(args.clipe_pre, args.clipe_pos, args.clipe_memoria_mb)
+    if args.zonas:
+        monitor.definir_zonas(carregar_zonas(args.zonas, args.camera))
+    if args.metricas_arquivo or args.metricas_porta:
+        monitor.ativar_metricas(args.metricas_arquivo, args.metricas_porta)
+    if args.previa_porta:
+        monitor.previa = ServidorPrevia(args.previa_porta, fps_max=args.previa_fps)
+        monitor.previa.iniciar()
+        monitor.gravador.previa = monitor.previa
+
+    if args.profile_startup:
+        monitor.carregar_modelos()
+        perfil.modelos()
+        fonte = abrir_fonte(args.origem) if args.origem else FonteCamera()
+        try:
+            with perfil.etapa('abrir fonte e ler o primeiro frame'):
+                fonte.abrir()
+                fonte.read()
+        except Exception as e:
+            print(f"Fonte não aberta: {str(e)}")
+        finally:
+            fonte.liberar()
+        print(perfil.relatorio())
+        sys.exit(0)
+
+    def encerrar(*_):
+        monitor.monitorando = False
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, encerrar)
+
+    try:
+        monitor.iniciar_monitoramento(abrir_fonte(args.origem) if args.origem else FonteCamera())
+    finally:
+        monitor.metricas.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Zonas de interesse e de exclusão por câmera, em polígonos com coordenadas
+normalizadas (0 a 1) num JSON:
+
+    {
+        "portaria": {
+            "interesse": [[[0.0, 0.3], [0.6, 0.3], [0.6, 1.0], [0.0, 1.0]]],
+            "exclusao": [[[0.4, 0.3], [0.6, 0.3], [0.6, 0.5], [0.4, 0.5]]]
+        },
+        "padrao": {"exclusao": [[[0.8, 0.0], [1.0, 0.0], [1.0, 0.1], [0.8, 0.1]]]}
+    }
+
+Sem "interesse", o frame inteiro interessa. "padrao" vale para câmeras sem
+entrada própria.
+"""
+import json
+
+import cv2
+import numpy as np
+
+# O recorte é alinhado a múltiplos deste valor, para as reduções pela metade
+ALINHAMENTO = 4
+
+
+class ZonasCamera:
+    """Polígonos normalizados de uma câmera, rasterizados uma vez por resolução"""
+    def __init__(self, interesse=None, exclusao=None):
+        self.interesse = [np.asarray(p, np.float64) for p in (interesse or [])]
+        self.exclusao = [np.asarray(p, np.float64) for p in (exclusao or [])]
+
+    def __bool__(self):
+        return bool(self.interesse or self.exclusao)
+
+    def _preencher(self, mascara, largura, altura, deslocamento=(0, 0), escala=1.0):
+        # Subpixel com shift=4 para que o recorte reduzido não perca bordas
+        fator = 16
+        def pontos(poligono):
+            p = (poligono * (largura, altura) - deslocamento) * escala * fator
+            return [np.round(p).astype(np.int32)]
+        if self.interesse:
+            mascara[:] = 0
+            for poligono in self.interesse:
+                cv2.fillPoly(mascara, pontos(poligono), 255, shift=4)
+        else:
+            mascara[:] = 255
+        for poligono in self.exclusao:
+            cv2.fillPoly(mascara, pontos(poligono), 0, shift=4)
+        return mascara
+
+    def rasterizar(self, largura, altura, escala=0.5):
+        """
+        Retorna (recorte, mascara): o retângulo (x, y, w, h) do frame que
+        contém a área analisada e a máscara 0/255 desse recorte na escala de
+        processamento. Sem nenhuma área analisada, o recorte é None.
+        """
+        completa = self._preencher(np.empty((altura, largura), np.uint8), largura, altura)
+        if not completa.any():
+            return None, None
+        x, y, w, h = cv2.boundingRect(completa)
+
+        x1 = x // ALINHAMENTO * ALINHAMENTO
+        y1 = y // ALINHAMENTO * ALINHAMENTO
+        x2 = min(largura, -(-(x + w) // ALINHAMENTO) * ALINHAMENTO)
+        y2 = min(altura, -(-(y + h) // ALINHAMENTO) * ALINHAMENTO)
+        recorte = (x1, y1, x2 - x1, y2 - y1)
+
+        forma = (int(round(recorte[3] * escala)), int(round(recorte[2] * escala)))
+        mascara = self._preencher(np.empty(forma, np.uint8), largura, altura, (x1, y1), escala)
+        return recorte, mascara
+
+    def fracao_analisada(self, largura, altura):
+        """Fração dos pixels do frame que passam pelas zonas"""
+        completa = self._preencher(np.empty((altura, largura), np.uint8), largura, altura)
+        return cv2.countNonZero(completa) / float(largura * altura)
+
+
+def carregar_zonas(caminho, camera=''):
+    """Zonas da câmera no JSON (ou as de "padrao"); ZonasCamera vazia se não houver"""
+    with open(caminho, 'r') as f:
+        config = json.load(f)
+    zonas = config.get(camera) or config.get('padrao') or {}
+    return ZonasCamera(zonas.get('interesse'), zonas.get('exclusao'))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Adicionar diretório raiz ao PYTHONPATH, como os scripts do projeto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('watchdog')
+pytest.importorskip('selenium')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'whatsapp_sender'))
+from monitor_whatsapp import AgregadorAlertas
+from src.caixa_saida import CaixaSaida
+
+
+def test_imagens_que_falharam_voltam_para_a_caixa(tmp_path):
+    caixa = CaixaSaida(str(tmp_path), espera_inicial=60.0)
+    for prefixo in ('20260101_100000', '20260101_100005', '20260101_100010'):
+        caminho_foto = str(tmp_path / (prefixo + '_movimento.jpg'))
+        open(caminho_foto, 'wb').close()
+        caixa.enfileirar(caminho_foto, caminho_foto[:-len('.jpg')] + '.txt')
+    lotes = []
+
+    def enviar(alertas):
+        lotes.append([a['id'] for a in alertas])
+        return [alertas[1]['id']]  # a segunda imagem falhou
+
+    agregador = AgregadorAlertas(caixa, enviar, intervalo=0)
+    agregador.notificar()
+    limite = time.monotonic() + 5
+    while not lotes and time.monotonic() < limite:
+        time.sleep(0.01)
+    agregador.parar()
+
+    assert len(lotes) == 1 and len(lotes[0]) == 3
+    # Só a que falhou continua pendente, adiada para uma nova tentativa
+    assert caixa.pendentes() == 1
+    assert caixa.prontos() == []
+    assert caixa.prontos(time.time() + 61)[0]['id'] == lotes[0][1]
+    caixa.fechar()
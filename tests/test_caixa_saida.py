@@ -0,0 +1,60 @@
+import time
+
+from src.caixa_saida import CaixaSaida
+from src.indice_eventos import timestamp_evento
+
+
+def test_pendentes_sobrevivem_ao_reinicio(tmp_path):
+    caixa = CaixaSaida(str(tmp_path), espera_inicial=5.0)
+    assert caixa.enfileirar('/r/20260101_100000_movimento.jpg', '/r/20260101_100000_movimento.txt')
+    assert caixa.enfileirar('/r/20260101_100005_movimento.jpg', '/r/20260101_100005_movimento.txt')
+    enviado = caixa.prontos()[0]
+    caixa.marcar_enviados([enviado['id']])
+    caixa.fechar()
+
+    # Depois do reinício: só o pendente volta, e o enviado não entra de novo
+    caixa = CaixaSaida(str(tmp_path))
+    prontos = caixa.prontos()
+    assert [a['caminho_txt'] for a in prontos] == ['/r/20260101_100005_movimento.txt']
+    assert not caixa.enfileirar('/r/20260101_100000_movimento.jpg', '/r/20260101_100000_movimento.txt')
+    assert caixa.pendentes() == 1
+    caixa.fechar()
+
+
+def test_adiado_so_fica_pronto_depois_da_espera(tmp_path):
+    caixa = CaixaSaida(str(tmp_path), espera_inicial=5.0, espera_maxima=8.0)
+    caixa.enfileirar('/r/20260101_100000_movimento.jpg', '/r/20260101_100000_movimento.txt')
+    alerta = caixa.prontos()[0]
+    caixa.adiar([alerta['id']], 'falhou')
+    caixa.fechar()
+
+    caixa = CaixaSaida(str(tmp_path))
+    proxima = caixa.proxima_tentativa()
+    assert caixa.prontos(agora=proxima - 1) == []
+    assert [a['id'] for a in caixa.prontos(agora=proxima)] == [alerta['id']]
+    caixa.fechar()
+
+
+def test_espera_dobra_ate_o_maximo(tmp_path):
+    caixa = CaixaSaida(str(tmp_path), espera_inicial=5.0, espera_maxima=12.0)
+    caixa.enfileirar('/r/20260101_100000_movimento.jpg', '/r/20260101_100000_movimento.txt')
+    id_alerta = caixa.prontos()[0]['id']
+    esperas = []
+    for _ in range(4):
+        antes = time.time()
+        caixa.adiar([id_alerta])
+        esperas.append(round(caixa.proxima_tentativa() - antes))
+    assert esperas == [5, 10, 12, 12]
+    caixa.fechar()
+
+
+def test_recebido_e_o_instante_da_deteccao(tmp_path):
+    caixa = CaixaSaida(str(tmp_path))
+    caixa.enfileirar('/r/20260101_100000_movimento.jpg', '/r/20260101_100000_movimento.txt')
+    caixa.enfileirar('/r/20260101_090000_movimento.jpg', '/r/20260101_090000_movimento.txt')
+    assert caixa.ultimo_recebido() == timestamp_evento('/r/20260101_100000_movimento.jpg')
+    # Mais antigo primeiro, pela detecção e não pela ordem de chegada
+    assert [a['caminho_foto'] for a in caixa.prontos()][0] == '/r/20260101_090000_movimento.jpg'
+    caixa.marcar_enviados([a['id'] for a in caixa.prontos()])
+    assert caixa.prontos() == []
+    caixa.fechar()
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from src.caixas import CaixasArray
+
+
+def test_iou_de_caixas_iguais_disjuntas_e_metade():
+    a = CaixasArray([(0, 0, 10, 10)])
+    b = CaixasArray([(0, 0, 10, 10), (20, 20, 5, 5), (5, 0, 10, 10)])
+    iou = a.iou(b)
+    assert iou.shape == (1, 3)
+    assert iou[0, 0] == pytest.approx(1.0)
+    assert iou[0, 1] == 0.0
+    assert iou[0, 2] == pytest.approx(50 / 150)
+
+
+def test_iou_com_caixa_vazia_nao_divide_por_zero():
+    assert CaixasArray([(0, 0, 0, 0)]).iou(CaixasArray([(0, 0, 0, 0)]))[0, 0] == 0.0
+
+
+def _mesclar_em_laco(deteccoes):
+    # Laço de mesclar_deteccoes anterior à versão com CaixasArray
+    deteccoes_mescladas = []
+    deteccoes = sorted(deteccoes, key=lambda x: x[2] * x[3], reverse=True)
+    while deteccoes:
+        x1, y1, w1, h1 = deteccoes.pop(0)
+        i = 0
+        while i < len(deteccoes):
+            x2, y2, w2, h2 = deteccoes[i]
+            if x1 < x2 + w2 and x1 + w1 > x2 and y1 < y2 + h2 and y1 + h1 > y2:
+                x1 = min(x1, x2)
+                y1 = min(y1, y2)
+                w1 = max(x1 + w1, x2 + w2) - x1
+                h1 = max(y1 + h1, y2 + h2) - y1
+                deteccoes.pop(i)
+            else:
+                i += 1
+        deteccoes_mescladas.append((x1, y1, w1, h1))
+    return deteccoes_mescladas
+
+
+def _caixas_aleatorias(rng, n, limite=200, tamanho=(5, 60)):
+    return [(int(rng.integers(0, limite)), int(rng.integers(0, limite)),
+             int(rng.integers(*tamanho)), int(rng.integers(*tamanho))) for _ in range(n)]
+
+
+def test_mesclar_igual_ao_laco_original():
+    rng = np.random.default_rng(5)
+    for _ in range(300):
+        caixas = _caixas_aleatorias(rng, int(rng.integers(0, 12)))
+        assert CaixasArray(caixas).mesclar().lista() == _mesclar_em_laco(caixas)
+
+
+def test_mesclar_e_uma_passada_gulosa():
+    # A terceira só tocaria a primeira depois de ampliada; é examinada antes da segunda
+    caixas = CaixasArray([(0, 0, 20, 20), (24, 0, 10, 10), (15, 0, 9, 10)])
+    assert caixas.mesclar().lista() == [(0, 0, 24, 20), (24, 0, 10, 10)]
+
+
+def test_mesclar_vazia():
+    assert len(CaixasArray().mesclar()) == 0
+
+
+def _associar_em_laco(monitor, corpos, pesos, rostos, mascara, shape):
+    # Filtragem e associação de detectar_pessoas anteriores à versão com CaixasArray
+    pessoas_detectadas = []
+    for (x, y, w, h), peso in zip(corpos, pesos):
+        if peso > monitor.confianca_pessoa and w * h > monitor.area_minima_pessoa:
+            roi = mascara[y:y+h, x:x+w]
+            if roi.size > 0 and np.mean(roi) > monitor.min_movimento_pessoa:
+                rosto_encontrado = None
+                for (rx, ry, rw, rh) in rostos:
+                    if rx > x - w//4 and rx < x + w and ry > y - h//4 and ry < y + h:
+                        rosto_encontrado = (rx, ry, rw, rh)
+                        break
+                if rosto_encontrado is None:
+                    rosto_w = w//3
+                    rosto_encontrado = (x + (w - rosto_w)//2, max(0, y + h//4), rosto_w, h//4)
+                pessoas_detectadas.append({'corpo': (x, y, w, h), 'rosto': rosto_encontrado})
+    for (x, y, w, h) in rostos:
+        ja_detectado = False
+        for pessoa in pessoas_detectadas:
+            rx, ry, rw, rh = pessoa['rosto']
+            if abs(x - rx) < w and abs(y - ry) < h:
+                ja_detectado = True
+            break
+        if not ja_detectado:
+            roi_rosto = mascara[y:y+h, x:x+w]
+            if roi_rosto.size > 0 and np.mean(roi_rosto) > monitor.min_movimento_pessoa:
+                y2 = min(shape[0], y + h * 3)
+                x1 = max(0, x - w//2)
+                x2 = min(shape[1], x + w + w//2)
+                pessoas_detectadas.append({'corpo': (x1, y, x2-x1, y2-y), 'rosto': (x, y, w, h)})
+    return pessoas_detectadas
+
+
+def test_associar_pessoas_igual_ao_laco_original():
+    from src.monitoramento import nomeMonitoramento
+    monitor = nomeMonitoramento()
+    rng = np.random.default_rng(7)
+    shape = (240, 320, 3)
+    for _ in range(300):
+        mascara = np.zeros(shape[:2], np.uint8)
+        for (x, y, w, h) in _caixas_aleatorias(rng, 3, limite=260, tamanho=(20, 120)):
+            mascara[y:y+h, x:x+w] = 255
+        corpos = [(x, y, min(w, 320 - x), min(h, 240 - y))
+                  for (x, y, w, h) in _caixas_aleatorias(rng, int(rng.integers(0, 5)), limite=200, tamanho=(40, 160))]
+        pesos = rng.random(len(corpos)).tolist()
+        rostos = [(x, y, min(w, 320 - x), min(h, 240 - y))
+                  for (x, y, w, h) in _caixas_aleatorias(rng, int(rng.integers(0, 6)), limite=220, tamanho=(10, 40))]
+        esperado = _associar_em_laco(monitor, corpos, pesos, rostos, mascara, shape)
+        obtido = monitor.associar_pessoas(CaixasArray(corpos), pesos, CaixasArray(rostos), mascara, shape)
+        assert obtido == esperado
+
+
+def test_medias_na_mascara_recorta_aos_limites():
+    mascara = np.zeros((100, 100), np.uint8)
+    mascara[:50, :] = 255
+    caixas = CaixasArray([(0, 0, 10, 10), (0, 40, 10, 20), (-10, -10, 20, 20), (200, 200, 10, 10)])
+    medias = caixas.medias_na_mascara(mascara)
+    assert medias.tolist() == pytest.approx([255.0, 127.5, 255.0, 0.0])
+
+
+def test_medias_na_mascara_reduzida_usa_a_escala():
+    # Máscara na metade da resolução do frame, com movimento só no quadrante inferior direito
+    mascara = np.zeros((240, 320), np.uint8)
+    mascara[120:, 160:] = 255
+    caixas = CaixasArray([(400, 300, 100, 150), (50, 50, 100, 200)])
+    assert caixas.medias_na_mascara(mascara, 0.5).tolist() == pytest.approx([255.0, 0.0])
@@ -0,0 +1,90 @@
+import numpy as np
+
+from src.clipes import GravadorClipes
+
+
+def frames_aleatorios(quantidade=5):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (120, 160, 3), np.uint8) for _ in range(quantidade)]
+
+
+def test_clipe_estendido_mantem_o_caminho_do_primeiro_evento(tmp_path):
+    clipes = GravadorClipes(pre=1.0, pos=1.0, escala=1.0)
+    frames = frames_aleatorios()
+    for i in range(10):
+        clipes.adicionar(frames[i % 5], i * 0.1)
+        clipes.aguardar()
+    primeiro = str(tmp_path / 'a_movimento.avi')
+    assert clipes.disparar(primeiro, 1.0) == primeiro
+    assert clipes.caminho_clipe(str(tmp_path / 'b_movimento.avi')) == primeiro
+    assert clipes.disparar(str(tmp_path / 'b_movimento.avi'), 1.5) == primeiro
+    clipes.parar()
+
+
+def test_teto_de_memoria_inclui_o_clipe_aberto(tmp_path):
+    frames = frames_aleatorios()
+    clipes = GravadorClipes(pre=1.0, pos=1000.0, escala=1.0, limite_bytes=1_000_000, duracao_maxima=1000.0)
+    instante = 0.0
+    for i in range(20):
+        clipes.adicionar(frames[i % 5], instante)
+        clipes.aguardar()
+        instante += 0.1
+    clipes.disparar(str(tmp_path / 'c_movimento.avi'), instante)
+
+    pico = 0
+    for i in range(300):
+        clipes.adicionar(frames[i % 5], instante)
+        clipes.aguardar()
+        instante += 0.1
+        pico = max(pico, clipes.total_bytes)
+    assert pico <= 1_000_000
+    assert clipes.cortados == 1
+    assert clipes.descartados == 0
+    clipes.parar()
+    assert clipes.bytes_clipes == 0
+    assert (tmp_path / 'c_movimento.avi').exists()
+
+
+def test_fila_cheia_descarta_o_frame_sem_bloquear(tmp_path):
+    clipes = GravadorClipes(pre=1.0, pos=1.0, escala=1.0, fila_quadros=2)
+    frames = frames_aleatorios()
+    with clipes._lock:  # segura a codificação no primeiro frame
+        for i in range(5):
+            clipes.adicionar(frames[i], i * 0.1)
+        assert clipes.descartados >= 2
+    clipes.aguardar()
+    assert len(clipes.buffer.frames) == 5 - clipes.descartados
+    clipes.parar()
+
+
+def test_frames_na_fila_entram_no_clipe_aberto(tmp_path):
+    clipes = GravadorClipes(pre=1.0, pos=1.0, escala=1.0, fila_quadros=8)
+    frames = frames_aleatorios()
+    with clipes._lock:
+        for i in range(5):
+            clipes.adicionar(frames[i], i * 0.1)
+        caminho = str(tmp_path / 'd_movimento.avi')
+        clipes.disparar(caminho, 0.4)
+    clipes.aguardar()
+    assert len(clipes.ativo.frames) == 5
+    clipes.parar()
+    assert (tmp_path / 'd_movimento.avi').exists()
+
+
+def test_clipe_so_dispara_com_o_evento_na_fila_do_gravador(tmp_path):
+    from src.monitoramento import nomeMonitoramento
+    monitor = nomeMonitoramento()
+    monitor.pasta_registros = str(tmp_path)
+    monitor.deduplicador = None
+    monitor.ativar_clipes(pre=1.0, pos=1.0, escala=1.0)
+    frame = frames_aleatorios(1)[0]
+    monitor.clipes.adicionar(frame)
+
+    monitor.gravador.enfileirar = lambda *args, **kwargs: False
+    monitor.salvar_deteccoes(frame, True, [], [(0, 0, 10, 10)])
+    assert monitor.clipes.ativo is None
+
+    monitor.gravador.enfileirar = lambda *args, **kwargs: True
+    monitor.salvar_deteccoes(frame, True, [], [(0, 0, 10, 10)])
+    assert monitor.clipes.ativo is not None
+    monitor.clipes.parar()
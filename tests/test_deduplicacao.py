@@ -0,0 +1,47 @@
+import cv2
+import numpy as np
+
+from src.deduplicacao import DeduplicadorEventos, dhash_regiao, distancia_hamming
+
+CAIXA = (300, 200, 60, 180)
+
+
+def cena(desenhar):
+    rng = np.random.default_rng(1)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, (480, 640, 3), np.uint8), (31, 31), 0)
+    desenhar(frame)
+    return frame
+
+
+def test_hash_da_regiao_separa_intrusos_diferentes_no_mesmo_lugar():
+    a = cena(lambda f: cv2.rectangle(f, (300, 200), (360, 380), (20, 40, 200), -1))
+    b = cena(lambda f: (cv2.circle(f, (330, 250), 25, (230, 230, 230), -1),
+                        cv2.rectangle(f, (310, 280), (350, 380), (30, 160, 30), -1)))
+    assert distancia_hamming(dhash_regiao(a, CAIXA), dhash_regiao(b, CAIXA)) > DeduplicadorEventos().distancia_maxima
+    assert dhash_regiao(a, CAIXA) == dhash_regiao(a.copy(), CAIXA)
+
+
+def test_repeticao_exige_mesmo_lugar_e_mesmas_pessoas():
+    deduplicador = DeduplicadorEventos()
+    pessoas = [{'corpo': CAIXA}]
+    deduplicador.registrar(0b1010, pessoas, [], 'a.jpg', agora=0)
+    assert deduplicador.procurar(0b1011, pessoas, [], agora=1).caminho_foto == 'a.jpg'
+    assert deduplicador.procurar(0b1010, [], [], agora=2) is None
+    assert deduplicador.procurar(0b1010, [{'corpo': (0, 0, 60, 180)}], [], agora=3) is None
+
+
+def test_repeticoes_param_apos_o_limite_de_quantidade():
+    deduplicador = DeduplicadorEventos(max_repeticoes=3)
+    pessoas = [{'corpo': CAIXA}]
+    deduplicador.registrar(1, pessoas, [], 'a.jpg', agora=0)
+    assert [deduplicador.procurar(1, pessoas, [], agora=t) is not None for t in range(1, 6)] == \
+        [True, True, True, False, False]
+
+
+def test_entrada_repetida_sem_parar_expira_pela_idade():
+    deduplicador = DeduplicadorEventos(validade=60, idade_maxima=100)
+    pessoas = [{'corpo': CAIXA}]
+    deduplicador.registrar(1, pessoas, [], 'a.jpg', agora=0)
+    # Repetida a cada 30 s, nunca fica 60 s sem ser vista, mas sai aos 100 s
+    assert [deduplicador.procurar(1, pessoas, [], agora=t) is not None for t in (30, 60, 90, 120)] == \
+        [True, True, True, False]
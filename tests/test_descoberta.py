@@ -0,0 +1,69 @@
+import threading
+import time
+
+from src import descoberta
+
+
+class CameraFalsa:
+    def __init__(self, indice, backend):
+        self.indice = indice
+        self.backend = backend
+        self.liberada = False
+        self.cap = self
+
+    def release(self):
+        self.liberada = True
+
+
+def sonda_falsa(monkeypatch, funcionam, demora=0.05):
+    """Troca sondar por uma que registra aberturas simultâneas do mesmo índice"""
+    abertos, sobreposicoes, chamadas, abertas = {}, [], [], []
+    lock = threading.Lock()
+
+    def sondar(indice, backend, largura, altura, fps):
+        with lock:
+            chamadas.append((indice, backend))
+            if abertos.get(indice):
+                sobreposicoes.append(indice)
+            abertos[indice] = True
+        time.sleep(demora)
+        with lock:
+            abertos[indice] = False
+        if (indice, backend) not in funcionam:
+            return None
+        camera = CameraFalsa(indice, backend)
+        abertas.append(camera)
+        return camera
+
+    monkeypatch.setattr(descoberta, 'sondar', sondar)
+    return sobreposicoes, chamadas, abertas
+
+
+def candidatos(backends, indices):
+    return [(i, b, 640, 480, 30) for b in backends for i in indices]
+
+
+def test_backends_do_mesmo_indice_em_sequencia(monkeypatch):
+    sobreposicoes, chamadas, _ = sonda_falsa(monkeypatch, funcionam={(1, 'b')})
+    camera = descoberta.sondar_em_paralelo(candidatos(['a', 'b', 'c'], [0, 1]), timeout=5.0)
+    assert (camera.indice, camera.backend) == (1, 'b')
+    assert sobreposicoes == []
+    # O índice 1 para no primeiro backend que funciona
+    assert (1, 'c') not in chamadas
+
+
+def test_vence_a_ordem_dos_candidatos(monkeypatch):
+    # O índice 1 com o primeiro backend vem antes do índice 0 com o segundo
+    sonda_falsa(monkeypatch, funcionam={(0, 'b'), (1, 'a')})
+    camera = descoberta.sondar_em_paralelo(candidatos(['a', 'b'], [0, 1]), timeout=5.0)
+    assert (camera.indice, camera.backend) == (1, 'a')
+
+
+def test_cameras_que_perdem_sao_liberadas(monkeypatch):
+    _, _, abertas = sonda_falsa(monkeypatch, funcionam={(0, 'a'), (1, 'a')})
+    camera = descoberta.sondar_em_paralelo(candidatos(['a', 'b'], [0, 1]), timeout=5.0)
+    assert (camera.indice, camera.backend) == (0, 'a')
+    time.sleep(0.2)
+    assert len(abertas) == 2
+    assert not camera.liberada
+    assert all(c.liberada for c in abertas if c is not camera)
@@ -0,0 +1,34 @@
+import os
+
+from src.indice_eventos import IndiceEventos
+
+
+def _evento(pasta, nome, pessoas=1, objetos=2):
+    caminho_foto = os.path.join(pasta, nome + '_movimento.jpg')
+    caminho_txt = caminho_foto[:-len('.jpg')] + '.txt'
+    with open(caminho_foto, 'wb') as f:
+        f.write(b'\xff\xd8' + b'\x00' * 100)
+    with open(caminho_txt, 'w') as f:
+        f.write(f"Pessoas detectadas: {pessoas}\nObjetos detectados: {objetos}\n")
+    return caminho_foto, caminho_txt
+
+
+def test_reconstruir_mantem_caixas_trilhas_e_repeticoes(tmp_path):
+    pasta = str(tmp_path)
+    indice = IndiceEventos(pasta)
+    foto, txt = _evento(pasta, '20260101_120000')
+    outra, _ = _evento(pasta, '20260101_120100', pessoas=0, objetos=1)
+    indice.registrar(1.0, foto, txt, pessoas=1, objetos=2, caixas=[[1, 2, 3, 4]], trilhas=[7])
+    indice.registrar_repeticao(foto, 5.0)
+    indice.registrar_repeticao(foto, 6.0)
+
+    assert indice.reconstruir() == 2
+    evento = indice.por_foto(foto)
+    assert evento['caixas'] == [[1, 2, 3, 4]]
+    assert evento['trilhas'] == [7]
+    assert evento['repeticoes'] == 2
+    assert evento['ultima_repeticao'] == 6.0
+    # Eventos que só existem na pasta entram sem esses dados
+    novo = indice.por_foto(outra)
+    assert (novo['objetos'], novo['caixas'], novo['repeticoes']) == (1, None, 0)
+    indice.fechar()
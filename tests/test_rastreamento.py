@@ -0,0 +1,60 @@
+from src.rastreamento import Rastreador
+
+
+def test_mesma_pessoa_mantem_o_id_entre_frames():
+    rastreador = Rastreador()
+    rastreador.avancar()
+    assert rastreador.atualizar([(0, 0, 50, 100), (300, 0, 50, 100)]) == [1, 2]
+    rastreador.avancar()
+    # Ordem trocada e um pequeno deslocamento: cada caixa fica com a sua trilha
+    assert rastreador.atualizar([(305, 2, 50, 100), (4, 0, 50, 100)]) == [2, 1]
+    assert rastreador.criadas == 2
+
+
+def test_caixa_distante_abre_trilha_nova():
+    rastreador = Rastreador()
+    rastreador.avancar()
+    rastreador.atualizar([(0, 0, 50, 100)])
+    rastreador.avancar()
+    assert rastreador.atualizar([(500, 300, 50, 100)]) == [2]
+
+
+def test_duas_deteccoes_nao_dividem_a_mesma_trilha():
+    rastreador = Rastreador()
+    rastreador.avancar()
+    rastreador.atualizar([(0, 0, 50, 100)])
+    rastreador.avancar()
+    ids = rastreador.atualizar([(0, 0, 50, 100), (2, 0, 50, 100)])
+    assert ids[0] == 1 and ids[1] == 2
+
+
+def test_trilha_abandonada_e_descartada():
+    rastreador = Rastreador(max_ausencia=2)
+    rastreador.avancar()
+    rastreador.atualizar([(0, 0, 50, 100)])
+    for _ in range(3):
+        rastreador.avancar()
+    assert rastreador.trilhas == []
+    assert rastreador.atualizar([(0, 0, 50, 100)]) == [2]
+
+
+def test_perdidas_e_manter_pelo_movimento():
+    rastreador = Rastreador()
+    rastreador.avancar()
+    rastreador.atualizar([(0, 0, 50, 100), (300, 0, 50, 100)])
+    rastreador.avancar()
+    rastreador.atualizar([(0, 0, 50, 100)])
+    assert [t.id for t in rastreador.perdidas] == [2]
+    rastreador.avancar()
+    assert [t.id for t in rastreador.manter([(310, 10, 20, 20)])] == [2]
+
+
+def test_reiniciar_recomeca_ids_e_contagem():
+    rastreador = Rastreador()
+    rastreador.avancar()
+    rastreador.atualizar([(0, 0, 50, 100), (300, 0, 50, 100)])
+    rastreador.reiniciar()
+    assert rastreador.trilhas == [] and rastreador.criadas == 0
+    rastreador.avancar()
+    assert rastreador.atualizar([(500, 300, 50, 100)]) == [1]
+    assert rastreador.criadas == 1
@@ -0,0 +1,88 @@
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip('watchdog')
+
+_CAMINHO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'monitorar-pasta-registros', 'monitorar-pasta.py')
+_spec = importlib.util.spec_from_file_location('monitorar_pasta', _CAMINHO)
+monitorar_pasta = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(monitorar_pasta)
+
+
+def criar_evento(pasta, prefixo, criado, tamanho=1000, clipe=None):
+    arquivos = []
+    for sufixo, conteudo in (('_movimento.jpg', b'j' * tamanho),
+                             ('_movimento.txt', (f"Clipe: {clipe}\n" if clipe else "Detecção\n").encode())):
+        caminho = os.path.join(pasta, prefixo + sufixo)
+        with open(caminho, 'wb') as f:
+            f.write(conteudo)
+        os.utime(caminho, (criado, criado))
+        arquivos.append(caminho)
+    return arquivos
+
+
+def eventos_na_pasta(pasta):
+    return sorted(n[:15] for n in os.listdir(pasta) if n.endswith('_movimento.jpg'))
+
+
+def test_limpeza_vai_ate_a_marca_inferior_removendo_os_mais_antigos(tmp_path):
+    pasta = str(tmp_path)
+    for i in range(10):
+        criar_evento(pasta, f'20260101_0000{i:02d}', criado=1000 + i)
+    retencao = monitorar_pasta.ServicoRetencao(pasta, limite_bytes=10 ** 9, limite_eventos=8,
+                                               marca_inferior=0.5)
+    retencao.carregar()
+    retencao.aplicar_limites()
+    # 10 eventos passam do limite de 8: a limpeza desce até 4 (50%) de uma vez
+    assert eventos_na_pasta(pasta) == [f'20260101_0000{i:02d}' for i in range(6, 10)]
+    assert len(retencao.eventos) == 4
+
+
+def test_limite_em_bytes_com_contagem_incremental(tmp_path):
+    pasta = str(tmp_path)
+    for i in range(4):
+        criar_evento(pasta, f'20260101_0000{i:02d}', criado=1000 + i)
+    retencao = monitorar_pasta.ServicoRetencao(pasta, limite_bytes=5000, marca_inferior=0.9)
+    retencao.carregar()
+    retencao.aplicar_limites()
+    assert len(retencao.eventos) == 4
+
+    # Um evento novo passa do limite: sai só o mais antigo (4 x ~1010 bytes <= 4500)
+    for caminho in criar_evento(pasta, '20260101_000010', criado=2000):
+        retencao.arquivo_criado(caminho)
+    assert eventos_na_pasta(pasta) == ['20260101_000001', '20260101_000002', '20260101_000003',
+                                       '20260101_000010']
+    assert retencao.total_bytes == sum(os.path.getsize(os.path.join(pasta, n)) for n in os.listdir(pasta)
+                                       if '_movimento' in n)
+
+
+def test_evento_vencido_sai_mesmo_abaixo_dos_limites(tmp_path):
+    pasta = str(tmp_path)
+    criar_evento(pasta, '20260101_000000', criado=1000)
+    criar_evento(pasta, '20260101_000001', criado=os.path.getmtime(pasta))
+    retencao = monitorar_pasta.ServicoRetencao(pasta, idade_maxima=3600)
+    retencao.carregar()
+    retencao.aplicar_limites()
+    assert eventos_na_pasta(pasta) == ['20260101_000001']
+
+
+def test_clipe_estendido_fica_ate_o_ultimo_evento_que_o_cita(tmp_path):
+    pasta = str(tmp_path)
+    clipe = '20260101_000000_movimento.avi'
+    criar_evento(pasta, '20260101_000000', criado=1000, clipe=clipe)
+    criar_evento(pasta, '20260101_000005', criado=1001, clipe=clipe)
+    criar_evento(pasta, '20260101_000010', criado=1002)
+    with open(os.path.join(pasta, clipe), 'wb') as f:
+        f.write(b'v' * 5000)
+    retencao = monitorar_pasta.ServicoRetencao(pasta, limite_eventos=2, marca_inferior=1.0)
+    retencao.carregar()
+
+    retencao.aplicar_limites()
+    assert os.path.exists(os.path.join(pasta, clipe))
+    retencao.limite_eventos = 1
+    retencao.aplicar_limites()
+    assert not os.path.exists(os.path.join(pasta, clipe))
+    assert eventos_na_pasta(pasta) == ['20260101_000010']
@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.zonas import ALINHAMENTO, ZonasCamera
+
+
+def test_sem_zonas_o_frame_inteiro_e_analisado():
+    recorte, mascara = ZonasCamera().rasterizar(640, 480, 0.5)
+    assert recorte == (0, 0, 640, 480)
+    assert mascara.shape == (240, 320)
+    assert (mascara == 255).all()
+
+
+def test_recorte_alinhado_envolve_a_zona_de_interesse():
+    zonas = ZonasCamera(interesse=[[[0.0, 0.5], [0.5, 0.5], [0.5, 1.0], [0.0, 1.0]]])
+    (x, y, w, h), mascara = zonas.rasterizar(640, 480, 0.5)
+    assert x % ALINHAMENTO == 0 and y % ALINHAMENTO == 0
+    assert x <= 0 and y <= 240 and x + w >= 320 and y + h >= 480
+    assert mascara.shape == (int(round(h * 0.5)), int(round(w * 0.5)))
+    # Dentro do recorte, só a zona passa
+    assert mascara[10:-10, 10:150].min() == 255
+
+
+def test_exclusao_zera_a_area_dentro_da_interesse():
+    zonas = ZonasCamera(interesse=[[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]]],
+                        exclusao=[[[0.25, 0.25], [0.75, 0.25], [0.75, 0.75], [0.25, 0.75]]])
+    recorte, mascara = zonas.rasterizar(400, 400, 0.5)
+    assert recorte == (0, 0, 400, 400)
+    assert mascara[100, 100] == 0
+    assert mascara[10, 10] == 255
+    assert abs(np.count_nonzero(mascara) / mascara.size - zonas.fracao_analisada(400, 400)) < 0.01
+    assert abs(zonas.fracao_analisada(400, 400) - 0.75) < 0.01
+
+
+def test_tudo_excluido_nao_tem_recorte():
+    zonas = ZonasCamera(exclusao=[[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]]])
+    assert zonas.rasterizar(640, 480) == (None, None)
@@ -0,0 +1,90 @@
+"""
+Mede o fluxo de envio contra a página local pagina_teste.html, sem rede e
+sem conta do WhatsApp: tempo até a sessão pronta e tempo por alerta, com o
+cache de seletores vazio e depois aproveitado.
+
+Uso (na pasta whatsapp_sender):
+    python benchmark_envio.py --alertas 10
+    python benchmark_envio.py --alertas 10 --legado --atraso 300
+    python benchmark_envio.py --alertas 10 --janela 5
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import tempfile
+import time
+
+from PIL import Image
+
+from monitor_whatsapp import RegistrosHandler
+
+
+def criar_registro(pasta):
+    caminho_foto = os.path.join(pasta, '20250101_120000_movimento.jpg')
+    caminho_txt = os.path.join(pasta, '20250101_120000_movimento.txt')
+    Image.new('RGB', (640, 480), (90, 120, 150)).save(caminho_foto, quality=90)
+    with open(caminho_txt, 'w') as f:
+        f.write("Detecção em: 2025-01-01 12:00:00\nPessoas detectadas: 1\nObjetos detectados: 2\n")
+    return {'id': 1, 'caminho_foto': caminho_foto, 'caminho_txt': caminho_txt, 'recebido': time.time()}
+
+
+def rodada(nome, pasta, config, alerta, alertas):
+    caminho_config = os.path.join(pasta, 'config.json')
+    with open(caminho_config, 'w') as f:
+        json.dump(config, f)
+
+    inicio = time.perf_counter()
+    handler = RegistrosHandler(caminho_config, pasta_registros=pasta)
+    try:
+        handler.sessao_pronta.wait(120)
+        if handler.erro_inicializacao is not None:
+            raise handler.erro_inicializacao
+        sessao = time.perf_counter() - inicio
+
+        tempos = []
+        for _ in range(alertas):
+            inicio_alerta = time.perf_counter()
+            if handler.enviar_alerta([dict(alerta)]):
+                print("Falha no envio")
+            tempos.append(time.perf_counter() - inicio_alerta)
+    finally:
+        handler.agregador.parar()
+        if handler.driver is not None:
+            handler.driver.quit()
+
+    print(f"{nome}: sessão pronta em {sessao:.2f} s | alerta: média {statistics.mean(tempos) * 1000:.0f} ms, "
+          f"mediana {statistics.median(tempos) * 1000:.0f} ms, máximo {max(tempos) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do envio contra a página de teste local")
+    parser.add_argument('--alertas', type=int, default=10)
+    parser.add_argument('--atraso', type=int, default=150, help="ms até o tique de enviada na página de teste")
+    parser.add_argument('--legado', action='store_true',
+                        help="Campo de mensagem só pelo último seletor da lista")
+    parser.add_argument('--janela', type=int, default=0,
+                        help="Mensagens mantidas no DOM da página de teste (lista virtualizada); 0 = todas")
+    parser.add_argument('--mostrar', action='store_true', help="Abrir o navegador visível")
+    args = parser.parse_args()
+
+    pagina = pathlib.Path(__file__).with_name('pagina_teste.html').resolve().as_uri()
+    link = (f"{pagina}?atraso={args.atraso}&janela={args.janela}"
+            + ("&legado=1" if args.legado else ""))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        alerta = criar_registro(pasta)
+        config = {
+            'grupo_destino': 'Grupo de teste',
+            'link_grupo': link,
+            'perfil_chrome': os.path.join(pasta, 'perfil'),
+            'cache_seletores': os.path.join(pasta, 'seletores_cache.json'),
+            'argumentos_chrome': [] if args.mostrar else ['--headless=new'],
+        }
+        rodada("Cache de seletores vazio", pasta, config, alerta, args.alertas)
+        rodada("Cache de seletores aproveitado", pasta, config, alerta, args.alertas)
+
+
+if __name__ == "__main__":
+    main()
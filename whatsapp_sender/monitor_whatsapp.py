@@ -1,19 +1,114 @@
+import time
+_INICIO_IMPORTACAO = time.perf_counter()
 import os
+import sys
 import json
-import time
+import threading
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+# O driver do Chrome, o WebDriverWait, o pyperclip e o OpenCV (src.artefato) são
+# importados só quando usados, fora do caminho de inicialização
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import pyperclip
-from PIL import Image
-import io
 from selenium.common.exceptions import TimeoutException
-import pyautogui
+
+# Adicionar diretório raiz ao PYTHONPATH para usar o índice de eventos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.caixa_saida import CaixaSaida
+from src.indice_eventos import IndiceEventos, ler_contagens, timestamp_evento
+from seletores import CacheSeletores, ICONES_ENVIADA, SELETORES
+
+_TEMPO_IMPORTACAO = time.perf_counter() - _INICIO_IMPORTACAO
+
+
+class AgregadorAlertas:
+    """
+    Trabalhador que esvazia a caixa de saída. A primeira detecção depois de
+    um período calmo sai na hora; as que chegam dentro do intervalo mínimo
+    entre alertas esperam o fim da janela e seguem num único alerta
+    combinado. Uma falha adia o lote com espera crescente, sem perdê-lo.
+    Nada é enviado antes de sessao_pronta; até lá os alertas se acumulam
+    na caixa.
+    """
+    def __init__(self, caixa, enviar, intervalo=5, sessao_pronta=None):
+        self.caixa = caixa
+        self.enviar = enviar  # recebe a lista de alertas e retorna os ids que ficaram sem enviar
+        self.intervalo = intervalo
+        self.sessao_pronta = sessao_pronta or threading.Event()
+        if sessao_pronta is None:
+            self.sessao_pronta.set()
+        self._ultimo_envio = None
+        self._novos = False
+        self._rodando = True
+        self._condicao = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name='alertas', daemon=True)
+        self._thread.start()
+
+    def notificar(self):
+        """Avisa que há alertas novos na caixa de saída"""
+        with self._condicao:
+            self._novos = True
+            self._condicao.notify()
+
+    def _loop(self):
+        # O navegador abre em paralelo; o que chegar até lá fica na caixa
+        while not self.sessao_pronta.wait(0.5):
+            if not self._rodando:
+                return
+
+        while True:
+            with self._condicao:
+                self._novos = False
+                rodando = self._rodando
+
+            lote = self.caixa.prontos()
+            if not lote:
+                if not rodando:
+                    return
+                # Dorme até um alerta novo ou até o fim da espera do próximo adiado
+                proxima = self.caixa.proxima_tentativa()
+                espera = None if proxima is None else max(proxima - time.time(), 0.05)
+                with self._condicao:
+                    self._condicao.wait_for(lambda: self._novos or not self._rodando, espera)
+                continue
+
+            if rodando and self._ultimo_envio is not None:
+                espera = self._ultimo_envio + self.intervalo - time.monotonic()
+                if espera > 0:
+                    with self._condicao:
+                        self._condicao.wait_for(lambda: not self._rodando, espera)
+                    continue
+
+            # Registros já apagados pela limpeza não têm o que enviar
+            removidos = [a['id'] for a in lote if not os.path.exists(a['caminho_foto'])]
+            if removidos:
+                self.caixa.descartar(removidos, 'arquivo removido')
+                lote = [a for a in lote if a['id'] not in removidos]
+                if not lote:
+                    continue
+
+            ids = [a['id'] for a in lote]
+            try:
+                pendentes = set(self.enviar(lote))
+                erro = 'falha no envio'
+            except Exception as e:
+                pendentes, erro = set(ids), str(e)
+                print(f"Erro ao enviar alerta: {erro}")
+
+            self._ultimo_envio = time.monotonic()
+            enviados = [i for i in ids if i not in pendentes]
+            if enviados:
+                self.caixa.marcar_enviados(enviados)
+            if pendentes:
+                self.caixa.adiar(sorted(pendentes), erro)
+            print(self.caixa.resumo())
+
+    def parar(self, timeout=60):
+        """Envia o que estiver pronto, sem esperar a janela, e encerra; o resto fica na caixa"""
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        self._thread.join(timeout)
 
 
 class RegistrosHandler(FileSystemEventHandler):
@@ -21,20 +116,51 @@ class RegistrosHandler(FileSystemEventHandler):
     Classe que gerencia o monitoramento de arquivos e envio de mensagens no WhatsApp
     Herda de FileSystemEventHandler para detectar mudanças nos arquivos
     """
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, pasta_registros=None):
         # Inicialização das variáveis da classe
         self.ultima_msg = None  # Armazena timestamp da última mensagem enviada
         self.intervalo_msgs = 5  # Intervalo mínimo entre mensagens (5 segundos)
-        self.max_tentativas = 2  # Número máximo de tentativas para enviar mensagem
         self.driver = None  # Driver do Selenium para controlar o navegador
+        self.pasta_registros = pasta_registros or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'registros')
         
         # Define o caminho do arquivo de configuração
         if config_path is None:
             config_path = os.path.join(os.path.dirname(__file__), 'config_whatsapp.json')
         
-        # Carrega configurações e inicializa o WhatsApp
+        # Alertas ficam em disco até serem enviados; esquecidos depois de 30 dias
+        self.caixa = CaixaSaida(self.pasta_registros)
+        self.caixa.remover_enviados(30 * 24 * 3600)
+        
+        # Carrega configurações
         self.carregar_config(config_path)
-        self.inicializar_whatsapp()
+        # Imagens enviadas num alerta combinado
+        self.max_imagens = self.config.get('max_imagens', 3)
+        # Variante enviada: 'recorte' (região das detecções), 'miniatura' ou 'original'
+        self.imagem_envio = self.config.get('imagem_envio', 'recorte')
+        # Seletores que funcionaram na última execução
+        self.seletores = CacheSeletores(self.config.get('cache_seletores') or
+                                        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seletores_cache.json'))
+        
+        # Tempo até o primeiro alerta depois de um reinício
+        self.inicio = time.monotonic()
+        self.primeiro_alerta = None
+        self.sessao_pronta = threading.Event()
+        self.erro_inicializacao = None
+        
+        # Eventos gravados com o envio parado entram na caixa antes dos novos
+        print("Enfileirando última detecção...")
+        self.enviar_ultima_deteccao()
+        
+        # O envio fica numa thread própria e só começa com a sessão pronta;
+        # o handler só enfileira, desde já
+        self.agregador = AgregadorAlertas(self.caixa, self.enviar_alerta, self.intervalo_msgs,
+                                          self.sessao_pronta)
+        print(self.caixa.resumo())
+        
+        # O WhatsApp abre em segundo plano enquanto a pasta já é monitorada
+        self._thread_whatsapp = threading.Thread(target=self._inicializar_em_segundo_plano,
+                                                 name='whatsapp', daemon=True)
+        self._thread_whatsapp.start()
 
     def carregar_config(self, config_path):
         """Carrega as configurações do arquivo JSON"""
@@ -45,132 +171,117 @@ class RegistrosHandler(FileSystemEventHandler):
             print(f"Erro: Arquivo de configuração não encontrado em: {config_path}")
             raise
 
+    def _inicializar_em_segundo_plano(self):
+        try:
+            self.inicializar_whatsapp()
+        except Exception as e:
+            self.erro_inicializacao = e
+            return
+        self.sessao_pronta.set()
+        print(f"Sessão do WhatsApp pronta em {time.monotonic() - self.inicio:.1f} s")
+
     def inicializar_whatsapp(self):
-        """Inicializa o navegador e faz login no WhatsApp Web"""
+        """
+        Inicializa o navegador e abre o grupo no WhatsApp Web. O perfil do
+        Chrome fica em disco, então o QR Code só é pedido no primeiro uso.
+        """
         try:
+            from selenium import webdriver
+            
             # Configura as opções do Chrome
             options = webdriver.ChromeOptions()
+            perfil = self.config.get('perfil_chrome') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perfil_chrome')
+            options.add_argument(f"--user-data-dir={os.path.abspath(perfil)}")  # Reaproveita a sessão
             options.add_argument("--start-maximized")  # Maximiza a janela
             options.add_argument("--disable-notifications")  # Desativa notificações
             options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36")
+            for argumento in self.config.get('argumentos_chrome', []):
+                options.add_argument(argumento)  # Ex.: --headless=new no benchmark
             
             # Inicia o navegador Chrome
             self.driver = webdriver.Chrome(options=options)
             
-            # Abre o WhatsApp Web
-            self.driver.get("https://web.whatsapp.com")
-            print("Aguarde o QR Code ser escaneado...")
-            
-            # Aguarda até 120 segundos para o scan do QR Code
-            wait = WebDriverWait(self.driver, 120)
-            
-            # Procura a caixa de pesquisa
-            search_box = wait.until(EC.presence_of_element_located((
-                By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'
-            )))
-            
-            print("WhatsApp Web carregado, procurando grupo...")
-            
-            # Procura e seleciona o grupo configurado
-            search_box.clear()
-            search_box.send_keys(self.config['grupo_destino'])
-            time.sleep(3)
-            
-            # Tenta diferentes seletores para encontrar o grupo
-            grupo = None
-            seletores = [
-                f'//span[@title="{self.config["grupo_destino"]}"]',
-                f'//div[@title="{self.config["grupo_destino"]}"]',
-                f'//div[contains(@title, "{self.config["grupo_destino"]}")]'
-            ]
-            
-            # Tenta cada seletor até encontrar o grupo
-            for seletor in seletores:
-                try:
-                    grupo = wait.until(EC.element_to_be_clickable((By.XPATH, seletor)))
-                    break
-                except:
-                    continue
-            
-            if grupo is None:
-                raise Exception(f"Não foi possível encontrar o grupo: {self.config['grupo_destino']}")
-            
-            # Clica no grupo e aguarda
-            grupo.click()
-            time.sleep(2)
+            link_grupo = self.config.get('link_grupo')
+            if link_grupo:
+                # Abre a conversa do grupo direto, sem passar pela pesquisa
+                self.driver.get(link_grupo)
+            else:
+                self.driver.get("https://web.whatsapp.com")
+            print("Aguarde o carregamento (o QR Code só é pedido sem sessão salva)...")
             
-            # Envia a última detecção ao inicializar
-            print("Enviando última detecção...")
-            self.enviar_ultima_deteccao()
+            if link_grupo:
+                # O campo de mensagem aparece quando a conversa está aberta
+                self.seletores.encontrar(self.driver, 'campo_mensagem', timeout=120)
+                print("WhatsApp Web carregado com o grupo aberto")
+            else:
+                self.abrir_grupo_pela_pesquisa()
             
         except Exception as e:
             print(f"Erro ao inicializar WhatsApp: {str(e)}")
-            if hasattr(self, 'driver'):
+            if self.driver is not None:
                 self.driver.quit()
+                self.driver = None
             raise
 
+    def abrir_grupo_pela_pesquisa(self):
+        """Caminho sem link_grupo na configuração: procura o grupo pelo nome"""
+        # Aguarda até 120 segundos para o scan do QR Code
+        search_box = self.seletores.encontrar(self.driver, 'campo_pesquisa', timeout=120)
+        
+        print("WhatsApp Web carregado, procurando grupo...")
+        
+        # Procura e seleciona o grupo configurado; a espera termina assim
+        # que o resultado da pesquisa aparece
+        search_box.clear()
+        search_box.send_keys(self.config['grupo_destino'])
+        try:
+            grupo = self.seletores.encontrar(self.driver, 'grupo', timeout=10, clicavel=True,
+                                             grupo=self.config['grupo_destino'])
+        except TimeoutException:
+            raise Exception(f"Não foi possível encontrar o grupo: {self.config['grupo_destino']}")
+        
+        # Clica no grupo e aguarda a conversa abrir
+        grupo.click()
+        self.seletores.encontrar(self.driver, 'campo_mensagem', timeout=30)
+
     def enviar_ultima_deteccao(self):
-        """Envia a última detecção encontrada na pasta de registros"""
+        """
+        Enfileira os eventos gravados com o envio parado (ou, na primeira
+        execução, a última detecção). Eventos já enviados não se repetem.
+        """
         try:
-            pasta_registros = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'registros')
-            print(f"Verificando pasta: {pasta_registros}")
-            
-            # Listar todos os arquivos jpg com seus timestamps
-            arquivos_jpg = []
-            for arquivo in os.listdir(pasta_registros):
-                if arquivo.endswith('.jpg'):
-                    caminho_completo = os.path.join(pasta_registros, arquivo)
-                    timestamp = os.path.getmtime(caminho_completo)  # Pegar timestamp de modificação
-                    arquivos_jpg.append((arquivo, timestamp))
-            
-            print(f"Total de imagens encontradas: {len(arquivos_jpg)}")
+            pasta_registros = self.pasta_registros
+            print(f"Consultando índice de eventos em: {pasta_registros}")
             
-            if not arquivos_jpg:
-                print("Nenhuma imagem encontrada na pasta registros")
-                return
-            
-            # Ordenar por timestamp e pegar o mais recente
-            arquivos_jpg.sort(key=lambda x: x[1], reverse=True)  # Ordenar do mais recente para o mais antigo
-            ultima_foto, timestamp = arquivos_jpg[0]
-            
-            # Converter timestamp para data legível
-            data_modificacao = datetime.fromtimestamp(timestamp)
-            print(f"Última imagem: {ultima_foto}")
-            print(f"Data de modificação: {data_modificacao}")
-            
-            caminho_foto = os.path.join(pasta_registros, ultima_foto)
-            
-            # Verificar se o arquivo existe e pode ser aberto
+            # O índice guarda os eventos em ordem; não é preciso varrer a pasta
+            indice = IndiceEventos(pasta_registros)
             try:
-                with Image.open(caminho_foto) as img:
-                    print(f"Imagem válida: {img.format} {img.size}")
-                    print(f"Caminho completo: {caminho_foto}")
-            except Exception as e:
-                print(f"Erro ao abrir imagem: {str(e)}")
-                return
+                ultimo_recebido = self.caixa.ultimo_recebido()
+                if ultimo_recebido is None:
+                    evento = indice.ultimo()
+                    eventos = [evento] if evento is not None else []
+                else:
+                    eventos = indice.desde(ultimo_recebido)
+            finally:
+                indice.fechar()
             
-            # Procurar arquivo de texto correspondente
-            caminho_txt = caminho_foto.replace('.jpg', '.txt')
+            if not eventos:
+                print("Nenhum evento novo no índice. Para indexar registros antigos, rode: "
+                      "python -m src.indice_eventos --reconstruir")
+                return
             
-            mensagem = "!! ALERTA: Mudança Identificada !!\n"
-            if os.path.exists(caminho_txt):
-                with open(caminho_txt, 'r') as f:
-                    mensagem += f"\nDetalhes:\n{f.read()}"
+            novos = 0
+            for evento in eventos:
+                caminho_foto = evento['caminho_foto']
+                caminho_txt = evento['caminho_txt'] or caminho_foto.replace('.jpg', '.txt')
+                novos += self.caixa.enfileirar(caminho_foto, caminho_txt, evento['timestamp'])
             
-            # Enviar mensagem e imagem
-            if self.enviar_mensagem_whatsapp(mensagem):
-                print("Mensagem enviada, aguardando para enviar imagem...")
-                time.sleep(2)
-                
-                if self.enviar_arquivo(caminho_foto):
-                    print("Imagem enviada com sucesso")
-                else:
-                    print("Falha ao enviar imagem")
-            else:
-                print("Falha ao enviar mensagem")
+            print(f"Última imagem: {os.path.basename(eventos[-1]['caminho_foto'])}")
+            print(f"Data da detecção: {datetime.fromtimestamp(eventos[-1]['timestamp'])}")
+            print(f"Detecções enfileiradas para envio: {novos}")
             
         except Exception as e:
-            print(f"Erro ao enviar última detecção: {str(e)}")
+            print(f"Erro ao enfileirar última detecção: {str(e)}")
             import traceback
             traceback.print_exc()
     
@@ -214,60 +325,67 @@ class RegistrosHandler(FileSystemEventHandler):
             print(f"Caminho do arquivo: {caminho_arquivo}")
             return False'''
     
-    def enviar_arquivo(self, caminho_arquivo):
-        try:
-            # Aumenta o tempo de espera para garantir que o botão de anexo apareça
-            print("Aguardando o botão de anexo aparecer...")
-            wait = WebDriverWait(self.driver, 30)  # Aumenta o tempo de espera para até 30 segundos
+    def inserir_texto(self, campo, texto):
+        """
+        Escreve o texto inteiro numa só operação: insertText no campo focado
+        (quebras de linha incluídas) ou, se o navegador recusar, colar pela
+        área de transferência. Evita um send_keys por linha.
+        """
+        inserido = self.driver.execute_script(
+            "arguments[0].focus();"
+            "return document.execCommand('insertText', false, arguments[1]);",
+            campo, texto)
+        if not inserido:
+            import pyperclip
+            pyperclip.copy(texto)
+            campo.send_keys(Keys.CONTROL, 'v')
 
-            try:
-                # 1. Tentar encontrar o botão de anexo com o seletor original
-                attach_button = wait.until(EC.element_to_be_clickable((
-                    By.CSS_SELECTOR, 'button[title="Anexar"]'
-                # Seletor original do botão de anexo
-                )))
-                print("Botão de anexo encontrado com seletor original.")
-
-            except:
-                try:
-                    # 2. Se o seletor original falhar, tentar um seletor alternativo
-                    attach_button = wait.until(EC.element_to_be_clickable((
-                        By.CSS_SELECTOR, 'span[data-icon="plus"]'
-                    # Seletor alternativo
-                    )))
-                    print("Botão de anexo encontrado com seletor alternativo.")
-                except:
-                    print("Erro: Não foi possível encontrar o botão de anexo.")
-                    return False  # Se o botão não for encontrado, retorna False
-
-            # 2. Clicar no botão de anexo
-            attach_button.click()
-            print("Botão de anexo clicado")
-
-            # 3. Esperar o campo de input de arquivo de imagem aparecer
-            file_input = wait.until(EC.presence_of_element_located((
-                By.CSS_SELECTOR, 'input[accept="image/*,video/mp4,video/3gpp,video/quicktime"]'  # Campo para enviar arquivos
-            )))
-
-            # Verificar se o arquivo existe antes de enviá-lo
+    def enviar_arquivo(self, caminho_arquivo, legenda=None):
+        """Anexa a imagem e envia, com a legenda (o texto do alerta) no mesmo envio"""
+        try:
+            # Verificar se o arquivo existe antes de abrir o anexo
             caminho_absoluto = os.path.abspath(caminho_arquivo)
             if not os.path.exists(caminho_absoluto):
                 print(f"Erro: Arquivo não encontrado: {caminho_absoluto}")
                 return False  # Se o arquivo não existir, retorna False
 
-            # 4. Enviar o caminho absoluto do arquivo
+            # 1. Botão de anexo
+            try:
+                attach_button = self.seletores.encontrar(self.driver, 'botao_anexo', timeout=30, clicavel=True)
+            except TimeoutException:
+                print("Erro: Não foi possível encontrar o botão de anexo.")
+                return False  # Se o botão não for encontrado, retorna False
+            ultima_antes = self.seletores.ultimo_id(self.driver, 'mensagens_enviadas')
+            attach_button.click()
+
+            # 2. Campo de arquivo de imagem
+            file_input = self.seletores.encontrar(self.driver, 'entrada_arquivo', timeout=10)
             file_input.send_keys(caminho_absoluto)
             print(f"Imagem selecionada: {caminho_absoluto}")
 
-            # 5. Aguardar o botão de envio ficar visível e clicável
-            send_button = wait.until(EC.element_to_be_clickable((
-                By.CSS_SELECTOR, 'span[data-icon="send"]'  # Botão de envio
-            )))
+            # 3. A pré-visualização está pronta quando o botão de envio aparece
+            send_button = self.seletores.encontrar(self.driver, 'botao_enviar', timeout=30, clicavel=True)
+
+            # 4. Legenda no campo da pré-visualização
+            legenda_pendente = legenda
+            if legenda:
+                try:
+                    campo_legenda = self.seletores.encontrar(self.driver, 'campo_legenda', timeout=3)
+                    self.inserir_texto(campo_legenda, legenda)
+                    legenda_pendente = None
+                except TimeoutException:
+                    print("Campo de legenda não encontrado; o texto segue em mensagem separada")
+
             send_button.click()
-            print("Imagem enviada com sucesso")
 
-            # Espera um pouco para garantir que a imagem foi enviada antes de retornar
-            time.sleep(2)
+            # 5. Enviada quando a nova mensagem mostra o tique; sem confirmação, o
+            # alerta fica pendente na caixa de saída para nova tentativa
+            if not self.aguardar_envio(ultima_antes):
+                print("Erro: envio da imagem não confirmado pelo WhatsApp")
+                return False
+            print("Imagem enviada com sucesso")
+            if legenda_pendente:
+                return self.enviar_mensagem_whatsapp(legenda_pendente)
             return True  # Retorna True se a imagem foi enviada com sucesso
 
         except Exception as e:
@@ -276,124 +394,240 @@ class RegistrosHandler(FileSystemEventHandler):
             print(f"Caminho do arquivo: {caminho_arquivo}")
         return False  # Se houve erro, retorna False
 
-
-
-    def enviar_mensagem_whatsapp(self, mensagem, tentativa=0):
-        if tentativa >= self.max_tentativas:
-            print("Número máximo de tentativas excedido")
+    def aguardar_envio(self, ultima_antes, timeout=30):
+        """
+        Espera a última mensagem enviada ter data-id diferente de ultima_antes
+        e o tique de recebida pelo servidor. Retorna False se não vier a tempo.
+        """
+        script = (
+            "var m = document.querySelectorAll(arguments[0]);"
+            "if (!m.length) return false;"
+            "var ultima = m[m.length - 1], linha = ultima.closest('[data-id]');"
+            "if (!linha || linha.getAttribute('data-id') === arguments[1]) return false;"
+            "return ultima.querySelector(arguments[2]) !== null;"
+        )
+        icones = ', '.join(f'span[data-icon="{icone}"]' for icone in ICONES_ENVIADA)
+        from selenium.webdriver.support.ui import WebDriverWait
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda d: d.execute_script(script, SELETORES['mensagens_enviadas'][0][1], ultima_antes, icones))
+            return True
+        except TimeoutException:
             return False
-        
+
+    def enviar_mensagem_whatsapp(self, mensagem):
+        # Sem nova tentativa aqui: em caso de falha a caixa de saída adia o alerta
         try:
-            wait = WebDriverWait(self.driver, 10)
-            
-            # Tentar diferentes seletores para o campo de mensagem
-            seletores_mensagem = [
-                "//div[@contenteditable='true'][@data-tab='10']",  # Campo de mensagem principal
-                "//div[@contenteditable='true'][@data-tab='6']",   # Campo alternativo
-                "//div[@title='Digite uma mensagem']",             # Por título
-                "//footer//div[@contenteditable='true']",          # Por localização
-                "//div[contains(@class, 'selectable-text')][@contenteditable='true']"  # Por classe
-            ]
-            
-            message_box = None
-            for seletor in seletores_mensagem:
-                try:
-                    message_box = wait.until(EC.presence_of_element_located((By.XPATH, seletor)))
-                    print(f"Campo de mensagem encontrado com seletor: {seletor}")
-                    break
-                except:
-                    continue
-            
-            if message_box is None:
+            # Último seletor que funcionou primeiro, depois os demais juntos
+            try:
+                message_box = self.seletores.encontrar(self.driver, 'campo_mensagem', timeout=10)
+            except TimeoutException:
                 raise Exception("Campo de mensagem não encontrado")
+            ultima_antes = self.seletores.ultimo_id(self.driver, 'mensagens_enviadas')
             
             # Garantir que o campo está focado
             message_box.click()
-            time.sleep(1)
             
-            # Enviar mensagem
+            # Texto inteiro de uma vez, com as quebras de linha
             message_box.clear()
-            # Enviar linha por linha para evitar problemas com quebras de linha
-            for linha in mensagem.split('\n'):
-                message_box.send_keys(linha)
-                message_box.send_keys(Keys.SHIFT + Keys.ENTER)
+            self.inserir_texto(message_box, mensagem)
             
             # Enviar a mensagem
             message_box.send_keys(Keys.ENTER)
+            # A mensagem pode ter saído mesmo sem confirmação
+            if not self.aguardar_envio(ultima_antes):
+                print("Erro: envio da mensagem não confirmado pelo WhatsApp")
+                return False
             print("Mensagem enviada com sucesso")
-            
             return True
             
         except Exception as e:
-            print(f"Erro ao enviar mensagem (tentativa {tentativa + 1}): {str(e)}")
-            if tentativa < self.max_tentativas - 1:
-                time.sleep(5)
-                return self.enviar_mensagem_whatsapp(mensagem, tentativa + 1)
+            print(f"Erro ao enviar mensagem: {str(e)}")
             return False
 
     def on_created(self, event):
         if event.is_directory:
             return
+        self.novo_arquivo(event.src_path)
 
-        # Aguardar um pouco para garantir que o arquivo foi completamente escrito
-        time.sleep(1)
-        
-        agora = datetime.now()
-        if (self.ultima_msg and 
-            (agora - self.ultima_msg).total_seconds() < self.intervalo_msgs):
+    def on_moved(self, event):
+        # O gravador escreve num temporário e renomeia: o arquivo final chega como "moved"
+        if event.is_directory:
             return
+        self.novo_arquivo(event.dest_path)
 
-        # Se for arquivo de texto, ler conteúdo
-        if event.src_path.endswith('.txt'):
-            print(f"Novo arquivo detectado: {event.src_path}")
-            
-            with open(event.src_path, 'r') as f:
-                conteudo = f.read()
-            
-            # Procurar arquivo de imagem correspondente
-            caminho_foto = event.src_path.replace('.txt', '.jpg')
-            print(f"Procurando imagem: {caminho_foto}")
-            
-            if os.path.exists(caminho_foto):
-                print(f"Imagem encontrada: {caminho_foto}")
-                
-                mensagem = "!! ALERTA: Mudança Identificada !!\n"
-                mensagem += f"Data/Hora: {agora.strftime('%d/%m/%Y %H:%M:%S')}\n"
-                mensagem += f"\nDetalhes:\n{conteudo}"
-                
-                if self.enviar_mensagem_whatsapp(mensagem):
-                    time.sleep(2)
-                    if self.enviar_arquivo(caminho_foto):
-                        print(f"Alerta e imagem enviados para o grupo: {self.config['grupo_destino']}")
-                        self.ultima_msg = agora
-                    else:
-                        print("Falha ao enviar imagem")
+    def novo_arquivo(self, caminho):
+        # Roda na thread do watchdog: só registra o alerta na caixa de saída
+        # O gravador publica a foto antes do .txt, ambos já completos
+        if not caminho.endswith('.txt'):
+            return
+        
+        print(f"Novo arquivo detectado: {caminho}")
+        caminho_foto = caminho.replace('.txt', '.jpg')
+        # Instante da detecção (nome da foto), o mesmo relógio de indice.desde na partida
+        if self.caixa.enfileirar(caminho_foto, caminho, timestamp_evento(caminho_foto)):
+            self.agregador.notificar()
+
+    def carregar_alertas(self, alertas):
+        """Alertas da caixa de saída como detecções, com o log de cada evento"""
+        deteccoes = []
+        for alerta in alertas:
+            conteudo = ''
+            if os.path.exists(alerta['caminho_txt']):
+                with open(alerta['caminho_txt'], 'r') as f:
+                    conteudo = f.read()
+            deteccoes.append({
+                'id': alerta['id'],
+                'caminho_foto': alerta['caminho_foto'],
+                'caminho_txt': alerta['caminho_txt'],
+                'conteudo': conteudo,
+                'recebido': datetime.fromtimestamp(alerta['recebido']),
+            })
+        return deteccoes
+
+    def classificar_deteccoes(self, deteccoes):
+        """
+        Completa cada detecção com pessoas, objetos e área de movimento (do
+        índice, ou do log quando o evento ainda não foi indexado) e ordena da
+        mais informativa para a menos informativa.
+        """
+        indice = IndiceEventos(self.pasta_registros)
+        try:
+            for deteccao in deteccoes:
+                evento = indice.por_foto(deteccao['caminho_foto'])
+                if evento is not None:
+                    caixas = evento['caixas'] or {}
+                    deteccao['pessoas'] = evento['pessoas']
+                    deteccao['objetos'] = evento['objetos']
+                    deteccao['area'] = sum(w * h for _, _, w, h in caixas.get('objetos', []))
+                    deteccao['data'] = datetime.fromtimestamp(evento['timestamp'])
                 else:
-                    print("Falha ao enviar mensagem")
-            else:
-                print(f"Imagem não encontrada: {caminho_foto}")
+                    deteccao['pessoas'], deteccao['objetos'] = ler_contagens(deteccao['caminho_txt'])
+                    deteccao['area'] = 0
+                    deteccao['data'] = deteccao['recebido']
+        finally:
+            indice.fechar()
+        return sorted(deteccoes, key=lambda d: (d['pessoas'], d['area'], d['objetos']), reverse=True)
+
+    def enviar_alerta(self, alertas):
+        """
+        Um alerta por janela: mensagem única e as imagens mais informativas.
+        Retorna os ids dos alertas que ficaram sem enviar.
+        """
+        deteccoes = self.carregar_alertas(alertas)
+        if len(deteccoes) == 1:
+            deteccao = deteccoes[0]
+            mensagem = "!! ALERTA: Mudança Identificada !!\n"
+            mensagem += f"Data/Hora: {deteccao['recebido'].strftime('%d/%m/%Y %H:%M:%S')}\n"
+            mensagem += f"\nDetalhes:\n{deteccao['conteudo']}"
+            enviadas = [deteccao]
+        else:
+            ordenadas = self.classificar_deteccoes(deteccoes)
+            inicio = min(d['data'] for d in deteccoes)
+            fim = max(d['data'] for d in deteccoes)
+            escolhidas = ordenadas[:self.max_imagens]
+            
+            mensagem = f"!! ALERTA: {len(deteccoes)} detecções !!\n"
+            mensagem += (f"Período: {inicio.strftime('%d/%m/%Y %H:%M:%S')} a {fim.strftime('%H:%M:%S')} "
+                         f"({(fim - inicio).total_seconds():.0f} s)\n")
+            mensagem += f"Pessoas (máximo em uma imagem): {max(d['pessoas'] for d in deteccoes)}\n"
+            mensagem += f"Objetos (total): {sum(d['objetos'] for d in deteccoes)}\n"
+            mensagem += f"\nImagens enviadas ({len(escolhidas)} de {len(deteccoes)}):\n"
+            for d in escolhidas:
+                mensagem += (f"- {d['data'].strftime('%H:%M:%S')}: {d['pessoas']} pessoa(s), "
+                             f"{d['objetos']} objeto(s)\n")
+            if len(deteccoes) > len(escolhidas):
+                mensagem += "As demais imagens estão na pasta registros.\n"
+            enviadas = escolhidas
+        
+        # Variantes leves gravadas junto com a foto: menos bytes por upload
+        from src.artefato import variante_envio
+        imagens = [variante_envio(d['caminho_foto'], self.imagem_envio) for d in enviadas]
+        
+        # O texto do alerta vai como legenda da primeira imagem, num único envio
+        if not self.enviar_arquivo(imagens[0], legenda=mensagem):
+            print("Falha ao enviar alerta")
+            return [a['id'] for a in alertas]
+        
+        # Imagens que falharem voltam para a caixa e saem num próximo alerta
+        pendentes = []
+        for deteccao, caminho_foto in zip(enviadas[1:], imagens[1:]):
+            if not self.enviar_arquivo(caminho_foto):
+                print(f"Falha ao enviar imagem: {caminho_foto}")
+                pendentes.append(deteccao['id'])
+        
+        self.ultima_msg = datetime.now()
+        if self.primeiro_alerta is None:
+            self.primeiro_alerta = time.monotonic() - self.inicio
+            print(f"Primeiro alerta enviado {self.primeiro_alerta:.1f} s após o início")
+        print(f"Alerta com {len(deteccoes)} detecção(ões) enviado para o grupo: {self.config['grupo_destino']}")
+        return pendentes
 
 def monitorar_registros(pasta_registros=None):
     if pasta_registros is None:
         pasta_registros = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'registros')
     
-    event_handler = RegistrosHandler()
+    event_handler = RegistrosHandler(pasta_registros=pasta_registros)
     observer = Observer()
-    observer.schedule(event_handler, pasta_registros, recursive=False)
+    # Recursivo para incluir as subpastas por câmera do modo multicâmera
+    observer.schedule(event_handler, pasta_registros, recursive=True)
     observer.start()
 
     print(f"Monitorando pasta: {pasta_registros}")
     try:
+        ultimo_resumo = time.monotonic()
         while True:
             time.sleep(1)
+            if event_handler.erro_inicializacao is not None:
+                print("WhatsApp não inicializado; os alertas continuam na caixa de saída.")
+                break
+            # Tamanho da fila e idade do alerta pendente mais antigo
+            if time.monotonic() - ultimo_resumo >= 60:
+                ultimo_resumo = time.monotonic()
+                print(event_handler.caixa.resumo())
     except KeyboardInterrupt:
-        observer.stop()
-        if hasattr(event_handler, 'driver'):
-            event_handler.driver.quit()
-        print("\nMonitoramento finalizado.")
+        pass
+    
+    observer.stop()
+    # Alertas pendentes saem antes de fechar o navegador
+    event_handler.agregador.parar()
+    if event_handler.driver is not None:
+        event_handler.driver.quit()
+    print("\nMonitoramento finalizado.")
     
     observer.join()
 
+def perfilar_inicio(config_path=None):
+    """Tempo de importação deste módulo e das etapas até o navegador, sem abri-lo"""
+    from src.perfil_inicio import PerfilInicio
+    perfil = PerfilInicio()
+    perfil.etapas.append(('import monitor_whatsapp (watchdog, selenium leve, src)', _TEMPO_IMPORTACAO))
+    for modulo in ('selenium.webdriver.remote.webdriver', 'selenium.webdriver.chrome.webdriver',
+                   'pyperclip', 'cv2', 'tkinter'):
+        if modulo not in sys.modules:
+            perfil.etapas.append((f'{modulo} (adiado)', 0.0))
+    if config_path is None:
+        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config_whatsapp.json')
+    with perfil.etapa('carregar config'):
+        with open(config_path, 'r') as f:
+            json.load(f)
+    with perfil.etapa('import selenium.webdriver.Chrome (na thread do navegador)'):
+        from selenium import webdriver
+        from selenium.webdriver.support.ui import WebDriverWait
+        webdriver.Chrome, webdriver.ChromeOptions
+    with perfil.etapa('import src.artefato (no primeiro alerta)'):
+        from src.artefato import variante_envio
+    print(perfil.relatorio())
+
+
 if __name__ == "__main__":
-    monitorar_registros()
+    import argparse
+    parser = argparse.ArgumentParser(description="Envio dos alertas da pasta registros para o WhatsApp")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Mostrar o tempo de importação e das etapas de inicialização e sair")
+    args = parser.parse_args()
+    if args.profile_startup:
+        perfilar_inicio()
+    else:
+        monitorar_registros()
     
\ No newline at end of file
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+
+# Candidatos para cada elemento da interface do WhatsApp Web, do mais
+# provável ao menos provável. "{grupo}" é trocado pelo nome do grupo.
+SELETORES = {
+    'campo_pesquisa': [
+        (By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'),
+    ],
+    'grupo': [
+        (By.XPATH, '//span[@title="{grupo}"]'),
+        (By.XPATH, '//div[@title="{grupo}"]'),
+        (By.XPATH, '//div[contains(@title, "{grupo}")]'),
+    ],
+    'campo_mensagem': [
+        (By.XPATH, "//div[@contenteditable='true'][@data-tab='10']"),  # Campo de mensagem principal
+        (By.XPATH, "//div[@contenteditable='true'][@data-tab='6']"),   # Campo alternativo
+        (By.XPATH, "//div[@title='Digite uma mensagem']"),             # Por título
+        (By.XPATH, "//footer//div[@contenteditable='true']"),          # Por localização
+        (By.XPATH, "//div[contains(@class, 'selectable-text')][@contenteditable='true']"),  # Por classe
+    ],
+    'botao_anexo': [
+        (By.CSS_SELECTOR, 'button[title="Anexar"]'),
+        (By.CSS_SELECTOR, 'span[data-icon="plus"]'),
+    ],
+    'entrada_arquivo': [
+        (By.CSS_SELECTOR, 'input[accept="image/*,video/mp4,video/3gpp,video/quicktime"]'),
+        (By.CSS_SELECTOR, 'input[type="file"][accept*="image"]'),
+    ],
+    'botao_enviar': [
+        (By.CSS_SELECTOR, 'span[data-icon="send"]'),
+        (By.CSS_SELECTOR, 'div[aria-label="Enviar"]'),
+    ],
+    'campo_legenda': [
+        (By.XPATH, "//div[@aria-label='Adicionar legenda'][@contenteditable='true']"),
+        (By.XPATH, "//div[@aria-placeholder='Adicionar legenda']//div[@contenteditable='true']"),
+        (By.XPATH, "//div[contains(@aria-label, 'legenda')][@contenteditable='true']"),
+        (By.XPATH, "//div[contains(@aria-label, 'caption')][@contenteditable='true']"),
+    ],
+    'mensagens_enviadas': [
+        (By.CSS_SELECTOR, 'div.message-out'),
+    ],
+}
+
+# Ícones da última mensagem enviada: relógio enquanto pendente, tiques quando entregue ao servidor
+ICONES_ENVIADA = ('msg-check', 'msg-dblcheck')
+
+
+class CacheSeletores:
+    """
+    Lembra qual candidato achou cada elemento e tenta esse primeiro, com
+    espera curta; só se ele falhar os demais são testados, todos na mesma
+    espera em vez de um WebDriverWait por candidato. Os vencedores ficam
+    num JSON para a próxima execução.
+    """
+    def __init__(self, caminho, seletores=None):
+        self.caminho = caminho
+        self.seletores = seletores or SELETORES
+        self._lock = threading.Lock()
+        self.vencedores = {}
+        try:
+            with open(caminho, 'r') as f:
+                self.vencedores = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _candidatos(self, nome):
+        candidatos = [tuple(c) for c in self.seletores[nome]]
+        vencedor = self.vencedores.get(nome)
+        if vencedor is not None and tuple(vencedor) in candidatos:
+            candidatos.remove(tuple(vencedor))
+            candidatos.insert(0, tuple(vencedor))
+        return candidatos
+
+    def _salvar(self, nome, candidato):
+        with self._lock:
+            if self.vencedores.get(nome) == list(candidato):
+                return
+            self.vencedores[nome] = list(candidato)
+            temporario = f'{self.caminho}.tmp'
+            with open(temporario, 'w') as f:
+                json.dump(self.vencedores, f, indent=2)
+            os.replace(temporario, self.caminho)
+
+    @staticmethod
+    def _buscar(driver, candidatos, clicavel, formatar):
+        for por, seletor in candidatos:
+            try:
+                for elemento in driver.find_elements(por, seletor.format(**formatar)):
+                    if not clicavel or (elemento.is_displayed() and elemento.is_enabled()):
+                        return (por, seletor), elemento
+            except StaleElementReferenceException:
+                continue
+        return None
+
+    def encontrar(self, driver, nome, timeout=10, espera_curta=1.0, clicavel=False, **formatar):
+        """Elemento da interface; TimeoutException se nenhum candidato aparecer a tempo"""
+        # Importado no primeiro uso: carrega o webdriver remoto inteiro
+        from selenium.webdriver.support.ui import WebDriverWait
+        candidatos = self._candidatos(nome)
+        inicio = time.monotonic()
+
+        # 1. O último vencedor, com espera curta
+        if nome in self.vencedores:
+            try:
+                _, elemento = WebDriverWait(driver, min(espera_curta, timeout), poll_frequency=0.05).until(
+                    lambda d: self._buscar(d, candidatos[:1], clicavel, formatar))
+                return elemento
+            except TimeoutException:
+                pass
+
+        # 2. Todos os candidatos de uma vez, no tempo que sobrar
+        restante = max(timeout - (time.monotonic() - inicio), 0.1)
+        try:
+            candidato, elemento = WebDriverWait(driver, restante, poll_frequency=0.1).until(
+                lambda d: self._buscar(d, candidatos, clicavel, formatar))
+        except TimeoutException:
+            raise TimeoutException(f"Elemento não encontrado: {nome}")
+        if candidato != candidatos[0] or nome not in self.vencedores:
+            print(f"Seletor para {nome}: {candidato[1]}")
+        self._salvar(nome, candidato)
+        return elemento
+
+    def ultimo_id(self, driver, nome, **formatar):
+        """
+        data-id da linha do último elemento do primeiro candidato que achar
+        algum, ou None. A lista de mensagens é virtualizada: a quantidade de
+        elementos não muda a cada envio, o id da última mensagem muda.
+        """
+        for por, seletor in self._candidatos(nome):
+            elementos = driver.find_elements(por, seletor.format(**formatar))
+            if elementos:
+                return driver.execute_script(
+                    "var r = arguments[0].closest('[data-id]'); return r ? r.getAttribute('data-id') : null;",
+                    elementos[-1])
+        return None